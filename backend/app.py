@@ -1,10 +1,15 @@
+import asyncio
 import os
 import pandas as pd
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
+from backend import metrics
 
+from backend.models.catalog import Catalog, is_catalog, vectors_file
 from backend.models.image_processor import ImageProcessor
 from backend.models.llm_service import PixtralVisionService
-from backend.utils.helpers import get_all_items_for_image, process_response
+from backend.models.outfit_index import OutfitPostings
+from backend.models.tracing import traced
+from backend.utils.helpers import MarkdownStreamFormatter, get_all_items_for_image, process_response
 import backend.models.config as config
 
 class StyleFinderApp:
@@ -17,14 +22,19 @@ class StyleFinderApp:
         Initialise l'application Style Finder.
 
         Args:
-            dataset_path (str): Chemin vers le fichier du dataset
+            dataset_path (str): Chemin vers le fichier du dataset (pickle) ou le dossier du catalogue columnaire
 
         Raises:
             FileNotFoundError: Si le fichier du dataset est introuvable
             ValueError: Si le dataset est vide ou invalide
         """
+        self.catalog = None
         if isinstance(dataset_path, pd.DataFrame):
             self.data = dataset_path
+        elif is_catalog(dataset_path):
+            # Catalogue columnaire : métadonnées seules en mémoire, embeddings mappés
+            self.catalog = Catalog.load(dataset_path)
+            self.data = self.catalog.metadata
         else:
             # Sinon, charger depuis le fichier
             if not os.path.exists(dataset_path):
@@ -40,76 +50,208 @@ class StyleFinderApp:
             norm_mean=config.NORMALIZATION_MEAN,
             norm_std=config.NORMALIZATION_STD
         )
+        if not isinstance(dataset_path, pd.DataFrame):
+            # Un index IVF/PQ sauvegardé n'est réutilisé que sur ce même fichier de vecteurs
+            self.image_processor.vectors_source = vectors_file(dataset_path)
+
+        # Postings tenue -> articles pour récupérer les articles en O(articles)
+        self.postings = OutfitPostings.from_dataframe(self.data)
+
+        # Construire l'index de recherche une fois pour toutes
+        if self.catalog is not None:
+            self.image_processor.set_index(self.data, self.catalog.exact_index())
+        self.image_processor.get_index(self.data, index=config.SEARCH_INDEX)
+        if self.catalog is None and not isinstance(dataset_path, pd.DataFrame):
+            # Dataset pickle : un index IVF/PQ garde ses vecteurs, la colonne Embedding est inutile
+            self.image_processor.release_embeddings(self.data, index=config.SEARCH_INDEX)
 
         self.llm_service = PixtralVisionService()
 
-    def process_image(self, image):
+        # Pool borné pour les étapes CPU du chemin asynchrone (décodage, ONNX, recherche)
+        self.executor = ThreadPoolExecutor(max_workers=config.INFERENCE_THREADS, thread_name_prefix="style-finder-cpu")
+
+    def match_image(self, image):
         """
-        Traite une image uploadée par l'utilisateur et génère une réponse mode.
+        Étapes CPU du traitement : encodage, recherche et récupération des articles.
 
         Args:
-            image: Image PIL uploadée via Gradio
+            image: Octets bruts de l'upload, image PIL ou chemin local
 
         Returns:
-            str: Réponse formatée avec l'analyse mode
+            dict | str: Contexte de la correspondance, ou message d'erreur
         """
-        # Sauvegarder l'image temporairement si ce n'est pas déjà un chemin de fichier
-        if not isinstance(image, str):
-            temp_file = NamedTemporaryFile(delete=False, suffix=".jpg")
-            image_path = temp_file.name
-            image.save(image_path)
-        else:
-            image_path = image
-
-        # Étape 1 : Encoder l'image
-        user_encoding = self.image_processor.encode_image(image_path, is_url=False)
+        # Étape 1 : Encoder l'image (en mémoire, décodée une seule fois)
+        user_encoding = self.image_processor.encode_image(image, is_url=False)
         if user_encoding['vector'] is None:
             return "Erreur : Impossible de traiter l'image. Veuillez essayer une autre image."
 
         # Étape 2 : Trouver les correspondances les plus proches
-        closest_matches = self.image_processor.find_closest_match(
-            user_encoding['vector'],
-            dataset=self.data,
-            metric='cosine',
-            top_k=15
-        )
+        with metrics.stage("search"):
+            closest_matches = self.image_processor.find_closest_match(
+                user_encoding['vector'],
+                dataset=self.data,
+                metric='cosine',
+                top_k=15,
+                index=config.SEARCH_INDEX,
+                features={"color_histogram": user_encoding.get('color_histogram')}
+            )
         if not closest_matches:
             return "Erreur : Impossible de trouver une correspondance. Veuillez essayer une autre image."
 
+        print("Top 15 des correspondances les plus proches :")
+        for i, (closest_rows, similarity_score, index) in enumerate(closest_matches, 1):
+            print(f"{i}. {closest_rows.get('Item Name', 'N/A')} - Score: {similarity_score:.4f}")
+
+        return self.build_match(user_encoding, closest_matches)
+
+    def build_match(self, user_encoding, closest_matches):
+        """
+        Récupère tous les articles de la meilleure correspondance.
+
+        Args:
+            user_encoding (dict): Résultat de `encode_image`
+            closest_matches (list): Tuples (ligne, score, index) triés par score décroissant
+
+        Returns:
+            dict | str: Contexte de la correspondance, ou message d'erreur
+        """
         # Extraire les noms des articles de toutes les lignes
         matched_rows = [closest_rows.get('Item Name', 'N/A') for closest_rows, similarity_score, index in closest_matches]
 
         # Étape 3 : Récupérer tous les articles liés (utiliser le premier résultat)
-        if closest_matches:
-            print("Top 15 des correspondances les plus proches :")
-            for i, (closest_rows, similarity_score, index) in enumerate(closest_matches, 1):
-                print(f"{i}. {closest_rows.get('Item Name', 'N/A')} - Score: {similarity_score:.4f}")
-
-            first_match = closest_matches[0]
-            closest_rows, similarity_score, index = first_match
-
-            all_items = get_all_items_for_image(closest_rows.get('Image URL', ''), self.data)
-            if all_items.empty:
-                return "Erreur : Aucun article trouvé pour l'image correspondante."
-
-            bot_response = self.llm_service.generate_fashion_response(
-                user_image_base64=user_encoding['base64'],
-                matched_rows=matched_rows,
-                all_items=all_items,
-                similarity_score=similarity_score,
-                threshold=config.SIMILARITY_THRESHOLD
-            )
-        else:
-            return "Erreur : Aucune correspondance trouvée."
+        closest_rows, similarity_score, index = closest_matches[0]
+
+        with metrics.stage("item_lookup"):
+            all_items = get_all_items_for_image(closest_rows.get('Image URL', ''), self.data, self.postings)
+        if all_items.empty:
+            return "Erreur : Aucun article trouvé pour l'image correspondante."
+
+        return {
+            "user_encoding": user_encoding,
+            "matched_rows": matched_rows,
+            "scores": [float(score) for _, score, _ in closest_matches],
+            "closest_rows": closest_rows,
+            "similarity_score": similarity_score,
+            "all_items": all_items,
+        }
 
-        # Nettoyer le fichier temporaire
-        if not isinstance(image, str):
-            try:
-                os.unlink(image_path)
-            except:
-                pass
+    def llm_arguments(self, match):
+        """Arguments de l'analyse Pixtral pour une correspondance."""
+        return {
+            "user_image_base64": match["user_encoding"]['base64'],
+            "matched_rows": match["matched_rows"],
+            "all_items": match["all_items"],
+            "similarity_score": match["similarity_score"],
+            "threshold": config.SIMILARITY_THRESHOLD,
+            "image_url": match["closest_rows"].get('Image URL', ''),
+            "content_hash": match["user_encoding"].get('content_hash'),
+        }
 
+    def format_result(self, match, bot_response):
+        """Réponse finale de l'API pour une correspondance et l'analyse générée."""
+        with metrics.stage("postprocess"):
+            bot_response = process_response(bot_response)
         return {
-            "bot_response": process_response(bot_response),
-            "closest_image_url": closest_rows.get('Image URL', '')
-        }
\ No newline at end of file
+            "bot_response": bot_response,
+            "closest_image_url": match["closest_rows"].get('Image URL', '')
+        }
+
+    @traced("style_finder_analyze")
+    def process_image(self, image):
+        """
+        Traite une image uploadée par l'utilisateur et génère une réponse mode.
+
+        Args:
+            image: Octets bruts de l'upload, image PIL ou chemin local
+
+        Returns:
+            str: Réponse formatée avec l'analyse mode
+        """
+        match = self.match_image(image)
+        if isinstance(match, str):
+            return match
+
+        bot_response = self.llm_service.generate_fashion_response(**self.llm_arguments(match))
+        return self.format_result(match, bot_response)
+
+    @traced("style_finder_analyze")
+    async def process_image_async(self, image, latency_budget_s=None):
+        """
+        Version asynchrone de `process_image`.
+
+        Le décodage, l'inférence et la recherche tournent dans le pool de threads
+        borné de l'application ; l'appel LLM est attendu sans occuper de thread.
+
+        Args:
+            image: Octets bruts de l'upload, image PIL ou chemin local
+            latency_budget_s (float): Budget de latence de l'appel LLM (défaut : LLM_LATENCY_BUDGET_S)
+
+        Returns:
+            str: Réponse formatée avec l'analyse mode
+        """
+        loop = asyncio.get_running_loop()
+        match = await loop.run_in_executor(self.executor, metrics.run_in_context(self.match_image, image))
+        if isinstance(match, str):
+            return match
+
+        bot_response = await self.llm_service.generate_fashion_response_async(
+            **self.llm_arguments(match), latency_budget_s=latency_budget_s
+        )
+        return self.format_result(match, bot_response)
+
+    def match_summary(self, match):
+        """Résultat de la recherche, envoyé avant l'analyse LLM en streaming."""
+        return {
+            "closest_image_url": match["closest_rows"].get('Image URL', ''),
+            "similarity_score": float(match["similarity_score"]),
+            "matches": [
+                {"item_name": name, "score": score}
+                for name, score in zip(match["matched_rows"], match["scores"])
+            ],
+            "items": [
+                {"item_name": row.get('Item Name'), "price": row.get('Price'), "link": row.get('Link')}
+                for _, row in match["all_items"].iterrows()
+            ],
+        }
+
+    @traced("style_finder_analyze")
+    async def stream_image_async(self, image, latency_budget_s=None):
+        """
+        Traite une image en streaming.
+
+        Args:
+            image: Octets bruts de l'upload, image PIL ou chemin local
+            latency_budget_s (float): Budget avant le premier token de l'analyse (défaut : LLM_FIRST_TOKEN_BUDGET_S)
+
+        Yields:
+            dict: {"type": "match", ...} dès la fin de la recherche, puis des
+                {"type": "delta", "text": ...} au fil des tokens (Markdown corrigé
+                au fil de l'eau), puis {"type": "done", "message": ...} avec la
+                réponse finale complète, ou {"type": "error", "message": ...} (recherche
+                impossible ou analyse interrompue, qui n'est pas mise en cache)
+        """
+        loop = asyncio.get_running_loop()
+        match = await loop.run_in_executor(self.executor, metrics.run_in_context(self.match_image, image))
+        if isinstance(match, str):
+            yield {"type": "error", "message": match}
+            return
+
+        yield {"type": "match", **self.match_summary(match)}
+
+        formatter = MarkdownStreamFormatter()
+        stream = self.llm_service.stream_fashion_response_async(
+            **self.llm_arguments(match), latency_budget_s=latency_budget_s
+        )
+        async for kind, payload in stream:
+            if kind == "delta":
+                text = formatter.feed(payload)
+                if text:
+                    yield {"type": "delta", "text": text}
+            elif kind == "error":
+                # Analyse interrompue : le client doit écarter le texte partiel
+                yield {"type": "error", "message": payload}
+            else:
+                text = formatter.close()
+                if text:
+                    yield {"type": "delta", "text": text}
+                yield {"type": "done", "message": self.format_result(match, payload)}
@@ -3,4 +3,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# Précharger l'application (dataset, ONNX, client LLM) une fois par worker
+from backend import registry
+import backend.models.config as config
+
+if config.PRELOAD_APP:
+    registry.warmup(background=config.PRELOAD_IN_BACKGROUND)
\ No newline at end of file
@@ -0,0 +1,347 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import backend.models.config as config
+from backend.models.admission import AdmissionController
+from backend.models.embedding_cache import content_key
+from backend.models.preprocessing import ImagePreprocessor, jpeg_base64, open_image
+from backend.models.reranking import color_histogram
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif"}
+
+# Prétraitement propre à chaque processus du pool
+_worker_preprocessor = None
+
+
+def _init_worker(image_size, norm_mean, norm_std):
+    global _worker_preprocessor
+    _worker_preprocessor = ImagePreprocessor(image_size, norm_mean=norm_mean, norm_std=norm_std)
+
+
+def _prepare(item, with_base64=True, preprocessor=None):
+    """
+    Lit, décode et prétraite une image (exécuté dans un processus ou un thread du pool).
+
+    Returns:
+        dict: L'élément complété de 'tensor', 'base64', 'content_hash' et 'color_histogram', ou d'une 'error'
+    """
+    preprocessor = preprocessor or _worker_preprocessor
+    try:
+        image_bytes, image = open_image(item["source"], item["is_url"], public_only=item.get("public_only", False))
+        base64_string = None
+        if with_base64:
+            base64_string, image = jpeg_base64(image_bytes, image)
+        color = None
+        if config.RERANK and config.RERANK_COLOR_WEIGHT > 0:
+            image = preprocessor.resize(image)
+            color = color_histogram(image)
+        return {
+            **item,
+            "tensor": preprocessor.preprocess(image),
+            "base64": base64_string,
+            "content_hash": content_key(image_bytes),
+            "color_histogram": color,
+        }
+    except Exception as e:
+        return {**item, "error": f"Impossible de lire l'image : {e}"}
+
+
+def load_inputs(source):
+    """
+    Liste les images à analyser.
+
+    Args:
+        source (str): Dossier d'images, fichier JSONL ({"url"|"path", "id"?} par ligne)
+            ou fichier texte (un chemin ou une URL par ligne)
+
+    Returns:
+        list: Éléments {'id', 'source', 'is_url'}
+    """
+    if os.path.isdir(source):
+        items = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    items.append({"id": os.path.relpath(path, source), "source": path, "is_url": False})
+        return sorted(items, key=lambda item: item["id"])
+
+    items = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if source.endswith(".jsonl"):
+                record = json.loads(line)
+                location = record.get("url") or record.get("path")
+                items.append({
+                    "id": str(record.get("id", location)),
+                    "source": location,
+                    "is_url": "url" in record,
+                })
+            else:
+                items.append({"id": line, "source": line, "is_url": line.startswith(("http://", "https://"))})
+    return items
+
+
+def completed_ids(output_path):
+    """
+    Identifiants déjà analysés avec succès dans un fichier de résultats (reprise).
+
+    Les lignes incomplètes (interruption en cours d'écriture) et les erreurs sont ignorées
+    et seront donc retraitées.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def build_llm_limits(concurrency, per_minute):
+    """
+    Bornes des appels LLM d'analyses par lots : `concurrency` appels simultanés et
+    `per_minute` appels par minute (0 : illimité), espacés régulièrement.
+
+    L'attente n'est pas bornée : c'est la contre-pression du lot, pas un refus.
+    """
+    return AdmissionController(
+        max_in_flight=concurrency, max_queue=None, queue_timeout_s=None,
+        rate_per_minute=per_minute, burst=1, pool="batch",
+    )
+
+
+_shared_limits = None
+_shared_limits_lock = threading.Lock()
+
+
+def shared_llm_limits():
+    """
+    Bornes partagées par toutes les analyses par lots du worker (POST /analyze/batch),
+    construites depuis config.BATCH_LLM_* au premier usage.
+
+    Des requêtes simultanées se partagent BATCH_LLM_CONCURRENCY et BATCH_LLM_RATE_PER_MINUTE
+    au lieu d'en obtenir chacune autant.
+    """
+    global _shared_limits
+    if _shared_limits is None:
+        with _shared_limits_lock:
+            if _shared_limits is None:
+                _shared_limits = build_llm_limits(config.BATCH_LLM_CONCURRENCY, config.BATCH_LLM_RATE_PER_MINUTE)
+    return _shared_limits
+
+
+class BatchAnalyzer:
+    """
+    Analyse par lots de nombreuses images avec l'application partagée.
+
+    Décodage et prétraitement dans un pool de processus, inférence ONNX d'un lot
+    entier en un appel, recherche par un seul produit matriciel par lot, puis
+    appels LLM asynchrones à concurrence et débit bornés (bornes éventuellement
+    partagées avec les autres analyses du worker).
+    """
+
+    def __init__(
+            self, app, batch_size=32, processes=None, with_llm=True,
+            llm_concurrency=4, llm_rate_per_minute=60, top_k=15, llm_limits=None, admit_llm=True
+        ):
+        """
+        Args:
+            app (StyleFinderApp): Application chargée (dataset, modèle, client LLM)
+            batch_size (int): Images par lot d'inférence et de recherche
+            processes (int): Processus de prétraitement (None : tous les cœurs, 0 : threads de l'application)
+            with_llm (bool): Générer l'analyse Pixtral en plus de la recherche
+            llm_concurrency (int): Appels LLM simultanés
+            llm_rate_per_minute (float): Appels LLM maximum par minute (0 : illimité)
+            top_k (int): Correspondances retenues par image
+            llm_limits (AdmissionController): Bornes des appels LLM partagées avec d'autres analyses
+                (défaut : propres à cet analyseur, selon llm_concurrency et llm_rate_per_minute)
+            admit_llm (bool): Soumettre aussi les appels LLM au contrôle d'admission du worker
+                (False hors ligne : seules les bornes du lot s'appliquent)
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.processes = os.cpu_count() if processes is None else processes
+        self.with_llm = with_llm
+        self.llm_limits = llm_limits or build_llm_limits(llm_concurrency, llm_rate_per_minute)
+        self.top_k = top_k
+        self.admit_llm = admit_llm
+
+    def _pool(self):
+        if not self.processes:
+            return None
+        # spawn : pas de fork d'un processus qui porte déjà des threads (ONNX, micro-batching)
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD),
+        )
+
+    async def _prepare_chunk(self, loop, pool, chunk):
+        if pool is not None:
+            calls = [loop.run_in_executor(pool, _prepare, item, self.with_llm) for item in chunk]
+        else:
+            preprocessor = self.app.image_processor.preprocessor
+            calls = [
+                loop.run_in_executor(self.app.executor, _prepare, item, self.with_llm, preprocessor)
+                for item in chunk
+            ]
+        return await asyncio.gather(*calls)
+
+    def _match_chunk(self, prepared):
+        """
+        Inférence et recherche d'un lot entier.
+
+        Returns:
+            list: (élément, contexte de correspondance ou message d'erreur)
+        """
+        results = [(item, item["error"]) for item in prepared if "error" in item]
+        ready = [item for item in prepared if "error" not in item]
+        if not ready:
+            return results
+
+        processor = self.app.image_processor
+        vectors = processor.embed_batch(np.stack([item["tensor"] for item in ready]))
+        features = {}
+        if all(item["color_histogram"] is not None for item in ready):
+            features["color_histogram"] = np.stack([item["color_histogram"] for item in ready])
+        all_matches = processor.find_closest_matches(
+            vectors, self.app.data, metric='cosine', top_k=self.top_k, index=config.SEARCH_INDEX, features=features
+        )
+        for item, vector, closest_matches in zip(ready, vectors, all_matches):
+            if not closest_matches:
+                results.append((item, "Erreur : Impossible de trouver une correspondance."))
+                continue
+            user_encoding = {
+                "base64": item["base64"],
+                "vector": vector,
+                "content_hash": item["content_hash"],
+                "color_histogram": item["color_histogram"],
+            }
+            results.append((item, self.app.build_match(user_encoding, closest_matches)))
+        return results
+
+    @staticmethod
+    def _record(item, status, **fields):
+        return {"id": item["id"], "source": item["source"], "status": status, **fields}
+
+    async def _analyze(self, item, match):
+        bot_response = await self.app.llm_service.generate_fashion_response_async(
+            **self.app.llm_arguments(match), admit=self.admit_llm
+        )
+        summary = self.app.match_summary(match)
+        if bot_response.startswith("Erreur lors de la génération"):
+            return self._record(item, "error", error=bot_response, **summary)
+        return self._record(item, "ok", **summary, **self.app.format_result(match, bot_response))
+
+    async def iter_results(self, items):
+        """
+        Analyse les éléments et produit chaque résultat dès qu'il est prêt (ordre non garanti).
+
+        Args:
+            items (list): Éléments {'id', 'source', 'is_url'}
+
+        Yields:
+            dict: Résultat {'id', 'source', 'status', ...} de chaque image
+        """
+        loop = asyncio.get_running_loop()
+        results = asyncio.Queue()
+        done = object()
+        limits = self.llm_limits
+
+        async def run_llm(item, match):
+            try:
+                await results.put(await self._analyze(item, match))
+            except Exception as e:
+                await results.put(self._record(item, "error", error=str(e)))
+
+        async def produce():
+            pool = self._pool()
+            tasks = set()
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    prepared = await self._prepare_chunk(loop, pool, items[start:start + self.batch_size])
+                    matched = await loop.run_in_executor(self.app.executor, self._match_chunk, prepared)
+                    for item, match in matched:
+                        if isinstance(match, str):
+                            await results.put(self._record(item, "error", error=match))
+                        elif not self.with_llm:
+                            await results.put(self._record(item, "ok", **self.app.match_summary(match)))
+                        else:
+                            # Contre-pression : pas plus d'analyses en vol que les bornes (partagées) n'en admettent
+                            await limits.acquire()
+                            task = asyncio.create_task(run_llm(item, match))
+                            tasks.add(task)
+                            task.add_done_callback(tasks.discard)
+                            # Place rendue même si la tâche est annulée avant d'avoir démarré
+                            started = time.monotonic()
+                            task.add_done_callback(lambda _, t=started: limits.release(time.monotonic() - t))
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                for task in list(tasks):
+                    task.cancel()
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+                await results.put(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                record = await results.get()
+                if record is done:
+                    break
+                yield record
+            await producer
+        finally:
+            producer.cancel()
+
+    async def run(self, items, output_path, on_result=None):
+        """
+        Analyse les éléments non encore traités et ajoute les résultats au fichier JSONL.
+
+        Args:
+            items (list): Éléments {'id', 'source', 'is_url'}
+            output_path (str): Fichier de résultats, repris s'il existe
+            on_result (callable): Appelé avec chaque résultat écrit
+
+        Returns:
+            dict: Nombre d'éléments ignorés (déjà faits), réussis et en erreur
+        """
+        done = completed_ids(output_path)
+        pending = [item for item in items if item["id"] not in done]
+        counts = {"skipped": len(items) - len(pending), "ok": 0, "error": 0}
+
+        # Une interruption a pu laisser une ligne incomplète : repartir sur une ligne neuve
+        needs_newline = False
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+
+        with open(output_path, "a", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            async for record in self.iter_results(pending):
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                counts[record["status"]] += 1
+                if on_result is not None:
+                    on_result(record)
+        return counts
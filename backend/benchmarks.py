@@ -0,0 +1,258 @@
+import contextlib
+import io
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import backend.models.config as config
+from backend.models.fake_mistral import FakeMistral
+from backend.models.llm_service import PixtralVisionService
+
+# Réponse type de Pixtral (Markdown avec les défauts corrigés par process_response)
+STUB_RESPONSE = "\n".join(
+    ["## Analyse de la tenue", "", "Une tenue décontractée aux tons neutres.", "", "## Articles"]
+    + [f"- **Article {i}** : Prix : {10 + i} € - Lien : https://example.com/article-{i}" for i in range(12)]
+    + ["", "## Conseils de style", "", "Associer avec des accessoires discrets." * 5]
+)
+
+STAGES = (
+    "encode_image", "find_closest_match", "get_all_items_for_image", "process_response", "process_image",
+    "process_image_traced",
+)
+
+
+def synthetic_catalog(n_rows, dim, items_per_outfit=4, seed=0):
+    """
+    Catalogue synthétique : embeddings aléatoires normalisés, une image par tenue.
+
+    Les articles d'une tenue partagent le même tableau d'embedding (comme dans le
+    dataset réel), si bien que la mémoire croît avec le nombre de tenues.
+
+    Args:
+        n_rows (int): Nombre d'articles
+        dim (int): Dimension des embeddings
+        items_per_outfit (int): Articles par tenue
+        seed (int): Graine aléatoire
+
+    Returns:
+        DataFrame: Colonnes 'Item Name', 'Price', 'Link', 'Image URL', 'Embedding'
+    """
+    rng = np.random.default_rng(seed)
+    n_outfits = -(-n_rows // items_per_outfit)
+    vectors = rng.standard_normal((n_outfits, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    outfit = np.arange(n_rows) // items_per_outfit
+    return pd.DataFrame({
+        'Item Name': [f"Article {i}" for i in range(n_rows)],
+        'Price': np.round(rng.uniform(5, 300, n_rows), 2),
+        'Link': [f"https://example.com/item/{i}" for i in range(n_rows)],
+        'Image URL': [f"https://example.com/outfit/{o}.jpg" for o in outfit],
+        'Embedding': [vectors[o] for o in outfit],
+    })
+
+
+def synthetic_jpeg(width=800, height=1000, seed=0):
+    """Photo JPEG synthétique (dégradé bruité), aux dimensions d'un upload typique."""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = gradient + rng.normal(0, 40, (height, width, 3))
+    buffered = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus (Mo)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Kio ; macOS : octets
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(timings_ms):
+    """
+    Distribution des latences d'une étape.
+
+    Returns:
+        dict: n, moyenne, p50, p95, p99, max (ms) et débit séquentiel (opérations/s)
+    """
+    timings = np.asarray(timings_ms, dtype=np.float64)
+    return {
+        "n": int(len(timings)),
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "max_ms": float(timings.max()),
+        "throughput_ops": float(1000.0 / timings.mean()) if timings.mean() > 0 else None,
+    }
+
+
+def measure(function, inputs, warmup=3):
+    """Exécute `function` sur chaque entrée (après quelques appels de chauffe) ; retourne les latences (ms)."""
+    for value in inputs[:warmup]:
+        function(value)
+    timings = []
+    for value in inputs:
+        start = time.perf_counter()
+        function(value)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run_catalog_benchmark(n_rows, repeats=50, llm_latency_ms=0.0, seed=0):
+    """
+    Mesure chaque étape de l'analyse sur un catalogue synthétique de n_rows articles.
+
+    Args:
+        n_rows (int): Taille du catalogue
+        repeats (int): Mesures par étape
+        llm_latency_ms (float): Latence simulée de Pixtral
+        seed (int): Graine aléatoire
+
+    Returns:
+        dict: 'rows', 'build_s', 'peak_rss_mb' et 'stages' (distribution par étape)
+    """
+    # Import local : le module reste importable sans charger le modèle
+    from backend.app import StyleFinderApp
+    from backend.models import tracing
+    from backend.models.image_processor import ImageProcessor
+    from backend.utils.helpers import get_all_items_for_image, process_response
+
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    # Dimension des embeddings : celle du modèle réellement chargé
+    probe = ImageProcessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+    dim = probe.embed_batch(np.zeros((1,) + probe.preprocessor.shape, dtype=np.float32)).shape[1]
+    if probe.scheduler is not None:
+        probe.scheduler.close()
+    del probe
+
+    data = synthetic_catalog(n_rows, dim, seed=seed)
+    app = StyleFinderApp(data)
+    # Service réel (prompt, requête, lecture de la réponse) sur un client simulé, sans réseau ni aléa
+    app.llm_service = PixtralVisionService(
+        client=FakeMistral(latency_ms=llm_latency_ms, latency_sigma=0, error_rate=0, seed=seed)
+    )
+    # Chaque analyse doit appeler le client
+    app.llm_service.cache = None
+    # Chaque encodage doit exécuter le modèle
+    app.image_processor.embedding_cache = None
+    build_s = time.perf_counter() - start
+
+    images = [synthetic_jpeg(seed=seed + i) for i in range(repeats)]
+    rows = rng.integers(0, len(data), repeats)
+    queries = np.stack([data['Embedding'].iloc[int(row)] for row in rows])
+    queries += 0.05 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(dim)
+    urls = data['Image URL'].iloc[rows].tolist()
+
+    stages = {}
+    # Mesures sans traçage ; 'process_image_traced' mesure son surcoût (toutes les requêtes
+    # tracées, export vers un puits local)
+    tracing.configure(enabled=False)
+    # match_image affiche les correspondances : sortie muette pendant les mesures
+    with contextlib.redirect_stdout(io.StringIO()):
+        stages["encode_image"] = measure(lambda raw: app.image_processor.encode_image(raw, is_url=False), images)
+        stages["find_closest_match"] = measure(
+            lambda query: app.image_processor.find_closest_match(query, data, top_k=15, index=config.SEARCH_INDEX),
+            list(queries),
+        )
+        stages["get_all_items_for_image"] = measure(lambda url: get_all_items_for_image(url, data, app.postings), urls)
+        stages["process_response"] = measure(process_response, [STUB_RESPONSE] * repeats)
+        stages["process_image"] = measure(app.process_image, images)
+        tracer = tracing.configure(enabled=True, sample_rate=1.0, sink=lambda span: None)
+        stages["process_image_traced"] = measure(app.process_image, images)
+        tracer.exporter.flush()
+
+    app.executor.shutdown()
+    if app.image_processor.scheduler is not None:
+        app.image_processor.scheduler.close()
+    return {
+        "rows": int(n_rows),
+        "dim": int(dim),
+        "build_s": build_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {name: summarize(timings) for name, timings in stages.items()},
+    }
+
+
+def run_suite(sizes, repeats=50, llm_latency_ms=0.0, seed=0, isolate=True, log=print):
+    """
+    Exécute le benchmark pour plusieurs tailles de catalogue.
+
+    Args:
+        sizes (list): Tailles de catalogue
+        repeats (int): Mesures par étape
+        llm_latency_ms (float): Latence simulée de Pixtral
+        seed (int): Graine aléatoire
+        isolate (bool): Une taille par processus neuf (pic de mémoire propre à chaque taille)
+        log (callable): Affichage de la progression
+
+    Returns:
+        dict: 'meta' (commit, machine, paramètres) et 'results' par taille
+    """
+    results = {}
+    for n_rows in sizes:
+        log(f"Catalogue de {n_rows} articles...")
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[str(n_rows)] = pool.submit(run_catalog_benchmark, n_rows, repeats, llm_latency_ms, seed).result()
+        else:
+            results[str(n_rows)] = run_catalog_benchmark(n_rows, repeats, llm_latency_ms, seed)
+    return {"meta": run_metadata(repeats=repeats, llm_latency_ms=llm_latency_ms, seed=seed), "results": results}
+
+
+def run_metadata(**parameters):
+    """Contexte d'exécution enregistré avec les résultats."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "parameters": parameters,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2, metric="p50_ms"):
+    """
+    Compare deux exécutions du benchmark.
+
+    Args:
+        baseline (dict): Résultats de référence
+        current (dict): Nouveaux résultats
+        threshold (float): Dégradation relative tolérée (0.2 : +20 %)
+        metric (str): Statistique de latence comparée
+
+    Returns:
+        list: Comparaisons (taille, étape, avant, après, ratio, régression) des mesures communes
+    """
+    rows = []
+    for size, result in current["results"].items():
+        before = baseline["results"].get(size)
+        if before is None:
+            continue
+        for stage, stats in result["stages"].items():
+            if stage in before["stages"]:
+                rows.append(_comparison(size, stage, before["stages"][stage][metric], stats[metric], threshold))
+        rows.append(_comparison(size, "peak_rss_mb", before["peak_rss_mb"], result["peak_rss_mb"], threshold))
+    return rows
+
+
+def _comparison(size, name, before, after, threshold):
+    ratio = after / before if before else float("inf")
+    return {"size": size, "name": name, "before": before, "after": after, "ratio": ratio, "regression": ratio > 1 + threshold}
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+import httpx
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_images(paths):
+    """
+    Lit les images à envoyer.
+
+    Args:
+        paths (list): Fichiers ou dossiers d'images
+
+    Returns:
+        list: (nom de fichier, octets)
+    """
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    with open(os.path.join(path, name), "rb") as f:
+                        images.append((name, f.read()))
+        else:
+            with open(path, "rb") as f:
+                images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def parse_server_timing(header):
+    """
+    Durées d'un en-tête Server-Timing ("match;dur=12.3, llm;dur=840").
+
+    Returns:
+        dict: Étape -> durée (ms)
+    """
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+def summarize(samples_ms):
+    """p50/p95/p99 et moyenne d'une liste de latences (ms)."""
+    if not samples_ms:
+        return None
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(len(samples)),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+class LoadTest:
+    """
+    Générateur de charge pour /analyze et /analyze/stream.
+
+    Deux modes : concurrence fixe (boucle fermée, N clients qui renvoient une requête
+    dès la réponse reçue) ou débit d'arrivée (boucle ouverte, arrivées de Poisson,
+    indépendantes des temps de réponse). Les étapes mesurées sont 'total', les durées
+    annoncées par le serveur (Server-Timing) et, en streaming, 'match' (résultat de la
+    recherche) et 'first_token' (premier morceau de l'analyse).
+    """
+
+    def __init__(self, base_url, images, endpoint="analyze", timeout=120.0, max_in_flight=1024):
+        """
+        Args:
+            base_url (str): URL du serveur (ex. http://localhost:8000)
+            images (list): (nom de fichier, octets) envoyés à tour de rôle
+            endpoint (str): 'analyze' ou 'analyze/stream'
+            timeout (float): Délai maximal d'une requête (s)
+            max_in_flight (int): Requêtes simultanées maximum en boucle ouverte
+        """
+        self.url = base_url.rstrip("/") + "/" + endpoint.strip("/")
+        self.images = images
+        self.stream = endpoint.strip("/") == "analyze/stream"
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self._next_image = 0
+
+    def _image(self):
+        name, data = self.images[self._next_image % len(self.images)]
+        self._next_image += 1
+        return name, data
+
+    async def _send(self, client):
+        """
+        Envoie une requête.
+
+        Returns:
+            dict: 'ok', 'error' et durées par étape (ms)
+        """
+        name, data = self._image()
+        files = {"image": (name, data, "image/jpeg")}
+        start = time.perf_counter()
+        stages = {}
+        try:
+            if self.stream:
+                error = await self._send_stream(client, files, start, stages)
+            else:
+                response = await client.post(self.url, files=files)
+                stages.update(parse_server_timing(response.headers.get("Server-Timing")))
+                error = self._response_error(response)
+        except (httpx.HTTPError, ValueError) as e:
+            # Erreur réseau, délai dépassé ou réponse illisible
+            error = type(e).__name__
+        stages["total"] = (time.perf_counter() - start) * 1000
+        return {"ok": error is None, "error": error, "stages": stages}
+
+    async def _send_stream(self, client, files, start, stages):
+        error = "flux interrompu"
+        async with client.stream("POST", self.url, files=files) as response:
+            if response.status_code != 200:
+                return f"HTTP {response.status_code}"
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                elapsed = (time.perf_counter() - start) * 1000
+                if event["type"] == "match":
+                    stages["match"] = elapsed
+                elif event["type"] == "delta":
+                    stages.setdefault("first_token", elapsed)
+                elif event["type"] == "done":
+                    error = self._message_error(event["message"])
+                elif event["type"] == "error":
+                    error = "erreur applicative"
+        return error
+
+    def _response_error(self, response):
+        if response.status_code != 200:
+            return f"HTTP {response.status_code}"
+        return self._message_error(response.json().get("message"))
+
+    @staticmethod
+    def _message_error(message):
+        # Les erreurs de traitement et de Pixtral sont renvoyées en 200 avec un message texte
+        if isinstance(message, str) and message.startswith("Erreur"):
+            return "erreur applicative"
+        if isinstance(message, dict) and str(message.get("bot_response", "")).startswith("Erreur"):
+            return "erreur LLM"
+        return None
+
+    async def run_closed_loop(self, concurrency, duration_s):
+        """Concurrence fixe pendant `duration_s` secondes ; retourne les résultats bruts."""
+        results = []
+        deadline = time.perf_counter() + duration_s
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+
+            async def _client():
+                while time.perf_counter() < deadline:
+                    results.append(await self._send(client))
+
+            await asyncio.gather(*[_client() for _ in range(concurrency)])
+        return results
+
+    async def run_open_loop(self, rate, duration_s, seed=0):
+        """Arrivées de Poisson à `rate` requêtes/s pendant `duration_s` secondes."""
+        results = []
+        rng = random.Random(seed)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        limits = httpx.Limits(max_connections=self.max_in_flight)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+
+            async def _one():
+                try:
+                    results.append(await self._send(client))
+                finally:
+                    in_flight.release()
+
+            tasks = []
+            start = time.perf_counter()
+            next_arrival = start
+            while next_arrival < start + duration_s:
+                await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+                await in_flight.acquire()
+                tasks.append(asyncio.create_task(_one()))
+                next_arrival += rng.expovariate(rate)
+            await asyncio.gather(*tasks)
+        return results
+
+    async def run(self, duration_s, concurrency=None, rate=None):
+        """
+        Exécute un palier de charge.
+
+        Returns:
+            dict: Paramètres, débit, taux d'erreur, erreurs par type et distribution par étape
+        """
+        start = time.perf_counter()
+        if rate:
+            results = await self.run_open_loop(rate, duration_s)
+        else:
+            results = await self.run_closed_loop(concurrency, duration_s)
+        return report(results, time.perf_counter() - start, concurrency=concurrency, rate=rate)
+
+
+def report(results, elapsed_s, **parameters):
+    """Agrège les résultats bruts d'un palier."""
+    ok = [result for result in results if result["ok"]]
+    errors = {}
+    for result in results:
+        if not result["ok"]:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+
+    stage_names = sorted({name for result in ok for name in result["stages"]})
+    return {
+        **parameters,
+        "requests": len(results),
+        "elapsed_s": elapsed_s,
+        "throughput_rps": len(ok) / elapsed_s if elapsed_s else 0.0,
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "errors": errors,
+        "stages": {
+            name: summarize([result["stages"][name] for result in ok if name in result["stages"]])
+            for name in stage_names
+        },
+    }
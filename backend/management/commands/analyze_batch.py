@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import backend.models.config as config
+from backend import registry
+from backend.batch_analysis import BatchAnalyzer, load_inputs
+
+
+class Command(BaseCommand):
+    help = "Analyse un dossier d'images, une liste de chemins/URLs ou un JSONL d'URLs ; résultats en JSONL, reprise possible."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Dossier d'images, fichier texte (un chemin ou une URL par ligne) ou JSONL")
+        parser.add_argument("--output", required=True, help="Fichier JSONL des résultats (complété s'il existe déjà)")
+        parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE, help="Images par lot d'inférence")
+        parser.add_argument("--processes", type=int, default=None, help="Processus de prétraitement (défaut : tous les cœurs)")
+        parser.add_argument("--llm-concurrency", type=int, default=config.BATCH_LLM_CONCURRENCY, help="Appels LLM simultanés")
+        parser.add_argument("--llm-rpm", type=float, default=config.BATCH_LLM_RATE_PER_MINUTE, help="Appels LLM par minute (0 : illimité)")
+        parser.add_argument("--no-llm", action="store_true", help="Recherche seule, sans analyse Pixtral")
+        parser.add_argument("--top-k", type=int, default=15, help="Correspondances retenues par image")
+
+    def handle(self, *args, **options):
+        try:
+            items = load_inputs(options["source"])
+        except OSError as e:
+            raise CommandError(f"Source illisible : {e}")
+        self.stdout.write(f"{len(items)} images à analyser")
+
+        analyzer = BatchAnalyzer(
+            registry.get_app(),
+            batch_size=options["batch_size"],
+            processes=options["processes"],
+            with_llm=not options["no_llm"],
+            llm_concurrency=options["llm_concurrency"],
+            llm_rate_per_minute=options["llm_rpm"],
+            top_k=options["top_k"],
+            # Hors ligne : --llm-concurrency et --llm-rpm bornent les appels, sans la file des requêtes web
+            admit_llm=False,
+        )
+
+        start = time.perf_counter()
+        progress = {"n": 0}
+
+        def on_result(record):
+            progress["n"] += 1
+            if progress["n"] % 100 == 0:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{progress['n']} résultats en {elapsed:.0f} s ({progress['n'] / elapsed:.1f} images/s)")
+
+        counts = asyncio.run(analyzer.run(items, options["output"], on_result=on_result))
+        self.stdout.write(
+            f"Terminé en {time.perf_counter() - start:.1f} s : {counts['ok']} réussies, "
+            f"{counts['error']} en erreur, {counts['skipped']} déjà faites"
+        )
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.benchmarks import STAGES, compare_results, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark hors ligne de chaque étape de l'analyse sur des catalogues synthétiques "
+        "(Pixtral simulé) ; résultats JSON comparables entre deux commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Tailles de catalogue")
+        parser.add_argument("--repeats", type=int, default=50, help="Mesures par étape")
+        parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latence simulée de Pixtral")
+        parser.add_argument("--seed", type=int, default=0, help="Graine des données synthétiques")
+        parser.add_argument("--no-isolate", action="store_true", help="Toutes les tailles dans ce processus")
+        parser.add_argument("--output", default=None, help="Fichier JSON des résultats")
+        parser.add_argument("--compare", default=None, help="Résultats de référence (JSON) à comparer")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Dégradation relative tolérée (0.2 : +20 %%)")
+        parser.add_argument("--metric", default="p50_ms", help="Statistique de latence comparée (p50_ms, p95_ms, mean_ms...)")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        report = run_suite(
+            sizes,
+            repeats=options["repeats"],
+            llm_latency_ms=options["llm_latency_ms"],
+            seed=options["seed"],
+            isolate=not options["no_isolate"],
+            log=self.stdout.write,
+        )
+
+        for size, result in report["results"].items():
+            self.stdout.write(
+                f"\n{size} articles (dim {result['dim']}) : construction {result['build_s']:.1f} s, "
+                f"pic RSS {result['peak_rss_mb']:.0f} Mo"
+            )
+            for stage in STAGES:
+                stats = result["stages"][stage]
+                self.stdout.write(
+                    f"  {stage:<24} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                    f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_ops']:9.1f} ops/s"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"\nRésultats écrits dans {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            rows = compare_results(baseline, report, threshold=options["threshold"], metric=options["metric"])
+            self.stdout.write(f"\nComparaison avec {options['compare']} (commit {baseline['meta'].get('commit')}) :")
+            for row in rows:
+                flag = "RÉGRESSION" if row["regression"] else ""
+                self.stdout.write(
+                    f"  {row['size']:>8} {row['name']:<24} {row['before']:10.3f} -> {row['after']:10.3f} "
+                    f"({row['ratio']:.2f}x) {flag}"
+                )
+            regressions = [row for row in rows if row["regression"]]
+            if regressions:
+                raise CommandError(f"{len(regressions)} régression(s) au-delà de +{options['threshold']:.0%}")
+            self.stdout.write(self.style.SUCCESS("Aucune régression"))
@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+import backend.models.config as config
+from backend.models.ann_index import IVFIndex, recall_at_k
+from backend.models.embedding_index import EmbeddingIndex, index_fingerprint
+from backend.models.outfit_index import outfit_representative_rows
+
+
+class Command(BaseCommand):
+    help = "Construit l'index IVF du catalogue, le sauvegarde et mesure son rappel@k face à la recherche exacte."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=config.DATASET_PATH, help="Chemin du dataset pickle")
+        parser.add_argument("--output", default=config.IVF_INDEX_PATH, help="Dossier de sortie de l'index")
+        parser.add_argument("--nlists", type=int, default=config.IVF_N_LISTS, help="Nombre de listes (défaut ~4·√N)")
+        parser.add_argument("--nprobe", type=int, default=config.IVF_NPROBE, help="nprobe enregistré avec l'index")
+        parser.add_argument("--sweep", default="1,2,4,8,16,32", help="Valeurs de nprobe à évaluer")
+        parser.add_argument("--k", type=int, default=15, help="k du rappel@k")
+        parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes d'évaluation")
+        parser.add_argument("--noise", type=float, default=0.1, help="Bruit relatif ajouté aux requêtes tirées du catalogue")
+
+    def handle(self, *args, **options):
+        dataset = pd.read_pickle(options["dataset"])
+        # Mêmes lignes que l'application, pour que l'empreinte de l'index corresponde
+        exact = EmbeddingIndex.from_dataframe(
+            dataset, rows=outfit_representative_rows(dataset) if config.DEDUPE_OUTFITS else None
+        )
+        del dataset
+        self.stdout.write(f"{len(exact)} vecteurs de dimension {exact.dim}")
+
+        start = time.perf_counter()
+        ivf = IVFIndex.from_exact(exact, n_lists=options["nlists"], nprobe=options["nprobe"])
+        ivf.fingerprint = index_fingerprint(exact.row_ids, options["dataset"], n_lists=options["nlists"])
+        self.stdout.write(f"Index IVF : {ivf.n_lists} listes construit en {time.perf_counter() - start:.1f} s")
+        ivf.save(options["output"])
+        self.stdout.write(f"Sauvegardé dans {options['output']}")
+
+        # Requêtes d'évaluation : vecteurs du catalogue légèrement bruités
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(exact), min(options["queries"], len(exact)), replace=False)
+        queries = exact.vectors[picks] + options["noise"] * rng.standard_normal((len(picks), exact.dim)).astype(np.float32) / np.sqrt(exact.dim)
+
+        k = options["k"]
+        exact_ms = self._latency_ms(lambda q: exact.search_one(q, k), queries)
+        self.stdout.write(f"exact           : {exact_ms:.3f} ms/requête")
+        for nprobe in [int(v) for v in options["sweep"].split(",")]:
+            recall = recall_at_k(ivf, exact, queries, k, nprobe=nprobe)
+            ivf_ms = self._latency_ms(lambda q: ivf.search_one(q, k, nprobe=nprobe), queries)
+            self.stdout.write(f"nprobe={nprobe:<4}     : {ivf_ms:.3f} ms/requête, rappel@{k} = {recall:.3f}")
+
+    @staticmethod
+    def _latency_ms(search, queries):
+        start = time.perf_counter()
+        for query in queries:
+            search(query)
+        return (time.perf_counter() - start) * 1000 / len(queries)
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+import backend.models.config as config
+from backend.models.catalog import convert_dataset
+from backend.models.catalog_builder import CatalogBuilder, read_items
+from backend.models.image_processor import ImageProcessor
+
+
+class Command(BaseCommand):
+    help = "Construit (ou met à jour) le dataset d'embeddings du catalogue ; seules les images nouvelles ou modifiées sont encodées."
+
+    def add_arguments(self, parser):
+        parser.add_argument("items", help="Articles du catalogue (CSV, Parquet, JSONL ou pickle) avec 'Item Name', 'Price', 'Link', 'Image URL'")
+        parser.add_argument("--output", default=config.DATASET_PATH, help="Dataset pickle à écrire (réutilisé s'il existe)")
+        parser.add_argument("--cache-dir", default=config.IMAGE_CACHE_DIR, help="Cache disque des images téléchargées")
+        parser.add_argument("--workers", type=int, default=config.HTTP_POOL_SIZE, help="Téléchargements simultanés")
+        parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE, help="Images par lot d'inférence")
+        parser.add_argument("--no-refresh", action="store_true", help="Ne pas revalider les images déjà en cache")
+        parser.add_argument("--catalog", default=None, help="Écrire aussi le catalogue columnaire dans ce dossier")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["items"]):
+            raise CommandError(f"Fichier des articles introuvable : {options['items']}")
+        items = read_items(options["items"])
+        missing = {'Item Name', 'Price', 'Link', 'Image URL'} - set(items.columns)
+        if missing:
+            raise CommandError(f"Colonnes manquantes : {', '.join(sorted(missing))}")
+
+        output = options["output"]
+        previous = pd.read_pickle(output) if os.path.exists(output) else None
+
+        start = time.perf_counter()
+        builder = CatalogBuilder(
+            ImageProcessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD),
+            cache_dir=options["cache_dir"],
+            manifest_path=output + ".manifest.json",
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            refresh=not options["no_refresh"],
+            model_id=f"{config.VISION_MODEL_ID}-{config.VISION_MODEL_WEIGHTS}-{config.VISION_MODEL_VARIANT}",
+        )
+        dataset, stats = builder.build(items, previous_dataset=previous, log=self.stdout.write)
+
+        tmp_path = output + ".tmp"
+        dataset.to_pickle(tmp_path)
+        os.replace(tmp_path, output)
+        self.stdout.write(
+            f"{stats['rows']} articles, {stats['images']} images : {stats['unchanged']} réutilisées, "
+            f"{stats['embedded']} encodées, {stats['stale']} conservées malgré une erreur de téléchargement, "
+            f"{stats['failed']} en erreur ; écrit dans {output} "
+            f"en {time.perf_counter() - start:.1f} s"
+        )
+
+        if options["catalog"]:
+            convert_dataset(dataset, options["catalog"])
+            self.stdout.write(f"Catalogue columnaire écrit dans {options['catalog']}")
@@ -0,0 +1,58 @@
+import base64
+import os
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+import backend.models.config as config
+from backend import registry
+from backend.models.catalog import Catalog, is_catalog
+from backend.models.preprocessing import ImagePreprocessor
+from backend.models.reranking import COLOR_BINS, color_histogram
+
+
+class Command(BaseCommand):
+    help = "Précalcule l'histogramme couleur de chaque ligne du catalogue pour le second étage de recherche."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=None, help="Catalogue columnaire ou dataset pickle (défaut : celui de l'application)")
+        parser.add_argument("--output", default=config.RERANK_COLOR_HISTOGRAMS, help="Fichier .npy de sortie")
+
+    def handle(self, *args, **options):
+        source = options["dataset"] or registry.dataset_source()
+        if is_catalog(source):
+            catalog = Catalog.load(source)
+            urls = catalog.metadata['Image URL'].to_numpy()
+            read_image = catalog.image_bytes
+        else:
+            dataset = pd.read_pickle(source)
+            urls = dataset['Image URL'].to_numpy()
+            encoded = dataset['Encoded Image'].to_numpy()
+            read_image = lambda row: base64.b64decode(encoded[row]) if isinstance(encoded[row], str) else b""
+
+        # Même chemin que les requêtes : réduction à la taille cible, puis histogramme
+        preprocessor = ImagePreprocessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+        histograms = np.zeros((len(urls), int(np.prod(COLOR_BINS))), dtype=np.float32)
+        # Les articles d'une tenue partagent la même image : un calcul par URL
+        by_url = {}
+        missing = 0
+        start = time.perf_counter()
+        for row, url in enumerate(urls):
+            if url not in by_url:
+                raw = read_image(row)
+                by_url[url] = color_histogram(preprocessor.resize(Image.open(BytesIO(raw)))) if raw else None
+            if by_url[url] is None:
+                missing += 1
+            else:
+                histograms[row] = by_url[url]
+
+        os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+        np.save(options["output"], histograms)
+        self.stdout.write(
+            f"{len(urls)} lignes ({len(by_url)} images, {missing} sans image) en {time.perf_counter() - start:.1f} s : "
+            f"{options['output']}"
+        )
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+import backend.models.config as config
+from backend import registry
+from backend.models.ann_index import recall_at_k
+from backend.models.catalog import Catalog, is_catalog, vectors_file
+from backend.models.embedding_index import EmbeddingIndex, index_fingerprint
+from backend.models.outfit_index import outfit_representative_rows
+from backend.models.pq_index import PQIndex
+
+
+class Command(BaseCommand):
+    help = "Construit l'index PQ (vecteurs compressés) du catalogue, le sauvegarde et mesure mémoire et rappel@k face à la recherche exacte."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=None, help="Catalogue columnaire ou dataset pickle (défaut : celui de l'application)")
+        parser.add_argument("--output", default=config.PQ_INDEX_PATH, help="Dossier de sortie de l'index")
+        parser.add_argument("--subvector-dim", type=int, default=config.PQ_SUBVECTOR_DIM, help="Dimension d'un sous-vecteur")
+        parser.add_argument("--rerank", type=int, default=config.PQ_RERANK, help="Réévaluation enregistrée avec l'index")
+        parser.add_argument("--sweep", default="0,1,2,4,8", help="Valeurs de réévaluation à évaluer")
+        parser.add_argument("--k", type=int, default=15, help="k du rappel@k")
+        parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes d'évaluation")
+        parser.add_argument("--noise", type=float, default=0.1, help="Bruit relatif ajouté aux requêtes tirées du catalogue")
+
+    def handle(self, *args, **options):
+        source = options["dataset"] or registry.dataset_source()
+        if is_catalog(source):
+            exact = Catalog.load(source).exact_index()
+        else:
+            dataset = pd.read_pickle(source)
+            # Mêmes lignes que l'application, pour que l'empreinte de l'index corresponde
+            exact = EmbeddingIndex.from_dataframe(
+                dataset, rows=outfit_representative_rows(dataset) if config.DEDUPE_OUTFITS else None
+            )
+            del dataset
+        self.stdout.write(f"{len(exact)} vecteurs de dimension {exact.dim}")
+
+        start = time.perf_counter()
+        built = PQIndex.from_exact(exact, subvector_dim=options["subvector_dim"], rerank=options["rerank"])
+        built.fingerprint = index_fingerprint(exact.row_ids, vectors_file(source), subvector_dim=options["subvector_dim"])
+        built.save(options["output"])
+        pq = PQIndex.load(options["output"])
+        self.stdout.write(
+            f"Index PQ : {pq.n_subspaces} sous-espaces de dimension {pq.subvector_dim} "
+            f"construit en {time.perf_counter() - start:.1f} s, sauvegardé dans {options['output']}"
+        )
+
+        float_bytes = len(exact) * exact.dim * 4
+        self.stdout.write(
+            f"Mémoire : {float_bytes / 1e6:.1f} Mo en float32, {pq.memory_bytes() / 1e6:.1f} Mo en PQ "
+            f"({float_bytes / pq.memory_bytes():.1f}x moins)"
+        )
+
+        # Requêtes d'évaluation : vecteurs du catalogue légèrement bruités
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(exact), min(options["queries"], len(exact)), replace=False)
+        queries = np.asarray(exact.vectors[np.sort(picks)], dtype=np.float32)
+        queries += options["noise"] * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(exact.dim)
+
+        k = options["k"]
+        exact_ms = self._latency_ms(lambda q: exact.search_one(q, k), queries)
+        self.stdout.write(f"exact           : {exact_ms:.3f} ms/requête")
+        for rerank in [int(v) for v in options["sweep"].split(",")]:
+            recall = recall_at_k(pq, exact, queries, k, rerank=rerank)
+            pq_ms = self._latency_ms(lambda q: pq.search_one(q, k, rerank=rerank), queries)
+            self.stdout.write(f"rerank={rerank:<4}     : {pq_ms:.3f} ms/requête, rappel@{k} = {recall:.3f}")
+
+    @staticmethod
+    def _latency_ms(search, queries):
+        start = time.perf_counter()
+        for query in queries:
+            search(query)
+        return (time.perf_counter() - start) * 1000 / len(queries)
@@ -0,0 +1,52 @@
+import glob
+import os
+import time
+
+import numpy as np
+import torchvision.transforms as transforms
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+import backend.models.config as config
+from backend.models.preprocessing import ImagePreprocessor
+
+
+class Command(BaseCommand):
+    help = "Compare le prétraitement PIL/NumPy à la chaîne torchvision (écarts et durée par image)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="*", help="Images à comparer (défaut : static/*.jpg, static/*.png)")
+        parser.add_argument("--tolerance", type=float, default=0.05, help="Écart absolu moyen accepté avec réduction au décodage")
+
+    def handle(self, *args, **options):
+        paths = options["images"] or sorted(glob.glob("static/*.jpg") + glob.glob("static/*.png"))
+        reference = transforms.Compose([
+            transforms.Resize(config.IMAGE_SIZE),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=config.NORMALIZATION_MEAN, std=config.NORMALIZATION_STD),
+        ])
+        preprocessor = ImagePreprocessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+
+        failures = 0
+        for path in paths:
+            start = time.perf_counter()
+            expected = reference(Image.open(path).convert("RGB")).numpy()
+            torch_ms = (time.perf_counter() - start) * 1000
+
+            # Image déjà décodée : mêmes pixels que torchvision
+            same_decode = preprocessor.preprocess(Image.open(path).convert("RGB"))
+            start = time.perf_counter()
+            drafted = preprocessor.preprocess(Image.open(path))
+            numpy_ms = (time.perf_counter() - start) * 1000
+
+            exact_diff = float(np.abs(same_decode - expected).max())
+            draft_diff = float(np.abs(drafted - expected).mean())
+            failures += exact_diff > 1e-4 or draft_diff > options["tolerance"]
+            self.stdout.write(
+                f"{os.path.basename(path)}: écart max {exact_diff:.2e} (même décodage), "
+                f"écart moyen {draft_diff:.3f} (réduction au décodage) ; {torch_ms:.1f} ms -> {numpy_ms:.1f} ms"
+            )
+
+        if failures:
+            # Code de sortie non nul : la commande peut servir de contrôle en CI
+            raise CommandError(f"{failures} image(s) hors tolérance")
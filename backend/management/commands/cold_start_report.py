@@ -0,0 +1,87 @@
+import json
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# Exécuté dans un interpréteur neuf, comme au démarrage d'un conteneur
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.app
+from backend import registry
+imported = time.perf_counter()
+if not {imports_only}:
+    registry.get_app()
+ready = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "load_s": ready - imported,
+    "total_s": ready - start,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+# Dépendances qui ne doivent pas être importées en mode ONNX
+HEAVY = ("torch", "torchvision", "sklearn", "huggingface_hub")
+
+
+def parse_importtime(stderr):
+    """
+    Extrait les temps d'import cumulés de la sortie `python -X importtime`.
+
+    Returns:
+        dict: Module -> temps cumulé en µs (modules de premier niveau de chaque import)
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative_us = int(parts[1])
+        except ValueError:
+            # Ligne d'en-tête
+            continue
+        cumulative[parts[2].strip()] = cumulative_us
+    return cumulative
+
+
+class Command(BaseCommand):
+    help = "Mesure le démarrage à froid : temps d'import par module, chargement de l'application et modules lourds importés."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Nombre de modules les plus lents à afficher")
+        parser.add_argument("--imports-only", action="store_true", help="Ne mesure que les imports, sans charger le dataset ni le modèle")
+        parser.add_argument("--budget", type=float, default=None, help="Budget en secondes ; erreur si le démarrage le dépasse")
+
+    def handle(self, *args, **options):
+        probe = PROBE.format(imports_only=options["imports_only"], heavy=HEAVY)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            self.stderr.write(result.stderr[-2000:])
+            raise SystemExit(result.returncode)
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        cumulative = parse_importtime(result.stderr)
+        # Modules de premier niveau uniquement : les sous-modules sont inclus dans leur parent
+        top_level = {name: us for name, us in cumulative.items() if "." not in name}
+        slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:options["top"]]
+
+        self.stdout.write(f"Imports       : {timings['import_s']:.2f} s")
+        if not options["imports_only"]:
+            self.stdout.write(f"Chargement    : {timings['load_s']:.2f} s")
+        self.stdout.write(f"Prêt après    : {timings['total_s']:.2f} s")
+        heavy = timings["heavy_modules"]
+        self.stdout.write(f"Modules lourds: {', '.join(heavy) if heavy else 'aucun'}")
+        self.stdout.write("Imports les plus lents (cumulé) :")
+        for name, us in slowest:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {name}")
+
+        if options["budget"] is not None and timings["total_s"] > options["budget"]:
+            self.stderr.write(f"Budget dépassé : {timings['total_s']:.2f} s > {options['budget']:.2f} s")
+            raise SystemExit(1)
@@ -0,0 +1,62 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+import backend.models.config as config
+from backend import registry
+from backend.app import StyleFinderApp
+from backend.models.image_processor import ImageProcessor
+from backend.models.quantization import compare_embeddings, measure_latency, preprocess_images, sample_catalog_images
+
+
+class Command(BaseCommand):
+    help = "Compare les variantes du modèle à fp32 : latence, débit, accord cosinus des embeddings et recouvrement top-k sur le catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=None, help="Catalogue ou dataset pickle (défaut : celui de l'application)")
+        parser.add_argument("--images", type=int, default=128, help="Images du catalogue utilisées pour la comparaison")
+        parser.add_argument("--k", type=int, default=15, help="k du recouvrement top-k")
+        parser.add_argument("--repeats", type=int, default=20, help="Mesures de latence unitaire")
+
+    def handle(self, *args, **options):
+        source = options["dataset"] or registry.dataset_source()
+        images = sample_catalog_images(source, n=options["images"], seed=1)
+        if not images:
+            raise CommandError("Aucune image dans le dataset")
+
+        app = StyleFinderApp(source)
+        search_index = app.image_processor.get_index(app.data, index='exact')
+        batch = preprocess_images(app.image_processor.preprocessor, images)
+
+        k = options["k"]
+        reference = None
+        self.stdout.write(f"{len(images)} images, index de {len(search_index)} vecteurs")
+        for variant, filename in config.VISION_MODEL_VARIANTS.items():
+            path = os.path.join(os.path.dirname(app.image_processor.fp32_onnx_path), filename)
+            if not os.path.exists(path):
+                self.stdout.write(f"{variant:<13}: absente (manage.py quantize_model)")
+                continue
+            processor = ImageProcessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD, variant=variant)
+            timing = measure_latency(processor.run_onnx_batch, batch, repeats=options["repeats"])
+            embeddings = processor.run_onnx_batch(batch)
+            if processor.scheduler is not None:
+                processor.scheduler.close()
+            if reference is None:
+                reference = embeddings
+
+            line = (
+                f"{variant:<13}: {timing['latency_ms_mean']:6.1f} ms/image (p95 {timing['latency_ms_p95']:.1f}), "
+                f"{timing['throughput_ips']:6.1f} images/s, {os.path.getsize(path) / 1e6:.0f} Mo"
+            )
+            if variant != "fp32":
+                agreement = compare_embeddings(reference, embeddings, search_index, k=k)
+                line += (
+                    f" ; cosinus moyen {agreement['cosine_mean']:.4f} (min {agreement['cosine_min']:.4f}), "
+                    f"recouvrement@{k} {agreement[f'overlap@{k}']:.3f}, "
+                    f"top-1 identique {agreement['top1_agreement']:.1%}"
+                )
+            self.stdout.write(line)
+
+        app.executor.shutdown()
+        if app.image_processor.scheduler is not None:
+            app.image_processor.scheduler.close()
@@ -0,0 +1,30 @@
+import os
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+import backend.models.config as config
+from backend.models.catalog import convert_dataset
+
+
+class Command(BaseCommand):
+    help = "Convertit le dataset pickle en catalogue columnaire (embeddings .npy mappés, métadonnées Parquet, images à part)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=config.DATASET_PATH, help="Chemin du dataset pickle")
+        parser.add_argument("--output", default=config.CATALOG_PATH, help="Dossier du catalogue à écrire")
+        parser.add_argument("--keep-duplicates", action="store_true", help="Garder un embedding par article au lieu d'un par tenue")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["dataset"]):
+            raise CommandError(f"Fichier du dataset introuvable : {options['dataset']}")
+
+        start = time.perf_counter()
+        dataset = pd.read_pickle(options["dataset"])
+        manifest = convert_dataset(dataset, options["output"], dedupe_outfits=not options["keep_duplicates"])
+
+        self.stdout.write(
+            f"{manifest['n_rows']} lignes, {manifest['n_embeddings']} embeddings de dimension {manifest['dim']} "
+            f"écrits dans {options['output']} en {time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.benchmarks import synthetic_jpeg
+from backend.load_generator import LoadTest, load_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge de /analyze (ou /analyze/stream) à concurrence fixe ou à débit d'arrivée : "
+        "latences p50/p95/p99 par étape, débit et taux d'erreur par palier."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000", help="URL du serveur testé")
+        parser.add_argument("--endpoint", choices=("analyze", "analyze/stream"), default="analyze")
+        parser.add_argument("--images", nargs="*", default=[], help="Images ou dossiers envoyés (défaut : images synthétiques)")
+        parser.add_argument("--concurrency", default="1,2,4,8,16", help="Paliers de concurrence (boucle fermée)")
+        parser.add_argument("--rate", default=None, help="Paliers de débit en requêtes/s (boucle ouverte, remplace --concurrency)")
+        parser.add_argument("--duration", type=float, default=30.0, help="Durée de chaque palier (s)")
+        parser.add_argument("--timeout", type=float, default=120.0, help="Délai maximal d'une requête (s)")
+        parser.add_argument("--output", default=None, help="Fichier JSON des résultats")
+
+    def handle(self, *args, **options):
+        images = load_images(options["images"]) if options["images"] else [
+            (f"synthetic-{i}.jpg", synthetic_jpeg(seed=i)) for i in range(32)
+        ]
+        if not images:
+            raise CommandError("Aucune image à envoyer")
+        load_test = LoadTest(options["base_url"], images, endpoint=options["endpoint"], timeout=options["timeout"])
+
+        if options["rate"]:
+            levels = [("rate", float(value)) for value in options["rate"].split(",")]
+        else:
+            levels = [("concurrency", int(value)) for value in options["concurrency"].split(",")]
+
+        reports = []
+        for kind, value in levels:
+            self.stdout.write(f"{kind}={value} pendant {options['duration']:.0f} s...")
+            result = asyncio.run(load_test.run(options["duration"], **{kind: value}))
+            reports.append(result)
+            self.stdout.write(
+                f"  {result['requests']} requêtes, {result['throughput_rps']:.2f} req/s réussies, "
+                f"erreurs {result['error_rate']:.1%} {result['errors'] or ''}"
+            )
+            for stage, stats in result["stages"].items():
+                if stats:
+                    self.stdout.write(
+                        f"  {stage:<12} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                        f"p99 {stats['p99_ms']:8.1f} ms"
+                    )
+
+        best = max(reports, key=lambda result: result["throughput_rps"])
+        level = f"concurrence {best['concurrency']}" if best["concurrency"] else f"débit {best['rate']} req/s"
+        self.stdout.write(self.style.SUCCESS(f"Débit maximal : {best['throughput_rps']:.2f} req/s ({level})"))
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"endpoint": options["endpoint"], "base_url": options["base_url"], "levels": reports}, f, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
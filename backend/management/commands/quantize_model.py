@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import backend.models.config as config
+from backend import registry
+from backend.models.image_processor import ImageProcessor
+from backend.models.quantization import (
+    convert_fp16_model,
+    preprocess_images,
+    quantize_dynamic_model,
+    quantize_static_model,
+    sample_catalog_images,
+)
+
+
+class Command(BaseCommand):
+    help = "Produit les variantes FP16 et INT8 (dynamique, statique calibrée sur le catalogue) du modèle ConvNeXt ONNX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--variants", default="fp16,int8-dynamic,int8-static", help="Variantes à produire")
+        parser.add_argument("--dataset", default=None, help="Catalogue ou dataset pickle des images de calibration")
+        parser.add_argument("--calibration-size", type=int, default=200, help="Images de calibration (int8-static)")
+
+    def handle(self, *args, **options):
+        processor = ImageProcessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD, variant="fp32")
+        src_path = processor.fp32_onnx_path
+        models_dir = os.path.dirname(src_path)
+
+        for variant in [v.strip() for v in options["variants"].split(",") if v.strip()]:
+            if variant not in config.VISION_MODEL_VARIANTS or variant == "fp32":
+                raise CommandError(f"Variante inconnue : {variant}")
+            dst_path = os.path.join(models_dir, config.VISION_MODEL_VARIANTS[variant])
+            start = time.perf_counter()
+
+            if variant == "fp16":
+                convert_fp16_model(src_path, dst_path)
+            elif variant == "int8-dynamic":
+                quantize_dynamic_model(src_path, dst_path)
+            else:
+                images = sample_catalog_images(options["dataset"] or registry.dataset_source(), n=options["calibration_size"])
+                if not images:
+                    raise CommandError("Aucune image de calibration dans le dataset")
+                quantize_static_model(src_path, dst_path, preprocess_images(processor.preprocessor, images))
+
+            size_mb = os.path.getsize(dst_path) / 1e6
+            self.stdout.write(f"{variant:<13}: {dst_path} ({size_mb:.1f} Mo) en {time.perf_counter() - start:.1f} s")
+        self.stdout.write("Comparer les variantes : python manage.py compare_model_variants")
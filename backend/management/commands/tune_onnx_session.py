@@ -0,0 +1,126 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+import backend.models.config as config
+from backend.models.image_processor import ImageProcessor
+from backend.models.onnx_session import auto_profile, available_cores, create_session
+
+
+def candidate_profiles(workers):
+    """Profils essayés : threads intra-op autour de la part de chaque worker, optimisation, arène, mode."""
+    cores = available_cores()
+    share = max(1, cores // workers)
+    threads = sorted({t for t in (1, 2, 4, share // 2, share, share * 2) if 1 <= t <= cores})
+    profiles = []
+    for intra, optimization, arena in itertools.product(threads, ("extended", "all"), (True, False)):
+        profiles.append({
+            "intra_op_threads": intra,
+            "inter_op_threads": 1,
+            "execution_mode": "sequential",
+            "graph_optimization": optimization,
+            "mem_arena": arena,
+        })
+    profiles.append(dict(auto_profile(workers), execution_mode="parallel", inter_op_threads=2))
+    return profiles
+
+
+def benchmark_profile(model_path, profile, workers, batch_size, repeats):
+    """
+    Charge concurrente : une session par worker simulé, chacune dans son thread.
+
+    ONNX Runtime relâche le GIL et chaque session a ses propres pools de threads,
+    comme autant de processus workers qui se partagent les cœurs.
+
+    Returns:
+        dict: Latence moyenne et p95 d'un appel (ms), débit agrégé (images/s)
+    """
+    cache_dir = config.ONNX_OPTIMIZED_MODEL_DIR if config.ONNX_OPTIMIZED_MODEL_CACHE else None
+    sessions = [create_session(model_path, profile, cache_dir) for _ in range(workers)]
+    input_name = sessions[0].get_inputs()[0].name
+    batch = np.random.default_rng(0).standard_normal((batch_size, 3) + tuple(config.IMAGE_SIZE)).astype(np.float32)
+    for session in sessions:
+        session.run(None, {input_name: batch})
+
+    timings = [[] for _ in sessions]
+    barrier = threading.Barrier(workers)
+
+    def _worker(i):
+        barrier.wait()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            sessions[i].run(None, {input_name: batch})
+            timings[i].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_timings = np.concatenate(timings)
+    return {
+        "latency_ms_mean": float(all_timings.mean()),
+        "latency_ms_p95": float(np.percentile(all_timings, 95)),
+        "throughput_ips": workers * repeats * batch_size / elapsed,
+    }
+
+
+class Command(BaseCommand):
+    help = "Mesure des profils de session ONNX Runtime pour un nombre de workers et enregistre le meilleur (ONNX_PROFILE_PATH)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=config.WEB_CONCURRENCY, help="Workers servant l'application sur la machine")
+        parser.add_argument("--batch-size", type=int, default=1, help="Images par appel (1 : requêtes isolées)")
+        parser.add_argument("--repeats", type=int, default=30, help="Appels par worker simulé et par profil")
+        parser.add_argument("--objective", choices=("p95", "throughput"), default="p95", help="Critère de choix du profil")
+        parser.add_argument("--dry-run", action="store_true", help="Affiche le résultat sans écrire le profil")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        processor = ImageProcessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+        if processor.scheduler is not None:
+            processor.scheduler.close()
+        self.stdout.write(f"{processor.onnx_path} ({processor.variant}), {workers} workers, {available_cores()} cœurs")
+
+        results = []
+        for profile in candidate_profiles(workers):
+            timing = benchmark_profile(processor.onnx_path, profile, workers, options["batch_size"], options["repeats"])
+            results.append((profile, timing))
+            self.stdout.write(
+                f"intra={profile['intra_op_threads']:<3} inter={profile['inter_op_threads']} "
+                f"{profile['execution_mode']:<10} {profile['graph_optimization']:<8} "
+                f"arène={'oui' if profile['mem_arena'] else 'non'} : "
+                f"{timing['latency_ms_mean']:7.1f} ms (p95 {timing['latency_ms_p95']:7.1f}), "
+                f"{timing['throughput_ips']:7.1f} images/s"
+            )
+
+        if options["objective"] == "p95":
+            best, timing = min(results, key=lambda result: result[1]["latency_ms_p95"])
+        else:
+            best, timing = max(results, key=lambda result: result[1]["throughput_ips"])
+        self.stdout.write(self.style.SUCCESS(f"Meilleur profil : {best}"))
+        if options["dry_run"]:
+            return
+
+        record = {
+            "workers": workers,
+            "cores": available_cores(),
+            "model": os.path.basename(processor.onnx_path),
+            "objective": options["objective"],
+            "batch_size": options["batch_size"],
+            "profile": best,
+            "benchmark": timing,
+        }
+        tmp_path = config.ONNX_PROFILE_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, config.ONNX_PROFILE_PATH)
+        self.stdout.write(f"Profil écrit dans {config.ONNX_PROFILE_PATH} (WEB_CONCURRENCY={workers})")
@@ -0,0 +1,214 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes des histogrammes de durée (secondes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone, par combinaison d'étiquettes."""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes, par combinaison d'étiquettes."""
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("style_finder_stage_seconds", "Durée de chaque étape de l'analyse par requête.")
+REQUESTS = Counter("style_finder_requests_total", "Requêtes d'analyse par point d'entrée et statut.")
+ERRORS = Counter("style_finder_errors_total", "Erreurs par étape.")
+LLM_TOKENS = Counter("style_finder_llm_tokens_total", "Tokens consommés par les appels Pixtral.")
+TRACES = Counter("style_finder_traces_total", "Traces LangSmith échantillonnées, exportées, abandonnées ou en échec.")
+ADMISSION = Counter("style_finder_llm_admission_total", "Décisions du contrôle d'admission des appels Pixtral.")
+ADMISSION_WAIT_SECONDS = Histogram("style_finder_llm_queue_wait_seconds", "Attente des appels Pixtral admis (file et quota).")
+LLM_ROUTING = Counter("style_finder_llm_routing_total", "Appels Pixtral routés, par modèle gagnant et raison (repli, duplication).")
+LLM_CALL_SECONDS = Histogram("style_finder_llm_call_seconds", "Durée de chaque appel Pixtral, par modèle et issue.")
+
+METRICS = (
+    STAGE_SECONDS, REQUESTS, ERRORS, LLM_TOKENS, TRACES, ADMISSION, ADMISSION_WAIT_SECONDS, LLM_ROUTING,
+    LLM_CALL_SECONDS,
+)
+
+# Durées des étapes de la requête en cours (None hors requête)
+_request_timings = contextvars.ContextVar("style_finder_request_timings", default=None)
+
+
+def begin_request():
+    """
+    Démarre la mesure d'une requête dans le contexte courant.
+
+    Les étapes exécutées dans ce contexte (y compris dans un pool de threads lancé via
+    `run_in_context`) cumulent leurs durées dans le dictionnaire retourné.
+
+    Returns:
+        dict: Durées par étape (s), complétées au fil de la requête
+    """
+    timings = {}
+    _request_timings.set(timings)
+    timings["_start"] = time.perf_counter()
+    return timings
+
+
+def finish_request(timings, endpoint, status):
+    """
+    Enregistre les durées d'une requête terminée dans les histogrammes.
+
+    Returns:
+        dict: Durées par étape, 'total' compris (s)
+    """
+    start = timings.pop("_start", None)
+    if start is not None:
+        timings["total"] = time.perf_counter() - start
+    for name, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    return timings
+
+
+def run_in_context(function, *args):
+    """Appelable qui exécute `function` dans une copie du contexte courant (pour run_in_executor)."""
+    context = contextvars.copy_context()
+    return lambda: context.run(function, *args)
+
+
+@contextmanager
+def stage(name):
+    """
+    Chronomètre une étape.
+
+    Dans une requête, la durée est cumulée dans ses durées par étape (enregistrées à la fin
+    de la requête) ; hors requête (lots, commandes), elle est enregistrée directement.
+    Une exception levée dans l'étape est comptée dans les erreurs.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _request_timings.get()
+        if timings is None:
+            STAGE_SECONDS.observe(elapsed, stage=name)
+        else:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings):
+    """En-tête Server-Timing des durées d'une requête ("decode;dur=3.1, ...")."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items() if not name.startswith("_"))
+
+
+def _gauge_lines(name, documentation, values, label):
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name}{_format_labels([(label, key)])} {_format_value(value)}")
+    return lines
+
+
+def render(status=None):
+    """
+    Exposition texte au format Prometheus.
+
+    Args:
+        status (dict): État du registre (`registry.status()`) : ses compteurs de caches, de
+            micro-batching, d'admission et de routage sont exposés comme jauges
+
+    Returns:
+        str: Métriques du processus
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    status = status or {}
+    if "embedding_cache" in status:
+        lines.extend(_gauge_lines("style_finder_embedding_cache", "Cache des embeddings d'uploads.", status["embedding_cache"], "stat"))
+    if "llm_cache" in status:
+        lines.extend(_gauge_lines("style_finder_llm_cache", "Cache des analyses Pixtral.", status["llm_cache"], "stat"))
+    if "inference_batching" in status:
+        lines.extend(_gauge_lines("style_finder_inference_batching", "Regroupement des inférences ONNX.", status["inference_batching"], "stat"))
+    if "llm_admission" in status:
+        lines.extend(_gauge_lines("style_finder_llm_admission", "File et appels Pixtral en cours.", status["llm_admission"], "stat"))
+    if "llm_routing" in status:
+        lines.extend(_gauge_lines("style_finder_llm_routing", "Routage des appels Pixtral.", status["llm_routing"], "stat"))
+    if "state" in status:
+        lines.extend([
+            "# HELP style_finder_ready Application chargée et prête (1) ou non (0).",
+            "# TYPE style_finder_ready gauge",
+            f"style_finder_ready {1 if status['state'] == 'ready' else 0}",
+        ])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,259 @@
+import asyncio
+import collections
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import backend.models.config as config
+from backend import metrics
+
+
+class Overloaded(Exception):
+    """
+    Appel LLM refusé par le contrôle d'admission.
+
+    Attributes:
+        reason (str): 'queue_full', 'timeout' ou 'rate_limited'
+        status (int): Code HTTP à renvoyer (429 si le quota est atteint, 503 sinon)
+        retry_after (int): Délai conseillé avant de réessayer (s)
+    """
+
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        self.status = 429 if reason == "rate_limited" else 503
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"Service saturé ({reason}), réessayer dans {self.retry_after} s")
+
+
+class TokenBucket:
+    """Seau à jetons : `rate_per_minute` appels par minute en régime établi, rafales de `burst` appels."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_delay):
+        """
+        Réserve un jeton s'il est disponible d'ici `max_delay` secondes.
+
+        Returns:
+            tuple: (réservé, attente avant l'appel ou avant le prochain jeton libre, en s)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            delay = max(0.0, (1.0 - self.tokens) / self.rate)
+            if delay > max_delay:
+                return False, delay
+            # Le jeton est pris dès maintenant : les réservations suivantes attendent le leur
+            self.tokens -= 1.0
+            return True, delay
+
+
+class _Waiter:
+    """Requête en file : future de sa boucle, réveillée depuis n'importe quel thread."""
+
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        # Place attribuée (sous le verrou du contrôleur)
+        self.granted = False
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Contrôle d'admission des appels LLM d'un worker.
+
+    Au plus `max_in_flight` appels simultanés ; au-delà, les requêtes attendent dans une
+    file bornée (ordre d'arrivée) jusqu'à `queue_timeout_s`. Une file pleine, un délai
+    dépassé ou un quota épuisé pour ce délai lèvent `Overloaded` immédiatement, plutôt que
+    d'accumuler des requêtes jusqu'aux timeouts.
+
+    Le contrôleur est partagé par tout le processus : son état est protégé par un verrou et
+    chaque requête en attente est réveillée dans sa propre boucle. Sous ASGI, toutes les
+    vues d'un worker partagent une boucle ; sous WSGI (runserver), chaque vue asynchrone a
+    la sienne, dans son thread, et les places restent comptées pour le processus entier.
+    """
+
+    def __init__(
+            self, max_in_flight=8, max_queue=32, queue_timeout_s=10.0, rate_per_minute=0.0, burst=5, pool="llm"
+        ):
+        """
+        Args:
+            max_in_flight (int): Appels LLM simultanés maximum
+            max_queue (int): Requêtes en attente maximum (None : illimité)
+            queue_timeout_s (float): Attente maximale d'une requête, file et quota (None : sans limite)
+            rate_per_minute (float): Appels par minute autorisés (0 : illimité)
+            burst (int): Appels consécutifs tolérés au-dessus du débit
+            pool (str): Étiquette des métriques ('llm' : appels Pixtral du worker, 'batch' : analyses par lots)
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = math.inf if max_queue is None else max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.pool = pool
+        self.bucket = TokenBucket(rate_per_minute, burst) if rate_per_minute else None
+        self.in_flight = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+        # Durée moyenne d'un appel (moyenne mobile), pour estimer Retry-After
+        self._service_s = 1.0
+        self._outcomes = collections.Counter()
+
+    def saturated(self):
+        """La file est pleine : une nouvelle requête serait refusée."""
+        with self._lock:
+            return self._saturated()
+
+    def _saturated(self):
+        return self.in_flight >= self.max_in_flight and len(self._waiters) >= self.max_queue
+
+    def check(self):
+        """
+        Refus immédiat si la file est pleine, avant le travail qui précède l'appel LLM.
+
+        Raises:
+            Overloaded: File pleine
+        """
+        if self.saturated():
+            raise self._reject("queue_full", self.retry_after())
+
+    def retry_after(self):
+        """Estimation du temps d'écoulement de la file (s)."""
+        return (len(self._waiters) + 1) * self._service_s / max(1, self.max_in_flight)
+
+    def _reject(self, reason, retry_after):
+        with self._lock:
+            self._outcomes[reason] += 1
+        metrics.ADMISSION.inc(outcome=reason, pool=self.pool)
+        return Overloaded(reason, retry_after)
+
+    async def acquire(self, timeout=None):
+        """
+        Attend une place pour un appel LLM.
+
+        Args:
+            timeout (float): Attente maximale (défaut : queue_timeout_s ; None partout : sans limite)
+
+        Raises:
+            Overloaded: File pleine, délai dépassé ou quota épuisé pour ce délai
+        """
+        timeout = self.queue_timeout_s if timeout is None else timeout
+        start = time.monotonic()
+        waiter = None
+        with self._lock:
+            full = False
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+            elif len(self._waiters) < self.max_queue:
+                waiter = _Waiter(asyncio.get_running_loop())
+                self._waiters.append(waiter)
+            else:
+                full = True
+        if full:
+            raise self._reject("queue_full", self.retry_after())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._lock:
+                    granted = waiter.granted
+                    if not granted:
+                        self._waiters.remove(waiter)
+                if granted:
+                    # Place attribuée au moment de l'abandon : la rendre
+                    self.release()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._reject("timeout", self.retry_after()) from None
+                raise
+
+        if self.bucket is not None:
+            max_delay = math.inf if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            reserved, delay = self.bucket.reserve(max_delay)
+            if not reserved:
+                self.release()
+                raise self._reject("rate_limited", delay)
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    self.release()
+                    raise
+
+        with self._lock:
+            self._outcomes["admitted"] += 1
+        metrics.ADMISSION.inc(outcome="admitted", pool=self.pool)
+        metrics.ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start, pool=self.pool)
+
+    def release(self, service_s=None):
+        """
+        Libère une place, transmise directement à la plus ancienne requête en attente.
+
+        Appelable depuis n'importe quel thread : la requête est réveillée dans sa boucle.
+        """
+        with self._lock:
+            if service_s is not None:
+                self._service_s = 0.9 * self._service_s + 0.1 * service_s
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:
+                    # Boucle fermée : la requête n'attend plus
+                    continue
+                waiter.granted = True
+                return
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        """Contexte d'un appel LLM admis."""
+        await self.acquire(timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def metrics(self):
+        """Appels en cours, file d'attente et décisions d'admission."""
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue": None if math.isinf(self.max_queue) else self.max_queue,
+                "rate_tokens": self.bucket.tokens if self.bucket is not None else None,
+                "service_seconds": self._service_s,
+                **{f"{outcome}_total": count for outcome, count in self._outcomes.items()},
+            }
+
+
+def build_admission_controller():
+    """
+    Contrôleur configuré par config.LLM_* ; None si LLM_MAX_IN_FLIGHT vaut 0.
+
+    Le quota Mistral (LLM_RATE_PER_MINUTE) est partagé entre les WEB_CONCURRENCY workers.
+    """
+    if config.LLM_MAX_IN_FLIGHT <= 0:
+        return None
+    return AdmissionController(
+        max_in_flight=config.LLM_MAX_IN_FLIGHT,
+        max_queue=config.LLM_QUEUE_SIZE,
+        queue_timeout_s=config.LLM_QUEUE_TIMEOUT_S,
+        rate_per_minute=config.LLM_RATE_PER_MINUTE / max(1, config.WEB_CONCURRENCY),
+        burst=config.LLM_RATE_BURST,
+    )
@@ -0,0 +1,263 @@
+import json
+import os
+
+import numpy as np
+
+from backend.models.embedding_index import atomic_index_dir, normalize_rows, top_k_indices
+
+
+def assign_clusters(vectors, centroids, chunk_size=65536):
+    """
+    Affecte chaque vecteur (normalisé) au centroïde le plus proche en cosinus.
+
+    Args:
+        vectors (np.ndarray): Vecteurs normalisés [N, D]
+        centroids (np.ndarray): Centroïdes normalisés [K, D]
+        chunk_size (int): Nombre de vecteurs traités par bloc (borne la mémoire)
+
+    Returns:
+        np.ndarray: Numéro de cluster de chaque vecteur [N]
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors, n_clusters, n_iter=20, sample_size=100_000, seed=0):
+    """
+    K-means sphérique (similarité cosinus) en NumPy pur.
+
+    Args:
+        vectors (np.ndarray): Vecteurs normalisés [N, D]
+        n_clusters (int): Nombre de centroïdes
+        n_iter (int): Nombre d'itérations de Lloyd
+        sample_size (int): Taille de l'échantillon d'entraînement
+        seed (int): Graine aléatoire
+
+    Returns:
+        np.ndarray: Centroïdes normalisés [K, D]
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    if len(vectors) > sample_size:
+        train = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        train = vectors
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = assign_clusters(train, centroids)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        # Somme par cluster : tri par affectation puis réduction par segments
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(train[order], starts[filled], axis=0)
+        # Réinitialiser les clusters vides sur des points aléatoires
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Index approximatif IVF (inverted file) : un quantificateur grossier k-means
+    et une liste inversée par centroïde.
+
+    Les vecteurs sont rangés de façon contiguë par liste, si bien qu'une requête
+    ne calcule que `nprobe` produits matrice-vecteur sur des blocs contigus.
+    """
+
+    def __init__(self, centroids, offsets, vectors, row_ids, nprobe=8):
+        """
+        Args:
+            centroids (np.ndarray): Centroïdes normalisés [K, D]
+            offsets (np.ndarray): Début de chaque liste dans `vectors` [K + 1]
+            vectors (np.ndarray): Vecteurs normalisés triés par liste [N, D]
+            row_ids (np.ndarray): Position dans le dataset de chaque vecteur trié [N]
+            nprobe (int): Nombre de listes explorées par défaut
+        """
+        self.centroids = centroids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.row_ids = row_ids
+        self.nprobe = nprobe
+        # Empreinte des données indexées (voir embedding_index.index_fingerprint), enregistrée avec l'index
+        self.fingerprint = None
+
+    @classmethod
+    def build(cls, vectors, row_ids, n_lists=None, nprobe=8, n_iter=20, seed=0):
+        """
+        Entraîne le quantificateur et range les vecteurs dans les listes inversées.
+
+        Args:
+            vectors (np.ndarray): Vecteurs normalisés [N, D]
+            row_ids (np.ndarray): Position dans le dataset de chaque vecteur [N]
+            n_lists (int): Nombre de listes (par défaut ~4·√N)
+            nprobe (int): Nombre de listes explorées par défaut
+            n_iter (int): Itérations k-means
+            seed (int): Graine aléatoire
+
+        Returns:
+            IVFIndex: Index construit
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(len(vectors))))
+        centroids = spherical_kmeans(vectors, n_lists, n_iter=n_iter, seed=seed)
+        assignments = assign_clusters(vectors, centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=len(centroids))
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(
+            centroids=centroids,
+            offsets=offsets,
+            vectors=np.ascontiguousarray(vectors[order]),
+            row_ids=np.asarray(row_ids, dtype=np.int64)[order],
+            nprobe=nprobe,
+        )
+
+    @classmethod
+    def from_exact(cls, exact_index, **kwargs):
+        """Construit un IVFIndex à partir d'un EmbeddingIndex exact."""
+        return cls.build(exact_index.vectors, exact_index.row_ids, **kwargs)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def search_one(self, query, k, nprobe=None):
+        """
+        Recherche approximative des k plus proches voisins d'une requête.
+
+        Args:
+            query (np.ndarray): Vecteur requête [D]
+            k (int): Nombre de résultats
+            nprobe (int): Nombre de listes explorées (défaut : self.nprobe)
+
+        Returns:
+            tuple: (row_ids [<=k], scores [<=k]) triés par score décroissant
+        """
+        nprobe = nprobe or self.nprobe
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        probes = top_k_indices(self.centroids @ query, nprobe)
+
+        ids_blocks, score_blocks = [], []
+        for cluster in probes:
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if start == end:
+                continue
+            score_blocks.append(self.vectors[start:end] @ query)
+            ids_blocks.append(self.row_ids[start:end])
+        if not score_blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.concatenate(score_blocks)
+        ids = np.concatenate(ids_blocks)
+        top = top_k_indices(scores, k)
+        return ids[top], scores[top]
+
+    def search(self, queries, k, nprobe=None):
+        """
+        Recherche approximative pour plusieurs requêtes.
+
+        Args:
+            queries (np.ndarray): Vecteurs requêtes [Q, D]
+            k (int): Nombre de résultats par requête
+            nprobe (int): Nombre de listes explorées
+
+        Returns:
+            tuple: (row_ids [Q, k], scores [Q, k]) ; les cases vides valent -1 / -inf
+        """
+        queries = np.atleast_2d(queries)
+        all_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            ids, scores = self.search_one(query, k, nprobe=nprobe)
+            all_ids[i, :len(ids)] = ids
+            all_scores[i, :len(scores)] = scores
+        return all_ids, all_scores
+
+    def save(self, path):
+        """
+        Sauvegarde l'index dans un dossier (un fichier .npy par tableau), mis en place d'un bloc.
+
+        Args:
+            path (str): Dossier de destination
+        """
+        with atomic_index_dir(path) as tmp_path:
+            for name in ("centroids", "offsets", "vectors", "row_ids"):
+                np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({
+                    "type": "ivf",
+                    "nprobe": self.nprobe,
+                    "n_rows": len(self),
+                    "dim": int(self.vectors.shape[1]),
+                    "fingerprint": self.fingerprint,
+                }, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Charge un index sauvegardé avec `save`.
+
+        Args:
+            path (str): Dossier de l'index
+            mmap (bool): Mappe les vecteurs en mémoire au lieu de les lire
+
+        Returns:
+            IVFIndex: Index chargé
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("type") != "ivf":
+            raise ValueError(f"Le dossier {path} ne contient pas un index IVF")
+
+        def _load(name, mode=None):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        index = cls(
+            centroids=_load("centroids"),
+            offsets=_load("offsets"),
+            vectors=_load("vectors", "r" if mmap else None),
+            row_ids=_load("row_ids"),
+            nprobe=meta["nprobe"],
+        )
+        index.fingerprint = meta.get("fingerprint")
+        return index
+
+
+def recall_at_k(approx_index, exact_index, queries, k, **search_kwargs):
+    """
+    Mesure le rappel@k d'un index approximatif par rapport à la recherche exacte.
+
+    Args:
+        approx_index: Index approximatif exposant search(queries, k, ...)
+        exact_index (EmbeddingIndex): Index exact de référence
+        queries (np.ndarray): Vecteurs requêtes [Q, D]
+        k (int): Nombre de voisins comparés
+        **search_kwargs: Paramètres transmis à approx_index.search (nprobe, ...)
+
+    Returns:
+        float: Fraction moyenne des k vrais voisins retrouvés
+    """
+    exact_ids, _ = exact_index.search(queries, k)
+    approx_ids, _ = approx_index.search(queries, k, **search_kwargs)
+    hits = [
+        len(np.intersect1d(exact_row, approx_row[approx_row >= 0]))
+        for exact_row, approx_row in zip(exact_ids, approx_ids)
+    ]
+    return float(np.sum(hits)) / (len(queries) * min(k, len(exact_index)))
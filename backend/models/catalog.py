@@ -0,0 +1,166 @@
+import base64
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.models.embedding_index import EmbeddingIndex, normalize_rows
+from backend.models.outfit_index import outfit_representative_rows
+
+CATALOG_FORMAT_VERSION = 1
+
+# Colonnes utiles au chemin de requête
+METADATA_COLUMNS = ['Item Name', 'Price', 'Link', 'Image URL']
+
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDING_ROWS_FILE = "embedding_rows.npy"
+METADATA_FILE = "metadata.parquet"
+IMAGES_FILE = "images.bin"
+IMAGE_OFFSETS_FILE = "image_offsets.npy"
+MANIFEST_FILE = "manifest.json"
+
+
+def is_catalog(path):
+    """Indique si `path` est un dossier de catalogue columnaire."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def vectors_file(source):
+    """Fichier des vecteurs d'un dataset : embeddings du catalogue columnaire, ou le pickle lui-même."""
+    if is_catalog(source):
+        return os.path.join(source, EMBEDDINGS_FILE)
+    return source
+
+
+def convert_dataset(dataset, output_dir, dedupe_outfits=True):
+    """
+    Convertit le dataset pickle en catalogue columnaire mappable en mémoire.
+
+    Le dossier produit contient :
+        - embeddings.npy : matrice float32 [M, D] déjà normalisée L2
+        - embedding_rows.npy : position (iloc) de chaque embedding dans les métadonnées
+          (une seule ligne par tenue si dedupe_outfits)
+        - metadata.parquet : colonnes Item Name, Price, Link, Image URL
+        - images.bin / image_offsets.npy : images décodées concaténées, lues à la demande
+        - manifest.json : version du format et dimensions
+
+    Args:
+        dataset (DataFrame): Dataset chargé depuis le pickle
+        output_dir (str): Dossier de destination
+        dedupe_outfits (bool): Ne stocker qu'un embedding par 'Image URL'
+
+    Returns:
+        dict: Manifeste écrit
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    if dedupe_outfits:
+        row_ids = outfit_representative_rows(dataset)
+    else:
+        row_ids = np.flatnonzero(dataset['Embedding'].notna().to_numpy())
+    row_ids = row_ids.astype(np.int64)
+    embeddings = normalize_rows(np.vstack(dataset['Embedding'].to_numpy()[row_ids]))
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+    np.save(os.path.join(output_dir, EMBEDDING_ROWS_FILE), row_ids)
+
+    metadata = dataset[METADATA_COLUMNS].reset_index(drop=True)
+    metadata.to_parquet(os.path.join(output_dir, METADATA_FILE), index=False)
+
+    # Images stockées à part : octets bruts concaténés + offsets
+    offsets = np.zeros(len(dataset) + 1, dtype=np.int64)
+    with open(os.path.join(output_dir, IMAGES_FILE), "wb") as f:
+        encoded_images = dataset['Encoded Image'] if 'Encoded Image' in dataset else [None] * len(dataset)
+        for i, encoded in enumerate(encoded_images):
+            raw = base64.b64decode(encoded) if isinstance(encoded, str) and encoded else b""
+            f.write(raw)
+            offsets[i + 1] = offsets[i] + len(raw)
+    np.save(os.path.join(output_dir, IMAGE_OFFSETS_FILE), offsets)
+
+    manifest = {
+        "format_version": CATALOG_FORMAT_VERSION,
+        "n_rows": int(len(dataset)),
+        "n_embeddings": int(len(row_ids)),
+        "dim": int(embeddings.shape[1]),
+        "dedupe_outfits": bool(dedupe_outfits),
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class Catalog:
+    """
+    Catalogue columnaire : embeddings mappés en mémoire, métadonnées Parquet
+    et images chargées à la demande.
+
+    Les embeddings ne sont jamais copiés dans le tas Python : le cache de pages
+    de l'OS les partage entre les processus workers.
+    """
+
+    def __init__(self, path, metadata, embeddings, embedding_rows, manifest):
+        self.path = path
+        self.metadata = metadata
+        self.embeddings = embeddings
+        self.embedding_rows = embedding_rows
+        self.manifest = manifest
+        self._image_offsets = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Ouvre un catalogue produit par `convert_dataset`.
+
+        Args:
+            path (str): Dossier du catalogue
+
+        Returns:
+            Catalog: Catalogue ouvert
+
+        Raises:
+            FileNotFoundError: Si le dossier ne contient pas de manifeste
+            ValueError: Si la version du format n'est pas supportée
+        """
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"Catalogue introuvable : {path}")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != CATALOG_FORMAT_VERSION:
+            raise ValueError(f"Version de catalogue non supportée : {manifest.get('format_version')}")
+
+        return cls(
+            path=path,
+            metadata=pd.read_parquet(os.path.join(path, METADATA_FILE)),
+            embeddings=np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r'),
+            embedding_rows=np.load(os.path.join(path, EMBEDDING_ROWS_FILE)),
+            manifest=manifest,
+        )
+
+    def exact_index(self):
+        """Index exact construit directement sur la matrice mappée (sans copie)."""
+        return EmbeddingIndex(self.embeddings, self.embedding_rows, normalized=True)
+
+    def image_bytes(self, row_id):
+        """
+        Lit les octets de l'image d'une ligne, à la demande.
+
+        Args:
+            row_id (int): Position de la ligne dans les métadonnées
+
+        Returns:
+            bytes: Image encodée (vide si absente)
+        """
+        if self._image_offsets is None:
+            self._image_offsets = np.load(os.path.join(self.path, IMAGE_OFFSETS_FILE), mmap_mode='r')
+        start, end = int(self._image_offsets[row_id]), int(self._image_offsets[row_id + 1])
+        if start == end:
+            return b""
+        with open(os.path.join(self.path, IMAGES_FILE), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def image_base64(self, row_id):
+        """Image d'une ligne encodée en base64 (format de l'ancienne colonne 'Encoded Image')."""
+        raw = self.image_bytes(row_id)
+        return base64.b64encode(raw).decode("utf-8") if raw else None
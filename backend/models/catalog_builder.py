@@ -0,0 +1,255 @@
+import base64
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from backend.utils.http import fetch
+
+MANIFEST_VERSION = 1
+
+
+def url_cache_path(cache_dir, url):
+    """Fichier du cache local d'images pour une URL."""
+    return os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+
+def load_manifest(path):
+    """
+    Manifeste de la dernière construction : URL -> empreinte du contenu et validateurs HTTP.
+
+    Returns:
+        dict: Entrées par URL (vide si absent ou d'une autre version)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("images", {})
+
+
+def save_manifest(path, images, model_id):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "model": model_id, "images": images}, f)
+    os.replace(tmp_path, path)
+
+
+def fetch_image(url, cache_dir, previous=None, refresh=True):
+    """
+    Récupère une image en passant par le cache disque.
+
+    Avec `refresh`, une requête conditionnelle (ETag / Last-Modified) évite de
+    retélécharger une image inchangée ; sans, une image en cache est réutilisée telle quelle.
+
+    Args:
+        url (str): URL de l'image
+        cache_dir (str): Dossier du cache local
+        previous (dict): Entrée du manifeste précédent pour cette URL
+        refresh (bool): Revalider auprès du serveur les images déjà en cache
+
+    Returns:
+        dict: 'sha256', 'etag', 'last_modified' et 'path' du fichier en cache
+    """
+    path = url_cache_path(cache_dir, url)
+    cached = os.path.exists(path) and previous is not None
+    if cached and not refresh:
+        return dict(previous, path=path)
+
+    headers = {}
+    if cached:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    response = fetch(url, headers=headers)
+    if cached and response.status_code == 304:
+        return dict(previous, path=path)
+
+    content = response.content
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return {
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "path": path,
+    }
+
+
+class CatalogBuilder:
+    """
+    Construction incrémentale du dataset d'embeddings du catalogue.
+
+    Les images sont téléchargées en parallèle via une session HTTP partagée et
+    gardées en cache disque ; seules les images nouvelles ou dont le contenu a
+    changé depuis la dernière construction (manifeste URL -> empreinte) sont
+    encodées, par lots, via `ImageProcessor.embed_batch`.
+    """
+
+    def __init__(self, image_processor, cache_dir, manifest_path, workers=16, batch_size=32, refresh=True, model_id=""):
+        """
+        Args:
+            image_processor (ImageProcessor): Modèle et prétraitement
+            cache_dir (str): Cache disque des images téléchargées
+            manifest_path (str): Manifeste de la construction précédente
+            workers (int): Téléchargements et prétraitements simultanés
+            batch_size (int): Images par lot d'inférence
+            refresh (bool): Revalider les images déjà en cache auprès du serveur
+            model_id (str): Modèle de vision ; un changement invalide tous les embeddings
+        """
+        self.image_processor = image_processor
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.refresh = refresh
+        self.model_id = model_id
+
+    def _fetch_all(self, urls, previous, log):
+        """Télécharge les URLs en parallèle ; retourne (entrées du manifeste, erreurs)."""
+        entries, errors = {}, {}
+
+        def _one(url):
+            try:
+                return url, fetch_image(url, self.cache_dir, previous.get(url), refresh=self.refresh), None
+            except Exception as e:
+                return url, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for i, (url, entry, error) in enumerate(pool.map(_one, urls), 1):
+                if error is None:
+                    entries[url] = entry
+                else:
+                    errors[url] = error
+                if i % 500 == 0:
+                    log(f"{i}/{len(urls)} images récupérées")
+        return entries, errors
+
+    def _load_tensor(self, path):
+        with open(path, "rb") as f:
+            return self.image_processor.preprocessor.preprocess(Image.open(BytesIO(f.read())))
+
+    def _embed(self, urls, entries, log):
+        """Encode les images des URLs par lots ; retourne URL -> vecteur."""
+        vectors = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(urls), self.batch_size):
+                chunk = urls[start:start + self.batch_size]
+                tensors = list(pool.map(lambda url: self._safe_tensor(entries[url]["path"]), chunk))
+                ready = [(url, tensor) for url, tensor in zip(chunk, tensors) if tensor is not None]
+                if not ready:
+                    continue
+                batch = np.stack([tensor for _, tensor in ready])
+                for (url, _), vector in zip(ready, self.image_processor.embed_batch(batch)):
+                    vectors[url] = vector.astype(np.float32)
+                if (start // self.batch_size) % 20 == 0:
+                    log(f"{min(start + self.batch_size, len(urls))}/{len(urls)} images encodées")
+        return vectors
+
+    def _safe_tensor(self, path):
+        try:
+            return self._load_tensor(path)
+        except Exception:
+            return None
+
+    def build(self, items, previous_dataset=None, log=print):
+        """
+        Construit le dataset d'embeddings.
+
+        Args:
+            items (DataFrame): Articles du catalogue ('Item Name', 'Price', 'Link', 'Image URL')
+            previous_dataset (DataFrame): Dataset de la construction précédente (embeddings réutilisés)
+            log (callable): Affichage de la progression
+
+        Returns:
+            tuple: (DataFrame avec 'Embedding' et 'Encoded Image', statistiques)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        previous = load_manifest(self.manifest_path)
+        if previous and self._manifest_model() != self.model_id:
+            log("Modèle de vision différent de la construction précédente : tout est réencodé")
+            previous_dataset = None
+
+        urls = list(dict.fromkeys(items['Image URL'].dropna()))
+        entries, errors = self._fetch_all(urls, previous, log)
+
+        # Embeddings réutilisables : même URL, même contenu
+        known = {}
+        if previous_dataset is not None and 'Embedding' in previous_dataset:
+            for url, vector in zip(previous_dataset['Image URL'], previous_dataset['Embedding']):
+                if isinstance(vector, (np.ndarray, list)) and url not in known:
+                    known[url] = vector
+        unchanged = [
+            url for url, entry in entries.items()
+            if url in known and url in previous and previous[url]["sha256"] == entry["sha256"]
+        ]
+        unchanged_set = set(unchanged)
+        changed = [url for url in entries if url not in unchanged_set]
+        # Téléchargement en échec (serveur indisponible...) : l'embedding, l'entrée du manifeste et
+        # l'image en cache de la construction précédente restent valables
+        stale = [url for url in errors if url in known and url in previous]
+        log(
+            f"{len(unchanged)} images inchangées, {len(changed)} nouvelles ou modifiées, "
+            f"{len(errors)} en erreur dont {len(stale)} conservées de la construction précédente"
+        )
+
+        vectors = {url: known[url] for url in unchanged + stale}
+        for url in stale:
+            entries[url] = dict(previous[url], path=url_cache_path(self.cache_dir, url))
+        embedded = self._embed(changed, entries, log)
+        vectors.update(embedded)
+
+        dataset = items.copy()
+        dataset['Embedding'] = [vectors.get(url) for url in dataset['Image URL']]
+        previous_encoded = {}
+        if stale and 'Encoded Image' in previous_dataset:
+            previous_encoded = dict(zip(previous_dataset['Image URL'], previous_dataset['Encoded Image']))
+        encoded = {}
+        for url in dataset['Image URL'].dropna().unique():
+            if url in entries and url in vectors:
+                path = entries[url]["path"]
+                if not os.path.exists(path):
+                    # Image conservée dont le cache disque a disparu
+                    encoded[url] = previous_encoded.get(url)
+                    continue
+                with open(path, "rb") as f:
+                    encoded[url] = base64.b64encode(f.read()).decode("utf-8")
+        dataset['Encoded Image'] = [encoded.get(url) for url in dataset['Image URL']]
+
+        manifest = {url: {k: v for k, v in entry.items() if k != "path"} for url, entry in entries.items() if url in vectors}
+        save_manifest(self.manifest_path, manifest, self.model_id)
+
+        stats = {
+            "rows": int(len(dataset)),
+            "images": len(urls),
+            "unchanged": len(unchanged),
+            "embedded": len(embedded),
+            "stale": len(stale),
+            "failed": len(errors) - len(stale) + len(changed) - len(embedded),
+        }
+        return dataset, stats
+
+    def _manifest_model(self):
+        with open(self.manifest_path) as f:
+            return json.load(f).get("model")
+
+
+def read_items(path):
+    """Lit la liste des articles (CSV, Parquet, JSONL ou pickle)."""
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".jsonl"):
+        return pd.read_json(path, lines=True)
+    return pd.read_pickle(path)
@@ -5,14 +5,149 @@ load_dotenv()
 
 MISTRALAI_API_KEY = os.getenv("MISTRALAI_API_KEY")
 LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
+LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "style-analyzer")
+LANGSMITH_ENDPOINT = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
+# Traçage LangSmith : coupe-circuit (actif par défaut si une clé est fournie), part des requêtes
+# tracées et taille de la file d'export (les traces au-delà sont abandonnées)
+TRACING = os.getenv("TRACING", "true" if LANGSMITH_API_KEY else "false").lower() == "true"
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "0.05"))
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "256"))
 
-MODEL_ID = "pixtral-large-latest"
-# MODEL_ID = "pixtral-12b-2409"
+MODEL_ID = os.getenv("LLM_MODEL", "pixtral-large-latest")
+# Routage des appels Pixtral (chemins asynchrones) : modèle de repli plus rapide ('' : aucun) lancé
+# si le principal échoue ou dépasse le budget de latence (0 : repli sur erreur seulement), et
+# requête dupliquée après le percentile observé des latences du principal
+LLM_ROUTING = os.getenv("LLM_ROUTING", "true").lower() == "true"
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "pixtral-12b-2409")
+LLM_LATENCY_BUDGET_S = float(os.getenv("LLM_LATENCY_BUDGET_S", "0"))
+LLM_FIRST_TOKEN_BUDGET_S = float(os.getenv("LLM_FIRST_TOKEN_BUDGET_S", "0"))
+# Bornes du budget demandé par un client (en-tête X-Latency-Budget-Ms), en secondes
+LLM_CLIENT_BUDGET_MIN_S = float(os.getenv("LLM_CLIENT_BUDGET_MIN_S", "2"))
+LLM_CLIENT_BUDGET_MAX_S = float(os.getenv("LLM_CLIENT_BUDGET_MAX_S", "60"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Client LLM : 'mistral' (API) ou 'fake' (remplaçant local pour les tests de charge, sans quota)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "mistral")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_PROMPT_TOKENS = int(os.getenv("FAKE_LLM_PROMPT_TOKENS", "1500"))
+FAKE_LLM_COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "400"))
+# Contrôle d'admission des appels Pixtral, par worker : appels simultanés (0 : désactivé), file
+# d'attente bornée et attente maximale ; quota Mistral global (appels/minute, 0 : illimité)
+# réparti entre les WEB_CONCURRENCY workers
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "10"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
 VISION_MODEL_ID = "convnext_tiny"
 VISION_MODEL_WEIGHTS = "imagenet1k_v1"
 VISION_MODEL_ONNX_PATH = "./backend/models/convnext_tiny.onnx"
 VISION_USE_ONNX = True
 VISION_MODEL_ONNX_REPO = "julienlucas/convnext-tiny-onnx"
+# Variantes ONNX (fichiers dans backend/models/) : seule fp32 est téléchargée, les autres
+# sont produites par manage.py quantize_model
+VISION_MODEL_VARIANTS = {
+    "fp32": "convnext_tiny.onnx",
+    "fp16": "convnext_tiny.fp16.onnx",
+    "int8-dynamic": "convnext_tiny.int8-dynamic.onnx",
+    "int8-static": "convnext_tiny.int8-static.onnx",
+}
+VISION_MODEL_VARIANT = os.getenv("VISION_MODEL_VARIANT", "fp32")
+
+# Téléchargements HTTP (images par URL, construction du catalogue)
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_S = float(os.getenv("HTTP_BACKOFF_S", "0.5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+# Micro-batching des inférences ONNX entre requêtes concurrentes
+VISION_BATCHING = os.getenv("VISION_BATCHING", "true").lower() == "true"
+VISION_BATCH_MAX_SIZE = int(os.getenv("VISION_BATCH_MAX_SIZE", "8"))
+VISION_BATCH_MAX_WAIT_MS = float(os.getenv("VISION_BATCH_MAX_WAIT_MS", "2"))
+
+# Threads du chemin asynchrone pour le décodage, l'inférence et la recherche
+# (au moins VISION_BATCH_MAX_SIZE pour que des lots complets puissent se former)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "8"))
+
+# Analyse par lots (manage.py analyze_batch, POST /analyze/batch)
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_LLM_RATE_PER_MINUTE = float(os.getenv("BATCH_LLM_RATE_PER_MINUTE", "60"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))  # Limite par requête HTTP
+# /analyze/batch : jeton exigé (en-tête "Authorization: Bearer ...", vide : pas d'authentification)
+# et hôtes d'images autorisés (sous-domaines compris, vide : tout hôte public)
+BATCH_API_TOKEN = os.getenv("BATCH_API_TOKEN", "")
+BATCH_URL_ALLOWED_HOSTS = tuple(
+    host.strip().lower() for host in os.getenv("BATCH_URL_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+
+# Cache des embeddings d'uploads, adressé par le contenu (0 : désactivé)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")  # Fichier SQLite, niveau disque optionnel
+EMBEDDING_CACHE_PHASH = os.getenv("EMBEDDING_CACHE_PHASH", "true").lower() == "true"
+EMBEDDING_CACHE_PHASH_MAX_DISTANCE = int(os.getenv("EMBEDDING_CACHE_PHASH_MAX_DISTANCE", "4"))
+
+# Dataset
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.getenv("DATASET_PATH", os.path.join(BACKEND_DIR, "dataset", "swift-style-embeddings.pkl"))
+# Catalogue columnaire (manage.py convert_catalog), prioritaire sur le pickle s'il existe
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(BACKEND_DIR, "dataset", "catalog"))
+# Cache disque des images du catalogue (manage.py build_catalog)
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(BACKEND_DIR, "dataset", "image-cache"))
+
+# Cache des analyses Pixtral : 'memory', 'sqlite' (partagé entre workers) ou 'off'
+LLM_CACHE = os.getenv("LLM_CACHE", "memory")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BACKEND_DIR, "dataset", "llm-cache.sqlite"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "86400"))
+# Inclure l'empreinte de l'upload dans la clé (réponse réutilisée seulement pour un upload identique)
+LLM_CACHE_KEY_UPLOAD = os.getenv("LLM_CACHE_KEY_UPLOAD", "false").lower() == "true"
+
+# Profil des sessions ONNX Runtime : défauts calculés pour WEB_CONCURRENCY workers sur la machine,
+# remplacés par le profil mesuré (manage.py tune_onnx_session), eux-mêmes remplacés par les variables ci-dessous
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+ONNX_PROFILE_PATH = os.getenv("ONNX_PROFILE_PATH", os.path.join(BACKEND_DIR, "models", "onnx-profile.json"))
+ONNX_INTRA_OP_THREADS = os.getenv("ONNX_INTRA_OP_THREADS")
+ONNX_INTER_OP_THREADS = os.getenv("ONNX_INTER_OP_THREADS")
+ONNX_EXECUTION_MODE = os.getenv("ONNX_EXECUTION_MODE")  # 'sequential' ou 'parallel'
+ONNX_GRAPH_OPTIMIZATION = os.getenv("ONNX_GRAPH_OPTIMIZATION")  # 'disable', 'basic', 'extended' ou 'all'
+ONNX_MEM_ARENA = os.getenv("ONNX_MEM_ARENA")  # 'true' ou 'false'
+# Graphe optimisé sérialisé sur disque : les démarrages suivants sautent l'optimisation
+ONNX_OPTIMIZED_MODEL_CACHE = os.getenv("ONNX_OPTIMIZED_MODEL_CACHE", "true").lower() == "true"
+ONNX_OPTIMIZED_MODEL_DIR = os.getenv("ONNX_OPTIMIZED_MODEL_DIR", os.path.join(BACKEND_DIR, "models", "optimized"))
+
+# N'indexer qu'un embedding par tenue (les articles d'une tenue partagent la même image)
+DEDUPE_OUTFITS = os.getenv("DEDUPE_OUTFITS", "true").lower() == "true"
+
+# Recherche vectorielle : 'exact' (force brute), 'ivf' (approximative) ou 'pq' (vecteurs compressés)
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "exact")
+IVF_N_LISTS = None  # None : ~4·√N listes
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_INDEX_PATH = os.getenv("IVF_INDEX_PATH", os.path.join(BACKEND_DIR, "dataset", "ivf-index"))
+# Quantification produit : dimension d'un sous-vecteur (D / PQ_SUBVECTOR_DIM octets par vecteur)
+PQ_SUBVECTOR_DIM = int(os.getenv("PQ_SUBVECTOR_DIM", "4"))
+# Liste courte réévaluée exactement, en multiple de k (0 : scores PQ seuls)
+PQ_RERANK = int(os.getenv("PQ_RERANK", "4"))
+PQ_INDEX_PATH = os.getenv("PQ_INDEX_PATH", os.path.join(BACKEND_DIR, "dataset", "pq-index"))
+
+# Second étage de recherche : la liste courte (RERANK_SHORTLIST × k) du premier étage est
+# réévaluée par le cosinus exact float32 et des signaux pondérés
+RERANK = os.getenv("RERANK", "false").lower() == "true"
+RERANK_SHORTLIST = int(os.getenv("RERANK_SHORTLIST", "4"))
+# Histogrammes couleur du catalogue (manage.py build_color_histograms) ; 0 : signal désactivé
+RERANK_COLOR_WEIGHT = float(os.getenv("RERANK_COLOR_WEIGHT", "0"))
+RERANK_COLOR_HISTOGRAMS = os.getenv("RERANK_COLOR_HISTOGRAMS", os.path.join(BACKEND_DIR, "dataset", "color-histograms.npy"))
+# Colonne numérique du dataset (dans [0, 1]) ajoutée au score avec ce poids
+RERANK_BOOST_COLUMN = os.getenv("RERANK_BOOST_COLUMN")
+RERANK_BOOST_WEIGHT = float(os.getenv("RERANK_BOOST_WEIGHT", "0"))
+
+# Préchargement de l'application au démarrage du worker (wsgi/asgi)
+PRELOAD_APP = os.getenv("PRELOAD_APP", "true").lower() == "true"
+PRELOAD_IN_BACKGROUND = os.getenv("PRELOAD_IN_BACKGROUND", "true").lower() == "true"
 
 # Image processing settings
 IMAGE_SIZE = (224, 224)
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+
+def content_key(image_bytes, namespace=""):
+    """
+    Clé d'adressage par contenu des octets bruts d'une image.
+
+    Args:
+        image_bytes (bytes): Octets de l'image
+        namespace (str): Préfixe (ex. : modèle) pour ne pas réutiliser les vecteurs d'un autre modèle
+
+    Returns:
+        str: Empreinte SHA-256 hexadécimale
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{namespace}:{digest}" if namespace else digest
+
+
+def perceptual_hash(image_bytes, hash_size=8):
+    """
+    Empreinte perceptuelle (dHash) 64 bits, stable face à une recompression ou un redimensionnement.
+
+    Le JPEG est décodé directement en niveaux de gris à échelle réduite.
+
+    Args:
+        image_bytes (bytes): Octets de l'image
+        hash_size (int): Côté de la grille de comparaison
+
+    Returns:
+        int: Empreinte sur hash_size² bits
+    """
+    image = Image.open(BytesIO(image_bytes))
+    if image.format == "JPEG":
+        image.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+class EmbeddingCache:
+    """
+    Cache des embeddings d'images uploadées, adressé par le contenu.
+
+    Niveau mémoire : LRU borné, avec recherche des quasi-doublons par distance
+    de Hamming sur l'empreinte perceptuelle. Niveau disque optionnel : SQLite,
+    consulté par clé exacte, pour survivre aux redémarrages.
+    """
+
+    def __init__(self, max_entries=1024, path=None, namespace="", use_phash=True, max_distance=4):
+        """
+        Args:
+            max_entries (int): Nombre maximal d'embeddings gardés en mémoire
+            path (str): Fichier SQLite du niveau disque (None : mémoire seule)
+            namespace (str): Préfixe des clés (identifiant du modèle)
+            use_phash (bool): Active la recherche de quasi-doublons
+            max_distance (int): Distance de Hamming maximale pour un quasi-doublon
+        """
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.use_phash = use_phash
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "near_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, phash INTEGER, vector BLOB, histogram BLOB)"
+            )
+            # Fichier créé avant l'ajout des histogrammes couleur
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+            if "histogram" not in columns:
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN histogram BLOB")
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, image_bytes, digest=None):
+        """Clé de cache des octets bruts (`digest` : empreinte SHA-256 déjà calculée)."""
+        if digest is None:
+            return content_key(image_bytes, self.namespace)
+        return f"{self.namespace}:{digest}" if self.namespace else digest
+
+    def get(self, image_bytes, digest=None):
+        """
+        Cherche l'embedding d'une image : clé exacte en mémoire, puis sur disque,
+        puis quasi-doublon en mémoire.
+
+        Args:
+            image_bytes (bytes): Octets bruts de l'image
+            digest (str): Empreinte `content_key(image_bytes)` si déjà calculée
+
+        Returns:
+            tuple: (vecteur ou None, histogramme couleur ou None, clé, empreinte perceptuelle
+                ou None) ; clé et empreinte sont à repasser à `put` en cas d'absence
+        """
+        key = self.key(image_bytes, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[1], entry[2], key, entry[0]
+
+        entry = self._disk_get(key)
+        if entry is not None:
+            with self._lock:
+                self._insert(key, *entry)
+                self._counters["disk_hits"] += 1
+            return entry[1], entry[2], key, entry[0]
+
+        phash = perceptual_hash(image_bytes) if self.use_phash else None
+        if phash is not None:
+            with self._lock:
+                near_key = self._nearest(phash)
+                if near_key is not None:
+                    self._entries.move_to_end(near_key)
+                    self._counters["near_hits"] += 1
+                    _, vector, histogram = self._entries[near_key]
+                    return vector, histogram, key, phash
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None, None, key, phash
+
+    def put(self, key, vector, phash=None, histogram=None):
+        """
+        Enregistre un embedding calculé.
+
+        Args:
+            key (str): Clé retournée par `get`
+            vector (np.ndarray): Embedding [D]
+            phash (int): Empreinte perceptuelle retournée par `get`
+            histogram (np.ndarray): Histogramme couleur de l'image (None s'il n'a pas été calculé)
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if histogram is not None:
+            histogram = np.asarray(histogram, dtype=np.float32)
+        with self._lock:
+            self._insert(key, phash, vector, histogram)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, phash, vector, histogram) VALUES (?, ?, ?, ?)",
+                    (
+                        key,
+                        None if phash is None else _to_signed(phash),
+                        vector.tobytes(),
+                        None if histogram is None else histogram.tobytes(),
+                    ),
+                )
+                self._db.commit()
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Compteurs de succès (exacts, quasi-doublons, disque), d'échecs et taille du cache
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+        lookups = sum(counters[name] for name in ("hits", "near_hits", "disk_hits", "misses"))
+        hits = lookups - counters["misses"]
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        return counters
+
+    def _insert(self, key, phash, vector, histogram=None):
+        """Insère en mémoire et évince l'entrée la moins récente. Verrou acquis."""
+        self._entries[key] = (phash, vector, histogram)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _nearest(self, phash):
+        """Clé de l'entrée mémoire la plus proche sous le seuil de Hamming. Verrou acquis."""
+        best_key, best_distance = None, self.max_distance + 1
+        for key, (other, _, _) in self._entries.items():
+            if other is None:
+                continue
+            distance = (phash ^ other).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT phash, vector, histogram FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        phash = None if row[0] is None else row[0] & 0xFFFFFFFFFFFFFFFF
+        histogram = None if row[2] is None else np.frombuffer(row[2], dtype=np.float32)
+        return phash, np.frombuffer(row[1], dtype=np.float32), histogram
+
+
+def _to_signed(value):
+    """Empreinte 64 bits non signée -> entier signé stockable par SQLite."""
+    return value - (1 << 64) if value >= 1 << 63 else value
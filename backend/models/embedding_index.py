@@ -0,0 +1,209 @@
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """
+    Normalise chaque ligne en norme L2 (les vecteurs nuls restent nuls).
+
+    Args:
+        vectors (np.ndarray): Matrice [N, D]
+
+    Returns:
+        np.ndarray: Matrice float32 contiguë [N, D] de norme unitaire
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def index_fingerprint(row_ids, source=None, **params):
+    """
+    Empreinte des données d'un index sauvegardé : il n'est réutilisé que si elle est identique.
+
+    Args:
+        row_ids (np.ndarray): Positions des lignes indexées, dans l'ordre de l'index exact
+        source (str): Fichier des vecteurs (dataset pickle ou embeddings du catalogue) ;
+            sa taille et sa date de modification en font partie
+        **params: Paramètres de construction (ex. : n_lists, subvector_dim)
+
+    Returns:
+        dict: Empreinte sérialisable en JSON
+    """
+    rows = np.ascontiguousarray(row_ids, dtype=np.int64)
+    fingerprint = {"row_ids": hashlib.sha256(rows.tobytes()).hexdigest(), "source": None}
+    if source is not None and os.path.exists(source):
+        stat = os.stat(source)
+        fingerprint["source"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    fingerprint.update(params)
+    return fingerprint
+
+
+@contextmanager
+def atomic_index_dir(path, attempts=5):
+    """
+    Dossier temporaire où écrire un index, mis en place d'un bloc à la sortie du bloc `with`.
+
+    Plusieurs workers peuvent sauvegarder le même index en même temps : chacun écrit
+    dans son propre dossier puis le renomme à la place de `path`. Un lecteur voit donc
+    un index complet (l'ancien ou le nouveau), jamais des fichiers à moitié écrits ;
+    l'ancien dossier est supprimé, ses fichiers déjà mappés restent lisibles.
+
+    Args:
+        path (str): Dossier final de l'index
+        attempts (int): Nombre de tentatives si un autre worker installe son dossier entre-temps
+
+    Yields:
+        str: Dossier temporaire à remplir
+    """
+    path = os.path.normpath(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    retired = []
+    try:
+        yield tmp_path
+        for attempt in range(attempts):
+            # Un dossier non vide ne peut pas être remplacé : l'ancien est d'abord écarté
+            old_path = f"{path}.{os.getpid()}.{attempt}.old"
+            try:
+                os.replace(path, old_path)
+                retired.append(old_path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.replace(tmp_path, path)
+                break
+            except OSError:
+                # Un autre worker vient d'installer le sien : recommencer
+                continue
+        else:
+            raise OSError(f"Impossible de mettre en place l'index dans {path}")
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        for old_path in retired:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+
+def top_k_indices(scores, k):
+    """
+    Retourne les indices des k meilleurs scores, triés par score décroissant.
+
+    Utilise argpartition (O(N)) puis ne trie que les k gagnants.
+
+    Args:
+        scores (np.ndarray): Scores [N] ou [Q, N]
+        k (int): Nombre de résultats
+
+    Returns:
+        np.ndarray: Indices [k] ou [Q, k]
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(scores, n - k, axis=-1)[..., n - k:]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class EmbeddingIndex:
+    """
+    Index exact de similarité cosinus sur les embeddings du catalogue.
+
+    Les vecteurs sont stockés une seule fois dans une matrice float32 contiguë
+    normalisée L2 : une requête se réduit à un produit matrice-vecteur suivi
+    d'un argpartition.
+    """
+
+    def __init__(self, vectors, row_ids, normalized=False):
+        """
+        Args:
+            vectors (np.ndarray): Embeddings [N, D]
+            row_ids (np.ndarray): Position de chaque vecteur dans le dataset d'origine
+            normalized (bool): Les vecteurs sont déjà normalisés en float32 ; ils sont
+                alors utilisés tels quels (y compris un np.memmap), sans copie
+        """
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+        if len(self.vectors) != len(self.row_ids):
+            raise ValueError("vectors et row_ids doivent avoir la même longueur")
+
+    @classmethod
+    def from_dataframe(cls, dataset, column='Embedding', rows=None):
+        """
+        Construit l'index depuis la colonne d'embeddings d'un DataFrame.
+
+        Les lignes sans embedding sont ignorées ; row_ids conserve la position
+        (iloc) des lignes indexées.
+
+        Args:
+            dataset (DataFrame): Dataset contenant la colonne d'embeddings
+            column (str): Nom de la colonne
+            rows (np.ndarray): Positions des lignes à indexer (par défaut : toutes celles avec un embedding)
+
+        Returns:
+            EmbeddingIndex: Index prêt à interroger
+        """
+        if rows is None:
+            rows = np.flatnonzero(dataset[column].notna().to_numpy())
+        row_ids = np.asarray(rows, dtype=np.int64)
+        if len(row_ids) == 0:
+            raise ValueError("Aucun embedding valide dans le dataset")
+        vectors = np.vstack(dataset[column].to_numpy()[row_ids])
+        return cls(vectors, row_ids)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def _prepare_queries(self, queries):
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        return normalize_rows(queries)
+
+    def search(self, queries, k):
+        """
+        Recherche les k plus proches voisins de plusieurs requêtes à la fois.
+
+        Args:
+            queries (np.ndarray): Vecteurs requêtes [Q, D] (ou [D])
+            k (int): Nombre de résultats par requête
+
+        Returns:
+            tuple: (row_ids [Q, k], scores [Q, k]) triés par score décroissant
+        """
+        queries = self._prepare_queries(queries)
+        scores = queries @ self.vectors.T
+        top = top_k_indices(scores, k)
+        return self.row_ids[top], np.take_along_axis(scores, top, axis=-1)
+
+    def search_one(self, query, k):
+        """
+        Recherche les k plus proches voisins d'une seule requête.
+
+        Args:
+            query (np.ndarray): Vecteur requête [D]
+            k (int): Nombre de résultats
+
+        Returns:
+            tuple: (row_ids [k], scores [k]) triés par score décroissant
+        """
+        query = self._prepare_queries(query)[0]
+        scores = self.vectors @ query
+        top = top_k_indices(scores, k)
+        return self.row_ids[top], scores[top]
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import backend.models.config as config
+
+# Erreurs simulées, au format des messages de l'API Mistral
+FAKE_ERRORS = (
+    "API error occurred: Status 429. Body: {\"message\":\"Requests rate limit exceeded\"}",
+    "API error occurred: Status 503. Body: {\"message\":\"Service unavailable\"}",
+    "Request timed out",
+)
+
+
+class FakeMistralError(Exception):
+    """Erreur simulée par FakeMistral."""
+
+
+class FakeMistral:
+    """
+    Remplaçant local du client `Mistral` pour les tests de charge, sans réseau ni quota.
+
+    Expose `chat.complete`, `chat.complete_async` et `chat.stream_async` avec des objets
+    de réponse de même forme que le SDK. Latence log-normale (médiane et dispersion),
+    nombre de tokens et taux d'erreur configurables.
+    """
+
+    def __init__(
+            self, latency_ms=800.0, latency_sigma=0.5, first_token_ratio=0.2, error_rate=0.0,
+            prompt_tokens=1500, completion_tokens=400, seed=None
+        ):
+        """
+        Args:
+            latency_ms (float): Latence médiane d'une réponse complète
+            latency_sigma (float): Dispersion de la loi log-normale (0 : latence fixe)
+            first_token_ratio (float): Part de la latence avant le premier morceau en streaming
+            error_rate (float): Probabilité qu'un appel échoue
+            prompt_tokens (int): Tokens de prompt déclarés
+            completion_tokens (int): Tokens de réponse moyens (±20 %)
+            seed (int): Graine du tirage
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.first_token_ratio = first_token_ratio
+        self.error_rate = error_rate
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self._random = random.Random(seed)
+        self.chat = _FakeChat(self)
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            latency_ms=config.FAKE_LLM_LATENCY_MS,
+            latency_sigma=config.FAKE_LLM_LATENCY_SIGMA,
+            error_rate=config.FAKE_LLM_ERROR_RATE,
+            prompt_tokens=config.FAKE_LLM_PROMPT_TOKENS,
+            completion_tokens=config.FAKE_LLM_COMPLETION_TOKENS,
+        )
+
+    def _draw(self):
+        """
+        Tire un appel simulé.
+
+        Returns:
+            tuple: (latence en secondes, tokens de réponse, message d'erreur ou None)
+        """
+        latency = self.latency_ms * self._random.lognormvariate(0.0, self.latency_sigma) if self.latency_sigma else self.latency_ms
+        tokens = max(1, int(self.completion_tokens * self._random.uniform(0.8, 1.2)))
+        error = self._random.choice(FAKE_ERRORS) if self._random.random() < self.error_rate else None
+        return latency / 1000, tokens, error
+
+    def _content(self, messages, tokens):
+        """Analyse Markdown d'environ `tokens` tokens (~4 caractères par token)."""
+        items = [f"- **Article {i}** : Prix : {19 + i * 7} € - Lien : https://example.com/item/{i}" for i in range(6)]
+        body = "\n".join(
+            ["## Analyse de la tenue", "", "Tenue simulée par FakeMistral pour les tests de charge.", "", "## Articles"] + items
+        )
+        filler = " Conseil de style simulé."
+        return body + "\n\n## Conseils de style\n" + filler * max(0, (tokens * 4 - len(body)) // len(filler))
+
+    def _usage(self, tokens):
+        return SimpleNamespace(
+            prompt_tokens=self.prompt_tokens, completion_tokens=tokens, total_tokens=self.prompt_tokens + tokens
+        )
+
+    def _completion(self, model, messages, tokens):
+        message = SimpleNamespace(role="assistant", content=self._content(messages, tokens))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=self._usage(tokens),
+        )
+
+
+class _FakeChat:
+    def __init__(self, client):
+        self._client = client
+
+    def complete(self, model=None, messages=None, **kwargs):
+        latency, tokens, error = self._client._draw()
+        time.sleep(latency)
+        if error:
+            raise FakeMistralError(error)
+        return self._client._completion(model, messages, tokens)
+
+    async def complete_async(self, model=None, messages=None, **kwargs):
+        latency, tokens, error = self._client._draw()
+        await asyncio.sleep(latency)
+        if error:
+            raise FakeMistralError(error)
+        return self._client._completion(model, messages, tokens)
+
+    async def stream_async(self, model=None, messages=None, **kwargs):
+        latency, tokens, error = self._client._draw()
+        content = self._client._content(messages, tokens)
+        usage = self._client._usage(tokens)
+        first_token = latency * self._client.first_token_ratio
+
+        async def events():
+            await asyncio.sleep(first_token)
+            if error:
+                raise FakeMistralError(error)
+            # Morceaux d'environ 4 tokens, répartis sur le reste de la latence
+            chunks = [content[i:i + 16] for i in range(0, len(content), 16)]
+            pause = (latency - first_token) / max(1, len(chunks))
+            for i, chunk in enumerate(chunks):
+                last = i == len(chunks) - 1
+                delta = SimpleNamespace(role="assistant", content=chunk)
+                data = SimpleNamespace(
+                    model=model,
+                    choices=[SimpleNamespace(index=0, delta=delta, finish_reason="stop" if last else None)],
+                    usage=usage if last else None,
+                )
+                yield SimpleNamespace(data=data)
+                if not last:
+                    await asyncio.sleep(pause)
+
+        return events()
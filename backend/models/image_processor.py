@@ -1,18 +1,19 @@
 import numpy as np
-import requests
-import base64
 import os
-import torch
-import torchvision.transforms as transforms
-from torchvision.models import convnext_tiny, ConvNeXt_Tiny_Weights
-from sklearn.metrics.pairwise import cosine_similarity
-from io import BytesIO
-from PIL import Image
-import onnxruntime as ort
+import pandas as pd
 from pathlib import Path
-from huggingface_hub import hf_hub_download
-from langsmith.run_helpers import traceable, get_current_run_tree
 import backend.models.config as config
+from backend import metrics
+from backend.models import tracing
+from backend.models.embedding_index import EmbeddingIndex, index_fingerprint
+from backend.models.ann_index import IVFIndex
+from backend.models.pq_index import PQIndex
+from backend.models.reranking import BoostSignal, ColorSignal, TwoStageIndex, color_histogram
+from backend.models.outfit_index import outfit_representative_rows
+from backend.models.inference_scheduler import InferenceScheduler
+from backend.models.onnx_session import create_session, resolve_profile
+from backend.models.preprocessing import ImagePreprocessor, jpeg_base64, open_image
+from backend.models.embedding_cache import EmbeddingCache, content_key
 
 class ImageProcessor:
     """
@@ -22,7 +23,9 @@ class ImageProcessor:
     def __init__(
             self, image_size=(224, 224),
             norm_mean=[0.485, 0.456, 0.406],
-            norm_std=[0.229, 0.224, 0.225]
+            norm_std=[0.229, 0.224, 0.225],
+            variant=None,
+            session_profile=None
         ):
         """
         Initialise le processeur d'image avec un modèle ConvNeXt-Tiny pré-entraîné.
@@ -31,50 +34,88 @@ class ImageProcessor:
             image_size (tuple): Taille cible pour les images en entrée
             norm_mean (list): Valeurs moyennes de normalisation pour les canaux RGB
             norm_std (list): Écarts-types de normalisation pour les canaux RGB
+            variant (str): Variante ONNX ('fp32', 'fp16', 'int8-dynamic', 'int8-static' ;
+                défaut : config.VISION_MODEL_VARIANT)
+            session_profile (dict): Profil de session ONNX Runtime (défaut : profil résolu
+                pour config.WEB_CONCURRENCY workers, voir onnx_session.resolve_profile)
         """
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = None
         self.root_dir = Path(__file__).resolve().parents[2]
-        self.onnx_path = str(self.root_dir / "backend" / "models" / "convnext_tiny.onnx")
+        self.fp32_onnx_path = str(self.root_dir / "backend" / "models" / config.VISION_MODEL_VARIANTS["fp32"])
+        self.variant = variant or config.VISION_MODEL_VARIANT
+        if self.variant not in config.VISION_MODEL_VARIANTS:
+            raise ValueError(f"Variante de modèle inconnue : {self.variant}")
+        self.onnx_path = str(self.root_dir / "backend" / "models" / config.VISION_MODEL_VARIANTS[self.variant])
         self.use_onnx = bool(config.VISION_USE_ONNX)
+        if self.use_onnx and self.variant != "fp32" and not os.path.exists(self.onnx_path):
+            # Les variantes sont produites localement (manage.py quantize_model)
+            print(f"Variante {self.variant} introuvable ({self.onnx_path}), utilisation du modèle fp32")
+            self.variant = "fp32"
+            self.onnx_path = self.fp32_onnx_path
         self.onnx_session = None
+        self.session_profile = session_profile
+        self.scheduler = None
+        # Fichier des vecteurs du dataset (empreinte des index sauvegardés ; None : dataset en mémoire)
+        self.vectors_source = None
+        self.embedding_cache = None
+        if config.EMBEDDING_CACHE_SIZE > 0:
+            self.embedding_cache = EmbeddingCache(
+                max_entries=config.EMBEDDING_CACHE_SIZE,
+                path=config.EMBEDDING_CACHE_PATH,
+                namespace=f"{config.VISION_MODEL_ID}-{config.VISION_MODEL_WEIGHTS}-{self.variant}",
+                use_phash=config.EMBEDDING_CACHE_PHASH,
+                max_distance=config.EMBEDDING_CACHE_PHASH_MAX_DISTANCE,
+            )
+        # Index de recherche construits une seule fois par dataset
+        self._index_cache = {}
 
-        weights = ConvNeXt_Tiny_Weights.IMAGENET1K_V1
+        # torch n'est importé qu'en mode PyTorch : le mode ONNX démarre sans lui
         self.model = None
         if not self.use_onnx:
-        self.model = convnext_tiny(weights=weights).to(self.device)
-        self.model.eval()
+            self._load_torch_model()
 
-        # Pipeline de prétraitement d'image
-        self.preprocess = transforms.Compose([
-            transforms.Resize(image_size),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=norm_mean, std=norm_std),
-        ])
+        # Prétraitement PIL/NumPy (équivalent à Resize -> ToTensor -> Normalize)
+        self.preprocessor = ImagePreprocessor(image_size, norm_mean=norm_mean, norm_std=norm_std)
 
         if self.use_onnx:
             self._ensure_onnx_file()
             self._warmup_onnx()
+            if config.VISION_BATCHING:
+                self._start_scheduler()
+
+    def _load_torch_model(self):
+        import torch
+        from torchvision.models import convnext_tiny, ConvNeXt_Tiny_Weights
+
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = convnext_tiny(weights=ConvNeXt_Tiny_Weights.IMAGENET1K_V1).to(self.device)
+        self.model.eval()
 
     def _get_onnx_session(self):
         if self.onnx_session is None:
-            self.onnx_session = ort.InferenceSession(self.onnx_path)
+            if self.session_profile is None:
+                self.session_profile = resolve_profile()
+            cache_dir = config.ONNX_OPTIMIZED_MODEL_DIR if config.ONNX_OPTIMIZED_MODEL_CACHE else None
+            self.onnx_session = create_session(self.onnx_path, self.session_profile, cache_dir)
         return self.onnx_session
 
     def _ensure_onnx_file(self):
-        if os.path.exists(self.onnx_path):
+        if os.path.exists(self.fp32_onnx_path):
             return
+        from huggingface_hub import hf_hub_download
+
         hf_token = os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_TOKEN")
-        local_dir = os.path.dirname(self.onnx_path)
+        local_dir = os.path.dirname(self.fp32_onnx_path)
         local_path = hf_hub_download(
             repo_id=config.VISION_MODEL_ONNX_REPO,
-            filename=os.path.basename(self.onnx_path),
+            filename=os.path.basename(self.fp32_onnx_path),
             token=hf_token,
             local_dir=local_dir,
             local_dir_use_symlinks=False,
         )
         os.makedirs(local_dir, exist_ok=True)
-        if local_path != self.onnx_path:
-            os.replace(local_path, self.onnx_path)
+        if local_path != self.fp32_onnx_path:
+            os.replace(local_path, self.fp32_onnx_path)
 
     def _warmup_onnx(self):
         session = self._get_onnx_session()
@@ -82,98 +123,417 @@ class ImageProcessor:
         dummy = np.zeros((1, 3, 224, 224), dtype=np.float32)
         session.run(None, {input_name: dummy})
 
-    @traceable(name="convnext_tiny_encode", run_type="tool")
+    def _start_scheduler(self):
+        """Démarre le regroupement en micro-lots si le modèle ONNX accepte un lot dynamique."""
+        batch_dim = self._get_onnx_session().get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int):
+            print(f"Modèle ONNX à lot fixe ({batch_dim}), regroupement des inférences désactivé")
+            return
+        self.scheduler = InferenceScheduler(
+            self.run_onnx_batch,
+            max_batch_size=config.VISION_BATCH_MAX_SIZE,
+            max_wait_ms=config.VISION_BATCH_MAX_WAIT_MS,
+        )
+
+    def run_onnx_batch(self, batch):
+        """
+        Exécute le modèle ONNX sur un lot de tenseurs prétraités.
+
+        Args:
+            batch (np.ndarray): Lot float32 [N, 3, H, W]
+
+        Returns:
+            np.ndarray: Vecteurs de caractéristiques [N, D]
+        """
+        session = self._get_onnx_session()
+        input_name = session.get_inputs()[0].name
+        outputs = session.run(None, {input_name: np.ascontiguousarray(batch, dtype=np.float32)})
+        return np.asarray(outputs[0]).reshape(len(batch), -1)
+
+    def embed_tensor(self, tensor):
+        """
+        Calcule le vecteur d'un tenseur prétraité [3, H, W], via le micro-batching si actif.
+
+        Args:
+            tensor (np.ndarray): Tenseur float32 [3, H, W]
+
+        Returns:
+            np.ndarray: Vecteur de caractéristiques [D]
+        """
+        if self.scheduler is not None:
+            return self.scheduler.infer(tensor)
+        return self.run_onnx_batch(tensor[np.newaxis])[0]
+
+    @tracing.traced("convnext_tiny_encode", run_type="tool")
     def encode_image(self, image_input, is_url=True):
         """
         Encode une image et extrait son vecteur de caractéristiques.
 
         Args:
-            image_input: URL ou chemin local de l'image
-            is_url: Indique si l'entrée est une URL (True) ou un chemin local (False)
+            image_input: URL, chemin local, octets bruts de l'image ou image PIL
+            is_url: Indique si une entrée texte est une URL (True) ou un chemin local (False)
 
         Returns:
-            dict: Contient la chaîne 'base64', le 'vector' ConvNeXt et le 'clip_vector'
+            dict: Contient la chaîne 'base64', le 'vector' ConvNeXt, le 'clip_vector', le
+                'content_hash' SHA-256 des octets (None pour une image PIL) et le
+                'color_histogram' (None si le signal couleur est désactivé)
         """
         try:
-            if is_url:
-                # Récupère l'image depuis l'URL
-                response = requests.get(image_input)
-                response.raise_for_status()
-                image = Image.open(BytesIO(response.content)).convert("RGB")
-            else:
-                # Charge l'image depuis un fichier local
-                image = Image.open(image_input).convert("RGB")
-
-            # Convertit l'image en Base64
-            buffered = BytesIO()
-            image.save(buffered, format="JPEG")
-            base64_string = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-            run_tree = get_current_run_tree()
-            if run_tree:
-                new_metadata = {
-                    "vision_model": config.VISION_MODEL_ID,
-                    "vision_model_weights": config.VISION_MODEL_WEIGHTS,
-                }
-                if hasattr(run_tree, "add_metadata"):
-                    run_tree.add_metadata(new_metadata)
-                elif isinstance(run_tree.metadata, dict):
-                    run_tree.metadata.update(new_metadata)
-
-            # Prétraitement ConvNeXt
-            input_tensor = self.preprocess(image).unsqueeze(0)
-            if self.use_onnx:
-                session = self._get_onnx_session()
-                input_name = session.get_inputs()[0].name
-                outputs = session.run(None, {input_name: input_tensor.numpy().astype(np.float32)})
-                feature_vector = np.array(outputs[0]).flatten()
-            else:
-                input_tensor = input_tensor.to(self.device)
-            with torch.no_grad():
-                features = self.model(input_tensor)
-            feature_vector = features.cpu().numpy().flatten()
+            with metrics.stage("decode"):
+                image_bytes, image = open_image(image_input, is_url)
+                content_hash = content_key(image_bytes) if image_bytes is not None else None
+
+                # Convertit l'image en Base64 (un JPEG est transmis tel quel, sans décodage)
+                base64_string, image = jpeg_base64(image_bytes, image)
 
-            return {"base64": base64_string, "vector": feature_vector}
+            tracing.add_metadata({
+                "vision_model": config.VISION_MODEL_ID,
+                "vision_model_weights": config.VISION_MODEL_WEIGHTS,
+            })
+
+            # Histogramme couleur pour le second étage de recherche
+            with_color = config.RERANK and config.RERANK_COLOR_WEIGHT > 0
+
+            # Upload déjà vu (ou quasi-doublon) : ni prétraitement ni inférence, l'histogramme
+            # couleur est gardé avec l'embedding
+            cache_key = phash = None
+            if self.embedding_cache is not None and image_bytes is not None:
+                cached, color, cache_key, phash = self.embedding_cache.get(image_bytes, digest=content_hash)
+                if cached is not None:
+                    if not with_color:
+                        color = None
+                    elif color is None:
+                        # Entrée enregistrée avant l'activation du signal couleur
+                        color = self._color_histogram(image)
+                    return {"base64": base64_string, "vector": cached, "content_hash": content_hash, "color_histogram": color}
+
+            # Image décodée une seule fois, à la taille cible, pour l'histogramme et l'embedding
+            color = None
+            if with_color:
+                with metrics.stage("decode"):
+                    image = self.preprocessor.resize(image)
+                with metrics.stage("preprocess"):
+                    color = color_histogram(image)
+
+            feature_vector = self._embed_image(image)
+            if cache_key is not None:
+                self.embedding_cache.put(cache_key, feature_vector, phash, histogram=color)
+
+            return {"base64": base64_string, "vector": feature_vector, "content_hash": content_hash, "color_histogram": color}
         except Exception as e:
             print(f"Erreur lors de l'encodage de l'image : {e}")
             return {"base64": None, "vector": None, "clip_vector": None}
 
-    def find_closest_match(self, user_vector, dataset, metric='cosine', top_k=3):
+    def _color_histogram(self, image):
+        """Histogramme couleur de l'image, calculé à la taille cible."""
+        with metrics.stage("decode"):
+            image = self.preprocessor.resize(image)
+        with metrics.stage("preprocess"):
+            return color_histogram(image)
+
+    def _embed_image(self, image):
+        """Prétraite l'image et calcule son vecteur ConvNeXt [D]."""
+        # Décodage réduit pour les JPEG et redimensionnement (sans effet si déjà fait)
+        with metrics.stage("decode"):
+            image = self.preprocessor.resize(image)
+        # Prétraitement ConvNeXt
+        with metrics.stage("preprocess"):
+            input_tensor = self.preprocessor.preprocess(image)
+        with metrics.stage("inference"):
+            if self.use_onnx:
+                return self.embed_tensor(input_tensor).flatten()
+
+            import torch
+
+            input_tensor = torch.from_numpy(input_tensor).unsqueeze(0).to(self.device)
+            with torch.no_grad():
+                features = self.model(input_tensor)
+            return features.cpu().numpy().flatten()
+
+    def embed_batch(self, batch):
+        """
+        Calcule les vecteurs d'un lot de tenseurs prétraités en un seul appel du modèle.
+
+        Args:
+            batch (np.ndarray): Lot float32 [N, 3, H, W]
+
+        Returns:
+            np.ndarray: Vecteurs de caractéristiques [N, D]
+        """
+        if self.use_onnx:
+            return self.run_onnx_batch(batch)
+
+        import torch
+
+        with torch.no_grad():
+            features = self.model(torch.from_numpy(np.ascontiguousarray(batch)).to(self.device))
+        return features.cpu().numpy().reshape(len(batch), -1)
+
+    def get_index(self, dataset, index='exact'):
+        """
+        Retourne l'index de recherche du dataset, construit au premier appel puis réutilisé.
+
+        Avec config.RERANK, l'index demandé sert de premier étage à un TwoStageIndex.
+
+        Args:
+            dataset: DataFrame contenant les vecteurs de caractéristiques pré-calculés
+            index: Type d'index ('exact', 'ivf' ou 'pq')
+
+        Returns:
+            EmbeddingIndex | IVFIndex | PQIndex | TwoStageIndex: Index associé au dataset
+        """
+        if not config.RERANK:
+            return self._base_index(dataset, index)
+
+        key = f"{index}+rerank"
+        cached = self._index_cache.get(key)
+        if cached is not None and cached[0] is dataset:
+            return cached[1]
+        built = self._two_stage_index(dataset, self._base_index(dataset, index))
+        self._index_cache[key] = (dataset, built)
+        return built
+
+    def _base_index(self, dataset, index):
+        """Index de premier étage (sans réévaluation), construit une fois par dataset."""
+        cached = self._index_cache.get(index)
+        if cached is not None and cached[0] is dataset:
+            return cached[1]
+
+        if index == 'exact':
+            built = self._exact_index(dataset)
+        elif index == 'ivf':
+            built = self._load_or_build_ivf(dataset)
+        elif index == 'pq':
+            built = self._load_or_build_pq(dataset)
+        else:
+            raise ValueError(f"Type d'index inconnu : {index}")
+
+        self._index_cache[index] = (dataset, built)
+        return built
+
+    def _two_stage_index(self, dataset, first_stage):
+        """
+        Ajoute au premier étage la réévaluation exacte et les signaux configurés.
+        """
+        if getattr(first_stage, 'vectors', None) is not None:
+            vectors, vector_row_ids = first_stage.vectors, first_stage.row_ids
+        else:
+            exact = self._exact_index(dataset)
+            vectors, vector_row_ids = exact.vectors, exact.row_ids
+        if isinstance(first_stage, PQIndex):
+            # La réévaluation exacte est faite par le second étage
+            first_stage.rerank = 0
+
+        signals = []
+        if config.RERANK_COLOR_WEIGHT > 0:
+            if os.path.exists(config.RERANK_COLOR_HISTOGRAMS):
+                histograms = np.load(config.RERANK_COLOR_HISTOGRAMS, mmap_mode='r')
+                if len(histograms) == len(dataset):
+                    signals.append(ColorSignal(histograms, config.RERANK_COLOR_WEIGHT))
+                else:
+                    print(f"Histogrammes couleur obsolètes ({len(histograms)} lignes au lieu de {len(dataset)}), signal ignoré")
+            else:
+                print(f"Histogrammes couleur introuvables ({config.RERANK_COLOR_HISTOGRAMS}), signal ignoré")
+        if config.RERANK_BOOST_COLUMN and config.RERANK_BOOST_WEIGHT and config.RERANK_BOOST_COLUMN in dataset:
+            boosts = pd.to_numeric(dataset[config.RERANK_BOOST_COLUMN], errors='coerce').fillna(0).to_numpy()
+            signals.append(BoostSignal(boosts, config.RERANK_BOOST_WEIGHT))
+
+        return TwoStageIndex(
+            first_stage, vectors, vector_row_ids, len(dataset),
+            signals=signals, shortlist=config.RERANK_SHORTLIST,
+        )
+
+    def set_index(self, dataset, built, index='exact'):
+        """
+        Enregistre un index déjà construit (ex. : mappé depuis un catalogue) pour un dataset.
+
+        Args:
+            dataset: DataFrame dont les positions de lignes correspondent aux row_ids de l'index
+            built: Index à utiliser
+            index: Type d'index
+        """
+        self._index_cache[index] = (dataset, built)
+
+    def _indexed_rows(self, dataset):
+        """Positions des lignes à indexer : une par tenue si la déduplication est active."""
+        if config.DEDUPE_OUTFITS:
+            return outfit_representative_rows(dataset)
+        return np.flatnonzero(dataset['Embedding'].notna().to_numpy())
+
+    def _exact_index(self, dataset):
+        """Index exact déjà enregistré pour le dataset, sinon construit depuis la colonne Embedding."""
+        cached = self._index_cache.get('exact')
+        if cached is not None and cached[0] is dataset:
+            return cached[1]
+        return EmbeddingIndex.from_dataframe(dataset, rows=self._indexed_rows(dataset))
+
+    def _index_fingerprint(self, dataset, **params):
+        """Empreinte attendue d'un index sauvegardé pour ce dataset et ces paramètres de construction."""
+        if 'Embedding' in dataset:
+            row_ids = self._indexed_rows(dataset)
+        else:
+            row_ids = self._exact_index(dataset).row_ids
+        return index_fingerprint(row_ids, self.vectors_source, **params)
+
+    def _load_or_build_ivf(self, dataset):
+        """
+        Charge l'index IVF sauvegardé si son empreinte correspond au dataset, sinon le construit
+        et le sauvegarde (les workers suivants n'ont plus à refaire le k-means).
+        """
+        fingerprint = self._index_fingerprint(dataset, n_lists=config.IVF_N_LISTS)
+        if os.path.exists(os.path.join(config.IVF_INDEX_PATH, "meta.json")):
+            ivf = IVFIndex.load(config.IVF_INDEX_PATH)
+            if ivf.fingerprint == fingerprint:
+                ivf.nprobe = config.IVF_NPROBE
+                return ivf
+            print("Index IVF obsolète (données ou paramètres de construction différents), reconstruction")
+
+        ivf = IVFIndex.from_exact(
+            self._exact_index(dataset),
+            n_lists=config.IVF_N_LISTS,
+            nprobe=config.IVF_NPROBE,
+        )
+        ivf.fingerprint = fingerprint
+        ivf = self._save_and_reload(ivf, config.IVF_INDEX_PATH)
+        ivf.nprobe = config.IVF_NPROBE
+        return ivf
+
+    def _load_or_build_pq(self, dataset):
+        """
+        Charge l'index PQ sauvegardé si son empreinte correspond au dataset, sinon le construit
+        et le sauvegarde.
+
+        L'index construit est rechargé depuis le disque : seuls les codes restent en
+        mémoire, les vecteurs float32 de réévaluation sont mappés.
+        """
+        fingerprint = self._index_fingerprint(dataset, subvector_dim=config.PQ_SUBVECTOR_DIM)
+        if os.path.exists(os.path.join(config.PQ_INDEX_PATH, "meta.json")):
+            pq = PQIndex.load(config.PQ_INDEX_PATH)
+            if pq.fingerprint == fingerprint:
+                pq.rerank = config.PQ_RERANK
+                return pq
+            print("Index PQ obsolète (données ou paramètres de construction différents), reconstruction")
+
+        pq = PQIndex.from_exact(
+            self._exact_index(dataset),
+            subvector_dim=config.PQ_SUBVECTOR_DIM,
+            rerank=config.PQ_RERANK,
+        )
+        pq.fingerprint = fingerprint
+        pq = self._save_and_reload(pq, config.PQ_INDEX_PATH)
+        pq.rerank = config.PQ_RERANK
+        return pq
+
+    @staticmethod
+    def _save_and_reload(built, path):
+        """
+        Sauvegarde un index construit puis le recharge depuis le disque (vecteurs mappés).
+
+        Si le dossier n'est pas inscriptible, l'index construit reste utilisé en mémoire.
+        """
+        try:
+            built.save(path)
+        except OSError as e:
+            print(f"Impossible de sauvegarder l'index dans {path} : {e}")
+            return built
+        return type(built).load(path)
+
+    def release_embeddings(self, dataset, index='exact'):
+        """
+        Supprime la colonne Embedding du dataset quand l'index de recherche garde ses propres
+        vecteurs (IVF/PQ), pour ne pas conserver deux copies des embeddings en mémoire.
+
+        La colonne est supprimée en place : l'index reste associé au même DataFrame.
+
+        Args:
+            dataset: DataFrame déjà indexé avec `get_index`
+            index: Type d'index utilisé pour la recherche
+
+        Returns:
+            bool: True si la colonne a été supprimée
+        """
+        if index == 'exact' or 'Embedding' not in dataset:
+            return False
+        if getattr(self._base_index(dataset, index), 'vectors', None) is None:
+            return False
+        del dataset['Embedding']
+        return True
+
+    def search(self, user_vectors, dataset, top_k=3, index='exact', features=None):
+        """
+        Recherche vectorisée : positions de lignes et scores, sans matérialiser les lignes.
+
+        Args:
+            user_vectors: Vecteurs de caractéristiques [Q, D] (ou [D])
+            dataset: DataFrame contenant les vecteurs de caractéristiques pré-calculés
+            top_k: Nombre de résultats par requête
+            index: Type d'index de recherche ('exact', 'ivf' ou 'pq')
+            features (dict): Caractéristiques des requêtes pour la réévaluation (ex. 'color_histogram')
+
+        Returns:
+            tuple: (row_ids [Q, top_k], scores [Q, top_k]) ; les cases vides valent -1 / -inf
+        """
+        search_index = self.get_index(dataset, index=index)
+        queries = np.atleast_2d(np.asarray(user_vectors, dtype=np.float32))
+        if isinstance(search_index, TwoStageIndex):
+            return search_index.search(queries, top_k, features=features)
+        return search_index.search(queries, top_k)
+
+    @staticmethod
+    def _materialize(dataset, row_ids, scores):
+        """Tuples (ligne, score, index) des seules lignes retenues."""
+        return [
+            (dataset.iloc[row_id], float(score), dataset.index[row_id])
+            for row_id, score in zip(row_ids, scores)
+            if row_id >= 0
+        ]
+
+    def find_closest_match(self, user_vector, dataset, metric='cosine', top_k=3, index='exact', features=None):
         """
         Trouve les top_k correspondances les plus proches dans le jeu de données selon la métrique choisie.
 
         Args:
             user_vector: Vecteur de caractéristiques ConvNeXt de l'image utilisateur
             dataset: DataFrame contenant les vecteurs de caractéristiques pré-calculés
-            metric: Métrique de similarité ('cosine' ou 'l2')
+            metric: Métrique de similarité ('cosine')
             top_k: Nombre de résultats les plus proches à retourner
+            index: Type d'index de recherche ('exact', 'ivf' ou 'pq')
+            features (dict): Caractéristiques de la requête pour la réévaluation
 
         Returns:
-            list: Liste de tuples (ligne, score de similarité) pour les top_k plus proches
+            list: Liste de tuples (ligne, score de similarité, index) pour les top_k plus proches
         """
         try:
-            # Filtrer les entrées avec des embeddings valides
-            valid_dataset = dataset.dropna(subset=['Embedding'])
-            dataset_vectors = np.vstack(valid_dataset['Embedding'].values)
+            if metric != 'cosine':
+                raise ValueError(f"Métrique non supportée : {metric}")
 
-            # Recherche initiale avec ConvNeXt
-            if metric == 'cosine':
-                similarities = cosine_similarity(user_vector.reshape(1, -1), dataset_vectors)
-                # Récupérer plus de candidats pour le re-ranking
-                initial_k = min(top_k * 3, len(valid_dataset))
-                top_indices = np.argsort(similarities[0])[-initial_k:][::-1]
-                top_scores = similarities[0][top_indices]
+            row_ids, scores = self.search(user_vector, dataset, top_k=top_k, index=index, features=features)
+            return self._materialize(dataset, row_ids[0], scores[0])
 
-            # Préparer les candidats pour le re-ranking
-            candidates = []
-            for i, (idx, score) in enumerate(zip(top_indices, top_scores)):
-                row = valid_dataset.iloc[idx]
-                candidates.append((row, score, valid_dataset.index[idx]))
+        except Exception as e:
+            print(f"Erreur lors de la recherche de la correspondance la plus proche : {e}")
+            return []
 
-            results = candidates[:top_k]
+    def find_closest_matches(self, user_vectors, dataset, metric='cosine', top_k=3, index='exact', features=None):
+        """
+        Version par lot de `find_closest_match` : une seule recherche pour toutes les requêtes.
 
-            return results
+        Args:
+            user_vectors: Vecteurs de caractéristiques [Q, D]
+            dataset: DataFrame contenant les vecteurs de caractéristiques pré-calculés
+            metric: Métrique de similarité ('cosine')
+            top_k: Nombre de résultats les plus proches par requête
+            index: Type d'index de recherche ('exact', 'ivf' ou 'pq')
+            features (dict): Caractéristiques des requêtes pour la réévaluation (valeurs [Q, ...])
 
-        except Exception as e:
-            print(f"Erreur lors de la recherche de la correspondance la plus proche : {e}")
-            return []
\ No newline at end of file
+        Returns:
+            list: Pour chaque requête, liste de tuples (ligne, score de similarité, index)
+        """
+        if metric != 'cosine':
+            raise ValueError(f"Métrique non supportée : {metric}")
+
+        all_row_ids, all_scores = self.search(user_vectors, dataset, top_k=top_k, index=index, features=features)
+        return [
+            self._materialize(dataset, row_ids, scores)
+            for row_ids, scores in zip(all_row_ids, all_scores)
+        ]
@@ -0,0 +1,146 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceScheduler:
+    """
+    Regroupe les tenseurs prétraités d'appelants concurrents en micro-lots.
+
+    Un thread dédié attend le premier tenseur, puis collecte les suivants
+    pendant au plus `max_wait_ms` ou jusqu'à `max_batch_size`, exécute le lot
+    [N, 3, H, W] en un seul appel et renvoie à chaque appelant sa ligne du
+    résultat via un Future.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=2.0, name="onnx-batcher"):
+        """
+        Args:
+            run_batch (callable): Fonction exécutant un lot np.ndarray [N, ...] et retournant [N, D]
+            max_batch_size (int): Taille maximale d'un lot
+            max_wait_ms (float): Attente maximale pour compléter un lot après le premier tenseur
+            name (str): Nom du thread de traitement
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._batch_size_counts = {}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._run_total = 0.0
+
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, tensor):
+        """
+        Soumet un tenseur prétraité (sans dimension de lot).
+
+        Args:
+            tensor (np.ndarray): Tenseur [3, H, W]
+
+        Returns:
+            Future: Résolu avec le vecteur de sortie [D]
+        """
+        if self._closed:
+            raise RuntimeError("Le planificateur d'inférence est arrêté")
+        future = Future()
+        self._queue.put((tensor, future, time.perf_counter()))
+        return future
+
+    def infer(self, tensor, timeout=None):
+        """Soumet un tenseur et attend son vecteur de sortie."""
+        return self.submit(tensor).result(timeout=timeout)
+
+    def close(self):
+        """Arrête le thread de traitement après avoir vidé la file."""
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        """Attend un premier élément puis complète le lot jusqu'à l'échéance."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Remettre le signal d'arrêt pour la prochaine itération
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            tensors = [tensor for tensor, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+            try:
+                outputs = self.run_batch(np.stack(tensors))
+            except Exception as e:
+                logger.error("Erreur lors de l'inférence par lot : %s", e)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+            self._record(batch, started, finished)
+
+    def _record(self, batch, started, finished):
+        waits = [started - enqueued for _, _, enqueued in batch]
+        with self._metrics_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+            self._queue_wait_total += sum(waits)
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+            self._run_total += finished - started
+
+    def metrics(self):
+        """
+        Retourne les métriques de regroupement.
+
+        Returns:
+            dict: Nombre de lots et de requêtes, distribution des tailles de lot,
+                attente moyenne/max en file et durée moyenne d'un lot (ms)
+        """
+        with self._metrics_lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                "batches": batches,
+                "requests": requests,
+                "mean_batch_size": requests / batches if batches else 0.0,
+                "batch_size_counts": dict(sorted(self._batch_size_counts.items())),
+                "queue_wait_ms_mean": 1000 * self._queue_wait_total / requests if requests else 0.0,
+                "queue_wait_ms_max": 1000 * self._queue_wait_max,
+                "batch_run_ms_mean": 1000 * self._run_total / batches if batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+            }
@@ -0,0 +1,205 @@
+import asyncio
+import collections
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+import backend.models.config as config
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Latences récentes des appels réussis, par modèle (fenêtre glissante)."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, model, seconds):
+        with self._lock:
+            self._samples[model].append(seconds)
+
+    def percentile(self, model, q, min_samples=1):
+        """Percentile `q` des latences du modèle (s), ou None avec moins de `min_samples` mesures."""
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return float(np.percentile(samples, q))
+
+    def counts(self):
+        with self._lock:
+            return {model: len(samples) for model, samples in self._samples.items()}
+
+
+class ModelRouter:
+    """
+    Routage des appels Pixtral sous contrainte de latence.
+
+    L'appel part sur le modèle principal. Si `hedge` est actif, une requête dupliquée part
+    après le percentile `hedge_percentile` des latences observées du principal (seules les
+    requêtes de la traîne en paient le coût). Si le budget de latence est dépassé ou si un
+    appel échoue, le modèle de repli est lancé à son tour. La première réponse gagne ; les
+    autres appels sont annulés.
+    """
+
+    def __init__(
+            self, primary, fallback=None, budget_s=0.0, hedge=False, hedge_model=None,
+            hedge_percentile=95.0, hedge_min_samples=20, tracker=None
+        ):
+        """
+        Args:
+            primary (str): Modèle principal
+            fallback (str): Modèle de repli, plus rapide (None : pas de repli)
+            budget_s (float): Budget de latence par défaut avant le repli (0 : repli sur erreur seulement)
+            hedge (bool): Dupliquer les requêtes lentes
+            hedge_model (str): Modèle de la requête dupliquée (défaut : le principal)
+            hedge_percentile (float): Percentile des latences du principal déclenchant la duplication
+            hedge_min_samples (int): Mesures nécessaires avant de dupliquer
+            tracker (LatencyTracker): Latences observées (partageable entre routeurs)
+        """
+        self.primary = primary
+        self.fallback = fallback if fallback and fallback != primary else None
+        self.budget_s = budget_s
+        self.hedge = hedge
+        self.hedge_model = hedge_model or primary
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.tracker = tracker or LatencyTracker()
+        self._decisions = collections.Counter()
+
+    def hedge_delay(self):
+        """Délai avant la requête dupliquée (s), ou None tant qu'elle n'est pas justifiée."""
+        if not self.hedge:
+            return None
+        return self.tracker.percentile(self.primary, self.hedge_percentile, self.hedge_min_samples)
+
+    def record(self, winner, reason):
+        """Enregistre l'issue d'un appel routé : modèle gagnant (rôle) et raison du routage."""
+        self._decisions[f"{winner}:{reason}"] += 1
+        metrics.LLM_ROUTING.inc(winner=winner, reason=reason)
+
+    async def _timed(self, call, model, slot=None):
+        start = time.monotonic()
+        try:
+            if slot is None:
+                result = await call(model)
+            else:
+                async with slot():
+                    result = await call(model)
+        except asyncio.CancelledError:
+            metrics.LLM_CALL_SECONDS.observe(time.monotonic() - start, model=model, outcome="cancelled")
+            raise
+        except Exception:
+            metrics.LLM_CALL_SECONDS.observe(time.monotonic() - start, model=model, outcome="error")
+            raise
+        elapsed = time.monotonic() - start
+        self.tracker.record(model, elapsed)
+        metrics.LLM_CALL_SECONDS.observe(elapsed, model=model, outcome="ok")
+        return result
+
+    async def run(self, call, budget_s=None, extra_slot=None):
+        """
+        Exécute un appel routé.
+
+        Args:
+            call (callable): Coroutine `call(model)` retournant le résultat, ou levant une exception
+            budget_s (float): Budget de latence de cette requête (défaut : celui du routeur)
+            extra_slot (callable): Contexte asynchrone pris par chaque appel supplémentaire
+                (duplication, repli), par exemple une place d'admission ; s'il est refusé,
+                l'appel compte comme un échec
+
+        Returns:
+            tuple: (résultat, modèle qui a répondu)
+
+        Raises:
+            Exception: Dernière erreur si tous les appels lancés ont échoué
+        """
+        budget_s = self.budget_s if budget_s is None else budget_s
+        start = time.monotonic()
+        hedge_delay = self.hedge_delay()
+        # Échéances encore à venir : [(instant, rôle)]
+        pending = []
+        if hedge_delay is not None:
+            pending.append((start + hedge_delay, "hedge"))
+        if self.fallback and budget_s and math.isfinite(budget_s) and budget_s > 0:
+            pending.append((start + budget_s, "fallback"))
+
+        tasks = {asyncio.ensure_future(self._timed(call, self.primary)): ("primary", self.primary)}
+        # Raison du lancement de chaque appel supplémentaire ('hedge', 'budget' ou 'error')
+        launched = {"primary": "none"}
+        error = None
+        try:
+            while True:
+                timeout = max(0.0, min(at for at, _ in pending) - time.monotonic()) if pending else None
+                if tasks:
+                    done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+                for task in done:
+                    role, model = tasks.pop(task)
+                    if task.exception() is None:
+                        # Le principal gagnant garde la raison du premier appel supplémentaire éventuel
+                        extra = [why for other, why in launched.items() if other != "primary"]
+                        reason = launched[role] if role != "primary" else (extra[0] if extra else "none")
+                        if role != "primary":
+                            logger.info("Réponse LLM servie par %s (%s, raison : %s)", model, role, reason)
+                        self.record(role, reason)
+                        return task.result(), model
+                    error = task.exception()
+                    logger.warning("Échec de l'appel LLM %s (%s) : %s", model, role, error)
+
+                now = time.monotonic()
+                due = [role for at, role in pending if at <= now]
+                pending = [(at, role) for at, role in pending if at > now]
+                failed = not tasks
+                if failed:
+                    # Tous les appels en cours ont échoué : repli (et duplication) sans attendre
+                    due += [role for _, role in pending]
+                    pending = []
+                    if self.fallback and "fallback" not in due:
+                        due.append("fallback")
+                for role in due:
+                    if role in launched:
+                        continue
+                    model = self.fallback if role == "fallback" else self.hedge_model
+                    logger.info("Appel LLM supplémentaire : %s (%s) après %.2f s", model, role, now - start)
+                    launched[role] = "error" if failed else ("budget" if role == "fallback" else "hedge")
+                    tasks[asyncio.ensure_future(self._timed(call, model, extra_slot))] = (role, model)
+                if not tasks:
+                    self.record("none", "error")
+                    raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def metrics(self):
+        """Décisions de routage (gagnant:raison), délai de duplication courant et mesures par modèle."""
+        hedge_delay = self.hedge_delay()
+        return {
+            "budget_seconds": self.budget_s,
+            "hedge_delay_seconds": hedge_delay,
+            **{f"samples_{model}": count for model, count in self.tracker.counts().items()},
+            **{f"{decision}_total": count for decision, count in self._decisions.items()},
+        }
+
+
+def build_model_router():
+    """Routeur configuré par config.LLM_* ; None si LLM_ROUTING est désactivé."""
+    if not config.LLM_ROUTING:
+        return None
+    return ModelRouter(
+        primary=config.MODEL_ID,
+        fallback=config.LLM_FALLBACK_MODEL or None,
+        budget_s=config.LLM_LATENCY_BUDGET_S,
+        hedge=config.LLM_HEDGE,
+        hedge_model=config.LLM_HEDGE_MODEL or None,
+        hedge_percentile=config.LLM_HEDGE_PERCENTILE,
+        hedge_min_samples=config.LLM_HEDGE_MIN_SAMPLES,
+    )
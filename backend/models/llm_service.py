@@ -1,29 +1,41 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager, nullcontext
 from mistralai import Mistral
 import backend.models.config as config
-import os
+from backend import metrics
 from dotenv import load_dotenv
-from langsmith import Client
-from langsmith.run_helpers import traceable, get_current_run_tree
+from backend.models import tracing
+from backend.models.admission import build_admission_controller
+from backend.models.llm_routing import build_model_router
+from backend.models.response_cache import build_response_cache, response_cache_key
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configuration LangSmith
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-os.environ["LANGCHAIN_API_KEY"] = config.LANGSMITH_API_KEY
-os.environ["LANGCHAIN_PROJECT"] = "style-analyzer"
+# Version des prompts d'analyse : à incrémenter à chaque modification pour invalider le cache
+PROMPT_VERSION = "1"
+
+
+def build_chat_client():
+    """Client chat selon config.LLM_BACKEND : API Mistral ou remplaçant local."""
+    if config.LLM_BACKEND == "fake":
+        from backend.models.fake_mistral import FakeMistral
+
+        logger.warning("Client LLM simulé (LLM_BACKEND=fake) : aucune requête n'est envoyée à Mistral")
+        return FakeMistral.from_config()
+    if config.LLM_BACKEND != "mistral":
+        raise ValueError(f"Client LLM inconnu : {config.LLM_BACKEND}")
+    return Mistral(api_key=config.MISTRALAI_API_KEY)
 
-langsmith_client = Client()
 
 class PixtralVisionService:
     """
     Fournit des méthodes pour interagir avec le modèle Pixtral LAage.
     """
 
-    def __init__(self, temperature=0.2, top_p=0.6, max_tokens=2000):
+    def __init__(self, temperature=0.2, top_p=0.6, max_tokens=2000, client=None):
         """
         Initialise le service avec le modèle et les paramètres spécifiés.
 
@@ -31,118 +43,272 @@ class PixtralVisionService:
             temperature (float): Contrôle l'aléa dans la génération
             top_p (float): Paramètre de nucleus sampling
             max_tokens (int): Nombre maximum de tokens dans la réponse
+            client: Client chat (défaut : selon config.LLM_BACKEND, voir build_chat_client)
         """
 
-        self.model = Mistral(api_key=config.MISTRALAI_API_KEY)
+        self.model = client if client is not None else build_chat_client()
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.top_p = top_p
+        self.cache = build_response_cache(
+            config.LLM_CACHE,
+            path=config.LLM_CACHE_PATH,
+            max_entries=config.LLM_CACHE_SIZE,
+            ttl_seconds=config.LLM_CACHE_TTL_S,
+        )
+        # Limite des appels Pixtral simultanés et du débit (chemins asynchrones)
+        self.admission = build_admission_controller()
+        # Budget de latence, modèle de repli et requêtes dupliquées (chemins asynchrones)
+        self.router = build_model_router()
 
-    @traceable(name="generate_fashion_response", run_type="llm")
-    def generate_response(self, encoded_image, prompt):
+    def _chat_request(self, encoded_image, prompt, model=None):
+        """Arguments de l'appel chat Mistral (prompt texte + image base64), sur le modèle principal par défaut."""
+        logger.info("Envoi de la requête au LLM avec longueur du prompt : %d", len(prompt))
+        return {
+            "model": model or config.MODEL_ID,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": "data:image/jpeg;base64," + encoded_image,
+                            }
+                        }
+                    ]
+                }
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+        }
+
+    def _log_usage(self, usage, model):
         """
-        Génère une réponse du modèle à partir d'une image et d'un prompt.
+        Journalise la consommation de tokens et l'ajoute à la trace LangSmith courante.
+
+        Returns:
+            int | None: Total de tokens
+        """
+        total_tokens = None
+        if usage:
+            if isinstance(usage, dict):
+                prompt_tokens = usage.get("prompt_tokens") or usage.get("input_tokens")
+                completion_tokens = usage.get("completion_tokens") or usage.get("output_tokens")
+                total_tokens = usage.get("total_tokens")
+            else:
+                prompt_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None)
+                completion_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None)
+                total_tokens = getattr(usage, "total_tokens", None)
+            if total_tokens is None and prompt_tokens is not None and completion_tokens is not None:
+                total_tokens = prompt_tokens + completion_tokens
+            if prompt_tokens:
+                metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt", model=model)
+            if completion_tokens:
+                metrics.LLM_TOKENS.inc(completion_tokens, kind="completion", model=model)
+            logger.info(
+                "Tokens - prompt: %s, completion: %s, total: %s%s",
+                prompt_tokens,
+                completion_tokens,
+                total_tokens,
+                self._cache_summary(),
+            )
+            if tracing.current_span() is not None:
+                usage_payload = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": total_tokens,
+                }
+                tracing.add_metadata({
+                    "llm_model": model,
+                    "vision_model": config.VISION_MODEL_ID,
+                    "token_usage": usage_payload,
+                })
+                tracing.add_outputs({"usage": usage_payload})
+        return total_tokens
+
+    def _read_completion(self, response, model):
+        """
+        Extrait le contenu d'une réponse Mistral et journalise la consommation de tokens.
+
+        Returns:
+            tuple: (contenu, total de tokens ou None)
+        """
+        # Accéder au contenu via les attributs de l'objet
+        content = response.choices[0].message.content
+        total_tokens = self._log_usage(getattr(response, "usage", None), model)
+        logger.info("Réponse reçue avec une longueur de : %d", len(content))
+
+        # Vérifier si la réponse semble tronquée
+        if len(content) >= 7900:  # Proche des limites courantes des modèles
+            logger.warning("La réponse semble tronquée (longueur : %d)", len(content))
+
+        return content, total_tokens
+
+    @tracing.traced("generate_fashion_response", run_type="llm")
+    def _generate(self, encoded_image, prompt):
+        """Appel Mistral bloquant ; retourne (contenu, total de tokens)."""
+        try:
+            request = self._chat_request(encoded_image, prompt)
+            with metrics.stage("llm"):
+                response = self.model.chat.complete(**request)
+            return self._read_completion(response, request["model"])
+        except Exception as e:
+            logger.error("Erreur lors de la génération de la réponse : %s", str(e))
+            return f"Erreur lors de la génération de la réponse : {e}", None
+
+    @tracing.traced("pixtral_call", run_type="llm")
+    async def _complete_async(self, encoded_image, prompt, model):
+        """Un appel Mistral asynchrone sur `model` ; retourne (contenu, total de tokens) ou lève l'erreur."""
+        response = await self.model.chat.complete_async(**self._chat_request(encoded_image, prompt, model))
+        return self._read_completion(response, model)
+
+    @tracing.traced("generate_fashion_response", run_type="llm")
+    async def _generate_async(self, encoded_image, prompt, budget_s=None):
+        """
+        Appel Mistral asynchrone, routé (budget de latence, repli, duplication) si un routeur est actif.
 
         Args:
-            encoded_image (str): Chaîne image encodée en base64
-            prompt (str): Prompt texte pour guider la réponse du modèle
+            budget_s (float): Budget de latence de la requête (défaut : LLM_LATENCY_BUDGET_S)
 
         Returns:
-            str: Réponse du modèle
+            tuple: (contenu, total de tokens, modèle qui a répondu)
         """
         try:
-            logger.info("Envoi de la requête au LLM avec longueur du prompt : %d", len(prompt))
-
-            model = config.MODEL_ID
-
-            response = self.model.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": "data:image/jpeg;base64," + encoded_image,
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p
+            with metrics.stage("llm"):
+                if self.router is None:
+                    content, total_tokens = await self._complete_async(encoded_image, prompt, config.MODEL_ID)
+                    return content, total_tokens, config.MODEL_ID
+                # Chaque appel supplémentaire prend sa propre place (et son jeton de quota), sans attendre
+                (content, total_tokens), model = await self.router.run(
+                    lambda model: self._complete_async(encoded_image, prompt, model), budget_s,
+                    extra_slot=lambda: self._admitted(timeout=0),
+                )
+            return content, total_tokens, model
+        except Exception as e:
+            logger.error("Erreur lors de la génération de la réponse : %s", str(e))
+            return f"Erreur lors de la génération de la réponse : {e}", None, config.MODEL_ID
+
+    async def _open_stream(self, encoded_image, prompt, model):
+        """Ouvre un flux Mistral sur `model` et attend son premier événement ; retourne (itérateur, premier événement)."""
+        stream = await self.model.chat.stream_async(**self._chat_request(encoded_image, prompt, model))
+        events = stream.__aiter__()
+        return events, await events.__anext__()
+
+    async def _open_stream_routed(self, encoded_image, prompt, budget_s=None):
+        """
+        Ouvre le flux sur le modèle principal, ou sur le modèle de repli si l'ouverture échoue
+        ou si le premier morceau n'arrive pas dans le budget.
+
+        Args:
+            budget_s (float): Budget avant le premier morceau (défaut : LLM_FIRST_TOKEN_BUDGET_S)
+
+        Returns:
+            tuple: (modèle, itérateur des événements, premier événement)
+        """
+        fallback = self.router.fallback if self.router is not None else None
+        if budget_s is None:
+            budget_s = config.LLM_FIRST_TOKEN_BUDGET_S
+        if not fallback:
+            budget_s = 0
+        try:
+            events, first = await asyncio.wait_for(
+                self._open_stream(encoded_image, prompt, config.MODEL_ID), budget_s or None
             )
+            if self.router is not None:
+                self.router.record("primary", "none")
+            return config.MODEL_ID, events, first
+        except Exception as e:
+            if not fallback:
+                raise
+            reason = "budget" if isinstance(e, asyncio.TimeoutError) else "error"
+            logger.warning("Flux %s abandonné (%s), repli sur %s", config.MODEL_ID, reason, fallback)
+        events, first = await self._open_stream(encoded_image, prompt, fallback)
+        self.router.record("fallback", reason)
+        return fallback, events, first
 
-            # Accéder au contenu via les attributs de l'objet
-            content = response.choices[0].message.content
-            usage = getattr(response, "usage", None)
-            if usage:
-                if isinstance(usage, dict):
-                    prompt_tokens = usage.get("prompt_tokens") or usage.get("input_tokens")
-                    completion_tokens = usage.get("completion_tokens") or usage.get("output_tokens")
-                    total_tokens = usage.get("total_tokens")
-                else:
-                    prompt_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None)
-                    completion_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None)
-                    total_tokens = getattr(usage, "total_tokens", None)
-                if total_tokens is None and prompt_tokens is not None and completion_tokens is not None:
-                    total_tokens = prompt_tokens + completion_tokens
-                logger.info(
-                    "Tokens - prompt: %s, completion: %s, total: %s",
-                    prompt_tokens,
-                    completion_tokens,
-                    total_tokens,
-                )
-                run_tree = get_current_run_tree()
-                if run_tree:
-                    usage_payload = {
-                        "prompt_tokens": prompt_tokens,
-                        "completion_tokens": completion_tokens,
-                        "total_tokens": total_tokens,
-                    }
-                    new_metadata = {
-                        "llm_model": model,
-                        "vision_model": config.VISION_MODEL_ID,
-                        "token_usage": usage_payload,
-                    }
-                    if hasattr(run_tree, "add_metadata"):
-                        run_tree.add_metadata(new_metadata)
-                    elif isinstance(run_tree.metadata, dict):
-                        run_tree.metadata.update(new_metadata)
-                    if hasattr(run_tree, "add_outputs"):
-                        run_tree.add_outputs({"usage": usage_payload})
-                    elif isinstance(run_tree.outputs, dict):
-                        run_tree.outputs.update({"usage": usage_payload})
-            logger.info("Réponse reçue avec une longueur de : %d", len(content))
-
-            # Vérifier si la réponse semble tronquée
-            if len(content) >= 7900:  # Proche des limites courantes des modèles
-                logger.warning("La réponse semble tronquée (longueur : %d)", len(content))
-
-            return content
+    @tracing.traced("generate_fashion_response", run_type="llm")
+    async def _stream_async(self, encoded_image, prompt, budget_s=None):
+        """
+        Appel Mistral en streaming.
 
+        Yields:
+            tuple: ("delta", texte) pour chaque morceau, ("error", message) si le flux échoue
+                (la réponse partielle est alors incomplète), puis ("model", modèle qui a
+                répondu) et ("usage", total de tokens ou None)
+        """
+        total_tokens = None
+        length = 0
+        model = config.MODEL_ID
+        try:
+            with metrics.stage("llm"):
+                model, events, event = await self._open_stream_routed(encoded_image, prompt, budget_s)
+                while True:
+                    chunk = event.data
+                    if chunk.choices:
+                        delta = chunk.choices[0].delta.content
+                        if isinstance(delta, str) and delta:
+                            length += len(delta)
+                            yield "delta", delta
+                    if getattr(chunk, "usage", None):
+                        total_tokens = self._log_usage(chunk.usage, model)
+                    try:
+                        event = await events.__anext__()
+                    except StopAsyncIteration:
+                        break
+            logger.info("Réponse reçue avec une longueur de : %d", length)
         except Exception as e:
             logger.error("Erreur lors de la génération de la réponse : %s", str(e))
-            return f"Erreur lors de la génération de la réponse : {e}"
+            yield "error", f"Erreur lors de la génération de la réponse : {e}"
+        yield "model", model
+        yield "usage", total_tokens
 
-    def generate_fashion_response(
-            self, user_image_base64, matched_rows, all_items, similarity_score, threshold=0.8
-        ):
+    def generate_response(self, encoded_image, prompt):
         """
-        Génère une réponse spécifique à la mode en utilisant des prompts basés sur des rôles.
+        Génère une réponse du modèle à partir d'une image et d'un prompt.
 
         Args:
-            user_image_base64: Image utilisateur encodée en base64
-            matched_row: La ligne la plus proche du dataset
-            all_items: DataFrame avec tous les articles liés à l'image trouvée
-            similarity_score: Score de similarité entre l'image utilisateur et l'image trouvée
-            threshold: Similarité minimale pour considérer une correspondance exacte
+            encoded_image (str): Chaîne image encodée en base64
+            prompt (str): Prompt texte pour guider la réponse du modèle
 
         Returns:
-            str: Réponse détaillée sur la mode
+            str: Réponse du modèle
+        """
+        return self._generate(encoded_image, prompt)[0]
+
+    async def generate_response_async(self, encoded_image, prompt):
+        """Version asynchrone de `generate_response` : n'occupe aucun thread pendant l'appel."""
+        return (await self._generate_async(encoded_image, prompt))[0]
+
+    @asynccontextmanager
+    async def _admitted(self, timeout=None):
+        """
+        Place d'appel Pixtral accordée par le contrôle d'admission (lève Overloaded sinon).
+
+        Args:
+            timeout (float): Attente maximale (défaut : LLM_QUEUE_TIMEOUT_S ; 0 : place libre tout de suite)
+        """
+        if self.admission is None:
+            yield
+            return
+        async with self.admission.slot(timeout):
+            yield
+
+    def _cache_summary(self):
+        """Taux de succès et tokens économisés par le cache, à ajouter aux logs de tokens."""
+        if self.cache is None:
+            return ""
+        stats = self.cache.metrics()
+        return f" (cache : {stats['hit_rate']:.0%} de succès, {stats['saved_tokens']} tokens économisés)"
+
+    def _fashion_prompt(self, all_items, similarity_score, threshold):
+        """
+        Construit le prompt d'analyse selon la qualité de la correspondance.
+
+        Returns:
+            tuple: (liste des articles, description des articles, prompt)
         """
         items_list = []
         for _, row in all_items.iterrows():
@@ -180,8 +346,36 @@ class PixtralVisionService:
             "Cette analyse est destinée à un catalogue professionnel. Utilises un ton formel et descriptif.\n"
             "Et traduis les noms des articles similaires en français (mais pas les prix) plutôt que laisser les noms en anglais.\n"
           )
-        # Envoyer le prompt au modèle
-        response = self.generate_response(user_image_base64, assistant_prompt)
+        return items_list, items_description, assistant_prompt
+
+    def _fashion_cache_key(self, items_list, similarity_score, threshold, image_url, content_hash):
+        """Clé du cache de réponses, ou None si le cache est inactif ou la tenue inconnue."""
+        if self.cache is None or not image_url:
+            return None
+        return response_cache_key(
+            image_url,
+            items_list,
+            "exact" if similarity_score >= threshold else "similar",
+            PROMPT_VERSION,
+            config.MODEL_ID,
+            content_hash if config.LLM_CACHE_KEY_UPLOAD else None,
+        )
+
+    def _cached_response(self, cache_key):
+        """Analyse déjà générée pour cette clé, sinon None."""
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.info("Tokens - cache hit, économisés : %s%s", cached[1], self._cache_summary())
+        return cached[0]
+
+    def _finish_fashion_response(self, response, total_tokens, cache_key, items_description, similarity_score, threshold):
+        """Met en cache une analyse complète, ou la remplace par une réponse basique si elle est incomplète."""
+        # Ne mettre en cache qu'une analyse complète (ni erreur ni réponse de repli)
+        if cache_key is not None and len(response) >= 100 and not response.startswith("Erreur lors de la génération"):
+            self.cache.put(cache_key, response, total_tokens)
 
         # Vérifier si la réponse est incomplète
         if len(response) < 100:
@@ -189,4 +383,115 @@ class PixtralVisionService:
             section_header = "DÉTAILS DES ARTICLES :" if similarity_score >= threshold else "ARTICLES SIMILAIRES :"
             response = f"# Analyse Mode\n\nCette tenue présente une sélection de pièces soigneusement coordonnées.\n\n{section_header}\n{items_description}"
 
-        return response
\ No newline at end of file
+        return response
+
+    def generate_fashion_response(
+            self, user_image_base64, matched_rows, all_items, similarity_score, threshold=0.8,
+            image_url=None, content_hash=None
+        ):
+        """
+        Génère une réponse spécifique à la mode en utilisant des prompts basés sur des rôles.
+
+        Args:
+            user_image_base64: Image utilisateur encodée en base64
+            matched_row: La ligne la plus proche du dataset
+            all_items: DataFrame avec tous les articles liés à l'image trouvée
+            similarity_score: Score de similarité entre l'image utilisateur et l'image trouvée
+            threshold: Similarité minimale pour considérer une correspondance exacte
+            image_url: 'Image URL' de la tenue retenue (clé du cache de réponses)
+            content_hash: Empreinte de l'upload, ajoutée à la clé si LLM_CACHE_KEY_UPLOAD
+
+        Returns:
+            str: Réponse détaillée sur la mode
+        """
+        items_list, items_description, assistant_prompt = self._fashion_prompt(all_items, similarity_score, threshold)
+
+        # Même tenue, mêmes articles, même prompt : réutiliser l'analyse déjà générée
+        cache_key = self._fashion_cache_key(items_list, similarity_score, threshold, image_url, content_hash)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        # Envoyer le prompt au modèle
+        response, total_tokens = self._generate(user_image_base64, assistant_prompt)
+        return self._finish_fashion_response(response, total_tokens, cache_key, items_description, similarity_score, threshold)
+
+    async def generate_fashion_response_async(
+            self, user_image_base64, matched_rows, all_items, similarity_score, threshold=0.8,
+            image_url=None, content_hash=None, latency_budget_s=None, admit=True
+        ):
+        """
+        Version asynchrone de `generate_fashion_response` (client Mistral asynchrone).
+
+        Args:
+            latency_budget_s (float): Budget de latence de la requête avant le repli sur le
+                modèle plus rapide (défaut : LLM_LATENCY_BUDGET_S)
+            admit (bool): Passer par le contrôle d'admission du worker (False : traitements
+                hors ligne, qui bornent eux-mêmes leurs appels)
+
+        Returns:
+            str: Réponse détaillée sur la mode
+        """
+        items_list, items_description, assistant_prompt = self._fashion_prompt(all_items, similarity_score, threshold)
+
+        cache_key = self._fashion_cache_key(items_list, similarity_score, threshold, image_url, content_hash)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        async with self._admitted() if admit else nullcontext():
+            response, total_tokens, model = await self._generate_async(
+                user_image_base64, assistant_prompt, budget_s=latency_budget_s
+            )
+        if model != config.MODEL_ID:
+            # Analyse du modèle de repli : servie, mais pas mise en cache sous la clé du modèle principal
+            cache_key = None
+        return self._finish_fashion_response(response, total_tokens, cache_key, items_description, similarity_score, threshold)
+
+    async def stream_fashion_response_async(
+            self, user_image_base64, matched_rows, all_items, similarity_score, threshold=0.8,
+            image_url=None, content_hash=None, latency_budget_s=None
+        ):
+        """
+        Variante en streaming de `generate_fashion_response_async` ; `latency_budget_s` y borne
+        l'attente du premier token avant le repli (défaut : LLM_FIRST_TOKEN_BUDGET_S).
+
+        Yields:
+            tuple: ("delta", texte) au fil de la génération (en un seul morceau si la
+                réponse vient du cache), puis ("done", réponse complète), ou ("error", message)
+                si le flux a échoué en cours de route (rien n'est mis en cache)
+        """
+        items_list, items_description, assistant_prompt = self._fashion_prompt(all_items, similarity_score, threshold)
+
+        cache_key = self._fashion_cache_key(items_list, similarity_score, threshold, image_url, content_hash)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            yield "delta", cached
+            yield "done", cached
+            return
+
+        parts = []
+        total_tokens = None
+        error = None
+        async with self._admitted():
+            async for kind, payload in self._stream_async(user_image_base64, assistant_prompt, latency_budget_s):
+                if kind == "delta":
+                    parts.append(payload)
+                    yield "delta", payload
+                elif kind == "error":
+                    error = payload
+                elif kind == "model":
+                    if payload != config.MODEL_ID:
+                        cache_key = None
+                else:
+                    total_tokens = payload
+
+        if error is not None:
+            # Réponse partielle : ni mise en cache ni réponse finale
+            yield "error", error
+            return
+
+        response = self._finish_fashion_response(
+            "".join(parts), total_tokens, cache_key, items_description, similarity_score, threshold
+        )
+        yield "done", response
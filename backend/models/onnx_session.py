@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+
+import onnxruntime as ort
+
+import backend.models.config as config
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def available_cores():
+    """Cœurs utilisables par le processus (affinité CPU comprise)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def auto_profile(workers=1):
+    """
+    Profil par défaut : les cœurs de la machine sont partagés entre les workers.
+
+    Sans cela chaque worker crée un pool de threads intra-op de la taille de la
+    machine et les workers se disputent les mêmes cœurs.
+
+    Args:
+        workers (int): Processus workers servant l'application sur la machine
+
+    Returns:
+        dict: 'intra_op_threads', 'inter_op_threads', 'execution_mode', 'graph_optimization', 'mem_arena'
+    """
+    return {
+        "intra_op_threads": max(1, available_cores() // max(1, workers)),
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization": "all",
+        "mem_arena": True,
+    }
+
+
+def load_tuned_profile(path, workers):
+    """
+    Profil mesuré par `manage.py tune_onnx_session`.
+
+    Returns:
+        dict | None: Profil enregistré, s'il a été mesuré pour ce nombre de workers et de cœurs
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        tuned = json.load(f)
+    if tuned.get("workers") != workers or tuned.get("cores") != available_cores():
+        print(
+            f"Profil ONNX de {path} mesuré pour {tuned.get('workers')} workers sur {tuned.get('cores')} cœurs, "
+            f"ignoré ({workers} workers, {available_cores()} cœurs)"
+        )
+        return None
+    return tuned["profile"]
+
+
+def _env_overrides():
+    overrides = {}
+    if config.ONNX_INTRA_OP_THREADS:
+        overrides["intra_op_threads"] = int(config.ONNX_INTRA_OP_THREADS)
+    if config.ONNX_INTER_OP_THREADS:
+        overrides["inter_op_threads"] = int(config.ONNX_INTER_OP_THREADS)
+    if config.ONNX_EXECUTION_MODE:
+        overrides["execution_mode"] = config.ONNX_EXECUTION_MODE
+    if config.ONNX_GRAPH_OPTIMIZATION:
+        overrides["graph_optimization"] = config.ONNX_GRAPH_OPTIMIZATION
+    if config.ONNX_MEM_ARENA:
+        overrides["mem_arena"] = config.ONNX_MEM_ARENA.lower() == "true"
+    return overrides
+
+
+def resolve_profile(workers=None):
+    """
+    Profil de session effectif : défauts automatiques, puis profil mesuré, puis variables d'environnement.
+
+    Args:
+        workers (int): Workers sur la machine (défaut : config.WEB_CONCURRENCY)
+
+    Returns:
+        dict: Profil de session
+    """
+    workers = workers or config.WEB_CONCURRENCY
+    profile = auto_profile(workers)
+    profile.update(load_tuned_profile(config.ONNX_PROFILE_PATH, workers) or {})
+    profile.update(_env_overrides())
+    if profile["execution_mode"] not in EXECUTION_MODES:
+        raise ValueError(f"Mode d'exécution ONNX inconnu : {profile['execution_mode']}")
+    if profile["graph_optimization"] not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Niveau d'optimisation ONNX inconnu : {profile['graph_optimization']}")
+    return profile
+
+
+def session_options(profile):
+    """Construit les `ort.SessionOptions` d'un profil."""
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(profile["intra_op_threads"])
+    options.inter_op_num_threads = int(profile["inter_op_threads"])
+    options.execution_mode = EXECUTION_MODES[profile["execution_mode"]]
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[profile["graph_optimization"]]
+    options.enable_cpu_mem_arena = bool(profile["mem_arena"])
+    return options
+
+
+def optimized_model_path(model_path, profile, cache_dir):
+    """
+    Fichier du graphe optimisé d'un modèle.
+
+    La clé couvre le modèle source (taille, date), la version d'ONNX Runtime et le
+    niveau d'optimisation : un changement de l'un d'eux produit un nouveau fichier.
+    Les threads et l'arène n'affectent pas le graphe et n'en font pas partie.
+    """
+    stat = os.stat(model_path)
+    key = hashlib.sha1(
+        f"{stat.st_size}:{stat.st_mtime_ns}:{ort.__version__}:{profile['graph_optimization']}".encode("utf-8")
+    ).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, f"{name}.{key}.opt.onnx")
+
+
+def create_session(model_path, profile=None, cache_dir=None):
+    """
+    Ouvre une session ONNX Runtime avec un profil, via le graphe optimisé en cache si possible.
+
+    Au premier démarrage la session optimise le graphe et l'écrit dans `cache_dir` ;
+    les démarrages suivants chargent ce graphe sans le réoptimiser.
+
+    Args:
+        model_path (str): Modèle ONNX source
+        profile (dict): Profil de session (défaut : `resolve_profile()`)
+        cache_dir (str): Dossier des graphes optimisés (None : pas de cache)
+
+    Returns:
+        ort.InferenceSession: Session prête
+    """
+    profile = profile or resolve_profile()
+    options = session_options(profile)
+    if cache_dir is None or profile["graph_optimization"] == "disable":
+        return ort.InferenceSession(model_path, sess_options=options)
+
+    cached_path = optimized_model_path(model_path, profile, cache_dir)
+    if os.path.exists(cached_path):
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS["disable"]
+        try:
+            return ort.InferenceSession(cached_path, sess_options=options)
+        except Exception as e:
+            print(f"Graphe optimisé {cached_path} illisible ({e}), régénération")
+            os.remove(cached_path)
+            options = session_options(profile)
+
+    # Écriture dans un fichier propre au processus puis renommage : plusieurs workers peuvent démarrer ensemble
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    options.optimized_model_filepath = tmp_path
+    session = ort.InferenceSession(model_path, sess_options=options)
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, cached_path)
+    return session
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+
+class OutfitPostings:
+    """
+    Table de postings tenue -> articles.
+
+    Tous les articles d'une tenue partagent la même 'Image URL'. Les positions
+    (iloc) des articles sont rangées de façon contiguë par tenue, si bien que
+    récupérer les articles d'une tenue coûte O(articles) et non O(catalogue).
+    """
+
+    def __init__(self, image_urls, offsets, item_rows):
+        """
+        Args:
+            image_urls (np.ndarray): URL de chaque tenue [T]
+            offsets (np.ndarray): Début des articles de chaque tenue dans item_rows [T + 1]
+            item_rows (np.ndarray): Positions des articles, groupées par tenue [N]
+        """
+        self.image_urls = image_urls
+        self.offsets = offsets
+        self.item_rows = item_rows
+        self._outfit_ids = {url: i for i, url in enumerate(image_urls)}
+
+    @classmethod
+    def from_dataframe(cls, dataset, column='Image URL'):
+        """
+        Construit les postings depuis la colonne d'URL d'images.
+
+        Args:
+            dataset (DataFrame): Dataset (une ligne par article)
+            column (str): Colonne identifiant la tenue
+
+        Returns:
+            OutfitPostings: Postings prêts à interroger
+        """
+        codes, uniques = pd.factorize(dataset[column])
+        # Les lignes sans URL (code -1) n'appartiennent à aucune tenue
+        order = np.argsort(codes, kind="stable")
+        order = order[codes[order] >= 0]
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.asarray(uniques, dtype=object), offsets, order.astype(np.int64))
+
+    def __len__(self):
+        return len(self.image_urls)
+
+    def outfit_id(self, image_url):
+        """Identifiant de la tenue d'une URL, ou None si inconnue."""
+        return self._outfit_ids.get(image_url)
+
+    def rows_for_outfit(self, outfit_id):
+        """Positions (iloc) des articles d'une tenue."""
+        return self.item_rows[self.offsets[outfit_id]:self.offsets[outfit_id + 1]]
+
+    def rows_for_url(self, image_url):
+        """
+        Positions (iloc) des articles associés à une URL d'image.
+
+        Args:
+            image_url (str): URL de l'image de la tenue
+
+        Returns:
+            np.ndarray: Positions des articles (vide si l'URL est inconnue)
+        """
+        outfit_id = self.outfit_id(image_url)
+        if outfit_id is None:
+            return self.item_rows[:0]
+        return self.rows_for_outfit(outfit_id)
+
+
+def outfit_representative_rows(dataset, embedding_column='Embedding', outfit_column='Image URL'):
+    """
+    Sélectionne une ligne avec embedding par tenue (la première rencontrée).
+
+    Les articles d'une même tenue partagent le même embedding d'image : n'en
+    indexer qu'un évite de scorer plusieurs fois le même vecteur et d'obtenir
+    un top-k rempli de doublons. Les lignes sans URL sont toutes conservées.
+
+    Args:
+        dataset (DataFrame): Dataset (une ligne par article)
+        embedding_column (str): Colonne des embeddings
+        outfit_column (str): Colonne identifiant la tenue
+
+    Returns:
+        np.ndarray: Positions (iloc) des lignes représentatives, triées
+    """
+    valid_rows = np.flatnonzero(dataset[embedding_column].notna().to_numpy())
+    urls = dataset[outfit_column].iloc[valid_rows]
+    duplicate = (urls.duplicated(keep='first') & urls.notna()).to_numpy()
+    return valid_rows[~duplicate]
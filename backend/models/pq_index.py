@@ -0,0 +1,277 @@
+import json
+import os
+
+import numpy as np
+
+from backend.models.embedding_index import atomic_index_dir, normalize_rows, top_k_indices
+
+
+def kmeans(vectors, n_clusters, n_iter=20, sample_size=65536, seed=0, chunk_size=65536):
+    """
+    K-means euclidien en NumPy pur (codebook d'un sous-espace).
+
+    Args:
+        vectors (np.ndarray): Sous-vecteurs [N, d]
+        n_clusters (int): Nombre de centroïdes
+        n_iter (int): Nombre d'itérations de Lloyd
+        sample_size (int): Taille de l'échantillon d'entraînement
+        seed (int): Graine aléatoire
+        chunk_size (int): Vecteurs traités par bloc lors des affectations
+
+    Returns:
+        np.ndarray: Centroïdes [n_clusters, d] (répétés si N < n_clusters)
+    """
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        train = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        train = vectors
+    train = np.ascontiguousarray(train, dtype=np.float32)
+    picks = rng.choice(len(train), n_clusters, replace=len(train) < n_clusters)
+    centroids = train[picks].copy()
+
+    for _ in range(n_iter):
+        assignments = assign_codes(train, centroids, chunk_size)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        # Somme par cluster, une dimension à la fois (d est petit)
+        sums = np.stack(
+            [np.bincount(assignments, weights=train[:, j], minlength=n_clusters) for j in range(train.shape[1])],
+            axis=1,
+        ).astype(np.float32)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Réinitialiser les centroïdes vides sur des points aléatoires
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = train[rng.choice(len(train), len(empty))]
+    return centroids
+
+
+def assign_codes(vectors, centroids, chunk_size=65536):
+    """
+    Centroïde le plus proche (distance L2) de chaque vecteur.
+
+    Returns:
+        np.ndarray: Numéro du centroïde de chaque vecteur [N]
+    """
+    centroid_norms = np.sum(centroids * centroids, axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        # ||x - c||² = ||x||² - 2 x·c + ||c||² ; ||x||² ne change pas l'argmin
+        assignments[start:start + chunk_size] = np.argmin(centroid_norms - 2.0 * (block @ centroids.T), axis=1)
+    return assignments
+
+
+class PQIndex:
+    """
+    Index compressé par quantification produit (PQ).
+
+    Chaque vecteur normalisé est découpé en M sous-vecteurs, chacun remplacé par
+    le numéro (uint8) de son centroïde dans le codebook du sous-espace : un
+    vecteur float32 de D valeurs tient en M octets. La recherche est asymétrique
+    (ADC) : la requête reste en float32 et, pour chaque sous-espace, une table
+    de ses produits scalaires avec les 256 centroïdes donne le score d'un code
+    par simple lecture. Les `rerank` meilleurs candidats par requête peuvent
+    être réévalués exactement sur les vecteurs float32, mappés depuis le disque.
+    """
+
+    def __init__(self, codebooks, codes, row_ids, dim, vectors=None, rerank=4):
+        """
+        Args:
+            codebooks (np.ndarray): Centroïdes de chaque sous-espace [M, 256, d]
+            codes (np.ndarray): Codes uint8 rangés par sous-espace [M, N]
+            row_ids (np.ndarray): Position dans le dataset de chaque vecteur [N]
+            dim (int): Dimension d'origine des vecteurs (avant complétion à M·d)
+            vectors (np.ndarray): Vecteurs normalisés float32 [N, D] pour la réévaluation
+                exacte (np.memmap de préférence), ou None
+            rerank (int): Taille de la liste réévaluée, en multiple de k (0 : pas de réévaluation)
+        """
+        self.codebooks = codebooks
+        self.codes = codes
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+        self.dim = dim
+        self.vectors = vectors
+        self.rerank = rerank
+        self._subspaces = np.arange(len(codebooks))[:, None]
+        # Empreinte des données indexées (voir embedding_index.index_fingerprint), enregistrée avec l'index
+        self.fingerprint = None
+
+    @classmethod
+    def build(cls, vectors, row_ids, subvector_dim=4, n_iter=20, sample_size=65536, seed=0, rerank=4):
+        """
+        Entraîne les codebooks et encode les vecteurs.
+
+        Args:
+            vectors (np.ndarray): Vecteurs normalisés [N, D]
+            row_ids (np.ndarray): Position dans le dataset de chaque vecteur [N]
+            subvector_dim (int): Dimension d'un sous-vecteur (M = ⌈D / d⌉ octets par vecteur)
+            n_iter (int): Itérations k-means par sous-espace
+            sample_size (int): Vecteurs d'entraînement des codebooks
+            seed (int): Graine aléatoire
+            rerank (int): Taille de la liste réévaluée, en multiple de k
+
+        Returns:
+            PQIndex: Index construit (gardant `vectors` pour la réévaluation)
+        """
+        dim = vectors.shape[1]
+        n_subspaces = -(-dim // subvector_dim)
+        n_centroids = min(256, len(vectors))
+
+        codebooks = np.zeros((n_subspaces, 256, subvector_dim), dtype=np.float32)
+        codes = np.empty((n_subspaces, len(vectors)), dtype=np.uint8)
+        for m in range(n_subspaces):
+            sub = cls._subvectors(vectors, m, subvector_dim)
+            codebooks[m, :n_centroids] = kmeans(sub, n_centroids, n_iter=n_iter, sample_size=sample_size, seed=seed + m)
+            codes[m] = assign_codes(sub, codebooks[m, :n_centroids])
+        return cls(codebooks, codes, row_ids, dim, vectors=vectors, rerank=rerank)
+
+    @classmethod
+    def from_exact(cls, exact_index, **kwargs):
+        """Construit un PQIndex à partir d'un EmbeddingIndex exact."""
+        return cls.build(exact_index.vectors, exact_index.row_ids, **kwargs)
+
+    @staticmethod
+    def _subvectors(vectors, m, subvector_dim):
+        """Sous-vecteurs du sous-espace m, complétés par des zéros au-delà de D."""
+        start = m * subvector_dim
+        sub = np.asarray(vectors[:, start:start + subvector_dim], dtype=np.float32)
+        if sub.shape[1] < subvector_dim:
+            sub = np.pad(sub, ((0, 0), (0, subvector_dim - sub.shape[1])))
+        return sub
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def n_subspaces(self):
+        return self.codebooks.shape[0]
+
+    @property
+    def subvector_dim(self):
+        return self.codebooks.shape[2]
+
+    def memory_bytes(self):
+        """Mémoire résidente de l'index compressé (codes, codebooks, row_ids), hors vecteurs mappés."""
+        return self.codes.nbytes + self.codebooks.nbytes + self.row_ids.nbytes
+
+    def lookup_table(self, query):
+        """
+        Produits scalaires de la requête avec les centroïdes de chaque sous-espace.
+
+        Args:
+            query (np.ndarray): Vecteur requête normalisé [D]
+
+        Returns:
+            np.ndarray: Table [M, 256]
+        """
+        padded = np.zeros(self.n_subspaces * self.subvector_dim, dtype=np.float32)
+        padded[:self.dim] = query
+        return np.einsum("msd,md->ms", self.codebooks, padded.reshape(self.n_subspaces, self.subvector_dim))
+
+    def adc_scores(self, query, chunk_size=65536):
+        """
+        Scores approchés (ADC) de tous les vecteurs pour une requête normalisée.
+
+        Returns:
+            np.ndarray: Scores [N]
+        """
+        table = self.lookup_table(query)
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), chunk_size):
+            block = self.codes[:, start:start + chunk_size]
+            scores[start:start + chunk_size] = table[self._subspaces, block].sum(axis=0)
+        return scores
+
+    def search_one(self, query, k, rerank=None):
+        """
+        Recherche des k plus proches voisins d'une requête.
+
+        Args:
+            query (np.ndarray): Vecteur requête [D]
+            k (int): Nombre de résultats
+            rerank (int): Taille de la liste réévaluée en multiple de k (défaut : self.rerank)
+
+        Returns:
+            tuple: (row_ids [<=k], scores [<=k]) triés par score décroissant
+        """
+        rerank = self.rerank if rerank is None else rerank
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        scores = self.adc_scores(query)
+        if not rerank or self.vectors is None:
+            top = top_k_indices(scores, k)
+            return self.row_ids[top], scores[top]
+
+        # Réévaluation exacte de la liste courte : seules ces lignes sont lues sur disque
+        shortlist = np.sort(top_k_indices(scores, k * rerank))
+        exact = np.asarray(self.vectors[shortlist], dtype=np.float32) @ query
+        top = top_k_indices(exact, k)
+        return self.row_ids[shortlist[top]], exact[top]
+
+    def search(self, queries, k, rerank=None):
+        """
+        Recherche pour plusieurs requêtes.
+
+        Returns:
+            tuple: (row_ids [Q, k], scores [Q, k]) ; les cases vides valent -1 / -inf
+        """
+        queries = np.atleast_2d(queries)
+        all_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            ids, scores = self.search_one(query, k, rerank=rerank)
+            all_ids[i, :len(ids)] = ids
+            all_scores[i, :len(scores)] = scores
+        return all_ids, all_scores
+
+    def save(self, path):
+        """
+        Sauvegarde l'index dans un dossier, mis en place d'un bloc ; les vecteurs float32 y sont
+        écrits pour la réévaluation.
+
+        Args:
+            path (str): Dossier de destination
+        """
+        with atomic_index_dir(path) as tmp_path:
+            for name in ("codebooks", "codes", "row_ids"):
+                np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+            if self.vectors is not None:
+                np.save(os.path.join(tmp_path, "vectors.npy"), np.asarray(self.vectors, dtype=np.float32))
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({
+                    "type": "pq",
+                    "dim": self.dim,
+                    "n_rows": len(self),
+                    "n_subspaces": self.n_subspaces,
+                    "subvector_dim": self.subvector_dim,
+                    "rerank": self.rerank,
+                    "fingerprint": self.fingerprint,
+                }, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge un index sauvegardé avec `save` ; les vecteurs de réévaluation sont mappés, pas lus.
+
+        Args:
+            path (str): Dossier de l'index
+
+        Returns:
+            PQIndex: Index chargé
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("type") != "pq":
+            raise ValueError(f"Le dossier {path} ne contient pas un index PQ")
+
+        vectors_path = os.path.join(path, "vectors.npy")
+        index = cls(
+            codebooks=np.load(os.path.join(path, "codebooks.npy")),
+            codes=np.load(os.path.join(path, "codes.npy")),
+            row_ids=np.load(os.path.join(path, "row_ids.npy")),
+            dim=meta["dim"],
+            vectors=np.load(vectors_path, mmap_mode="r") if os.path.exists(vectors_path) else None,
+            rerank=meta["rerank"],
+        )
+        index.fingerprint = meta.get("fingerprint")
+        return index
@@ -0,0 +1,148 @@
+import base64
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import backend.models.config as config
+from backend.utils.http import check_public_url, fetch
+
+
+def open_image(image_input, is_url=True, public_only=False):
+    """
+    Ouvre une image sans la décoder.
+
+    Args:
+        image_input: URL, chemin local, octets bruts ou image PIL
+        is_url (bool): Une entrée texte est une URL (True) ou un chemin local (False)
+        public_only (bool): URL fournie par un client : revérifiée juste avant le
+            téléchargement (adresses publiques seulement) et sans suivre de redirection
+
+    Returns:
+        tuple: (octets d'origine ou None si l'entrée est déjà une image PIL, image PIL)
+    """
+    if isinstance(image_input, Image.Image):
+        return None, image_input
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        image_bytes = bytes(image_input)
+    elif is_url:
+        # Récupère l'image depuis l'URL (session partagée, délai maximal et réessais)
+        if public_only:
+            check_public_url(image_input, config.BATCH_URL_ALLOWED_HOSTS)
+            image_bytes = fetch(image_input, allow_redirects=False).content
+        else:
+            image_bytes = fetch(image_input).content
+    else:
+        # Charge l'image depuis un fichier local
+        with open(image_input, "rb") as f:
+            image_bytes = f.read()
+    return image_bytes, Image.open(BytesIO(image_bytes))
+
+
+def jpeg_base64(image_bytes, image):
+    """
+    Encode l'image en JPEG base64 pour le LLM ; un JPEG est transmis tel quel, sans décodage.
+
+    Returns:
+        tuple: (chaîne base64, image à prétraiter : décodée en RGB si elle a été réencodée)
+    """
+    if image_bytes is not None and image.format == "JPEG":
+        return base64.b64encode(image_bytes).decode("utf-8"), image
+    image = image.convert("RGB")
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8"), image
+
+
+class ImagePreprocessor:
+    """
+    Prétraitement ConvNeXt en PIL + NumPy, sans torch.
+
+    Reproduit Resize -> ToTensor -> Normalize de torchvision : redimensionnement
+    bilinéaire PIL direct vers la taille cible, puis normalisation écrite en
+    CHW float32 dans un tampon fourni par l'appelant. Pour un JPEG pas encore
+    décodé, `Image.draft()` laisse le décodeur réduire l'image (1/2, 1/4, 1/8)
+    tout en restant au-dessus de la taille cible.
+    """
+
+    def __init__(self, image_size=(224, 224), norm_mean=(0.485, 0.456, 0.406), norm_std=(0.229, 0.224, 0.225)):
+        """
+        Args:
+            image_size (tuple): Taille cible (hauteur, largeur), comme transforms.Resize
+            norm_mean (list): Moyennes de normalisation RGB
+            norm_std (list): Écarts-types de normalisation RGB
+        """
+        self.height, self.width = image_size
+        std = np.asarray(norm_std, dtype=np.float32)
+        # (x / 255 - mean) / std == x * scale - bias
+        self._scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self._bias = (np.asarray(norm_mean, dtype=np.float32) / std).astype(np.float32)
+
+    @property
+    def shape(self):
+        """Forme d'un tenseur prétraité [3, H, W]."""
+        return (3, self.height, self.width)
+
+    def allocate(self, n=None):
+        """
+        Alloue un tampon float32 [3, H, W], ou [n, 3, H, W] pour un lot.
+        """
+        shape = self.shape if n is None else (n,) + self.shape
+        return np.empty(shape, dtype=np.float32)
+
+    def resize(self, image):
+        """
+        Décode (réduit si possible) et redimensionne l'image en RGB à la taille cible.
+
+        Args:
+            image (PIL.Image.Image): Image ouverte, éventuellement non encore décodée
+
+        Returns:
+            PIL.Image.Image: Image RGB [H, W]
+        """
+        target = (self.width, self.height)
+        if image.format == "JPEG" and image.tile:
+            # Réduction au décodage : n'agit que si l'image n'est pas encore chargée
+            # (tuiles encore à décoder ; `image.im` lève une erreur avant le chargement depuis Pillow 11)
+            image.draft("RGB", target)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if image.size != target:
+            image = image.resize(target, Image.BILINEAR)
+        return image
+
+    def preprocess(self, image, out=None):
+        """
+        Prétraite une image en tenseur CHW float32 normalisé.
+
+        Args:
+            image (PIL.Image.Image): Image source
+            out (np.ndarray): Tampon [3, H, W] à remplir (alloué si absent)
+
+        Returns:
+            np.ndarray: Tenseur float32 [3, H, W] (le tampon `out` s'il est fourni)
+        """
+        if out is None:
+            out = self.allocate()
+        pixels = np.asarray(self.resize(image))
+        for channel in range(3):
+            np.multiply(pixels[:, :, channel], self._scale[channel], out=out[channel], casting="unsafe")
+            out[channel] -= self._bias[channel]
+        return out
+
+    def preprocess_batch(self, images, out=None):
+        """
+        Prétraite plusieurs images dans un même tampon de lot.
+
+        Args:
+            images (list): Images PIL
+            out (np.ndarray): Tampon [N', 3, H, W] réutilisable, N' >= len(images)
+
+        Returns:
+            np.ndarray: Vue [len(images), 3, H, W] du tampon
+        """
+        if out is None or len(out) < len(images):
+            out = self.allocate(len(images))
+        for i, image in enumerate(images):
+            self.preprocess(image, out=out[i])
+        return out[:len(images)]
@@ -0,0 +1,159 @@
+import base64
+import os
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from backend.models.catalog import Catalog, is_catalog
+from backend.models.embedding_index import normalize_rows
+
+
+def sample_catalog_images(source, n=200, seed=0):
+    """
+    Tire des images du catalogue pour la calibration et la comparaison des variantes.
+
+    Args:
+        source (str): Catalogue columnaire ou dataset pickle (colonne 'Encoded Image')
+        n (int): Nombre d'images
+        seed (int): Graine du tirage
+
+    Returns:
+        list: Octets des images
+    """
+    rng = np.random.default_rng(seed)
+    if is_catalog(source):
+        catalog = Catalog.load(source)
+        rows = rng.permutation(catalog.embedding_rows)
+        images = (catalog.image_bytes(int(row)) for row in rows)
+    else:
+        encoded = pd.read_pickle(source)['Encoded Image'].dropna().drop_duplicates().to_numpy()
+        images = (base64.b64decode(encoded[i]) for i in rng.permutation(len(encoded)))
+
+    sample = []
+    for raw in images:
+        if raw:
+            sample.append(raw)
+        if len(sample) >= n:
+            break
+    return sample
+
+
+def preprocess_images(preprocessor, images):
+    """Prétraite des octets d'images en un lot [N, 3, H, W]."""
+    return preprocessor.preprocess_batch([Image.open(BytesIO(raw)) for raw in images])
+
+
+def quantize_dynamic_model(src_path, dst_path):
+    """
+    Quantification INT8 dynamique : poids en INT8, activations quantifiées à la volée.
+
+    Ne demande aucune donnée ; dans ConvNeXt elle porte sur les couches linéaires (MatMul/Gemm).
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+
+
+def quantize_static_model(src_path, dst_path, calibration_batch):
+    """
+    Quantification INT8 statique (QDQ) : plages des activations calibrées sur des images du catalogue.
+
+    Args:
+        src_path (str): Modèle fp32
+        dst_path (str): Modèle quantifié à écrire
+        calibration_batch (np.ndarray): Images prétraitées [N, 3, H, W]
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Inférence des formes et fusions recommandées avant une quantification statique
+        prepared_path = os.path.join(tmp_dir, "prepared.onnx")
+        quant_pre_process(src_path, prepared_path, skip_symbolic_shape=True)
+
+        input_name = ort.InferenceSession(prepared_path).get_inputs()[0].name
+
+        class CatalogCalibrationReader(CalibrationDataReader):
+            """Fournit les images de calibration une par une."""
+
+            def __init__(self):
+                self._inputs = iter([{input_name: tensor[np.newaxis]} for tensor in calibration_batch])
+
+            def get_next(self):
+                return next(self._inputs, None)
+
+        quantize_static(
+            prepared_path,
+            dst_path,
+            CatalogCalibrationReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+
+
+def convert_fp16_model(src_path, dst_path):
+    """Conversion des poids et calculs en FP16, entrées/sorties gardées en float32."""
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(src_path), keep_io_types=True)
+    onnx.save(model, dst_path)
+
+
+def measure_latency(run_batch, batch, repeats=20):
+    """
+    Mesure la latence unitaire et le débit par lot d'une fonction d'inférence.
+
+    Returns:
+        dict: Latence moyenne et p95 d'une image (ms), débit par lots (images/s)
+    """
+    single = batch[:1]
+    run_batch(single)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_batch(single)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    run_batch(batch)
+    throughput = len(batch) / (time.perf_counter() - start)
+    return {
+        "latency_ms_mean": float(np.mean(timings)),
+        "latency_ms_p95": float(np.percentile(timings, 95)),
+        "throughput_ips": float(throughput),
+    }
+
+
+def compare_embeddings(reference, candidate, search_index, k=15):
+    """
+    Accord d'une variante avec la référence fp32.
+
+    Args:
+        reference (np.ndarray): Embeddings fp32 [N, D]
+        candidate (np.ndarray): Embeddings de la variante [N, D]
+        search_index (EmbeddingIndex): Index du catalogue
+        k (int): Profondeur du recouvrement top-k
+
+    Returns:
+        dict: Similarité cosinus moyenne/min et recouvrement moyen des top-k du catalogue
+    """
+    cosine = np.sum(normalize_rows(reference) * normalize_rows(candidate), axis=1)
+    ref_ids, _ = search_index.search(reference, k)
+    cand_ids, _ = search_index.search(candidate, k)
+    overlap = [len(set(a) & set(b)) / len(a) for a, b in zip(ref_ids, cand_ids)]
+    top1 = np.mean(ref_ids[:, 0] == cand_ids[:, 0])
+    return {
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        f"overlap@{k}": float(np.mean(overlap)),
+        "top1_agreement": float(top1),
+    }
+
@@ -0,0 +1,172 @@
+import numpy as np
+
+from backend.models.embedding_index import normalize_rows, top_k_indices
+
+# Histogramme couleur joint HSV (teinte, saturation, valeur)
+COLOR_BINS = (8, 4, 4)
+
+
+def color_histogram(image, size=64):
+    """
+    Histogramme couleur HSV normalisé (somme 1) d'une image.
+
+    Args:
+        image (PIL.Image.Image): Image source (réduite à size×size avant le calcul)
+        size (int): Côté de l'image réduite
+
+    Returns:
+        np.ndarray: Histogramme float32 [prod(COLOR_BINS)]
+    """
+    hsv = np.asarray(image.convert("RGB").resize((size, size)).convert("HSV"), dtype=np.uint16)
+    h_bins, s_bins, v_bins = COLOR_BINS
+    bins = (
+        (hsv[:, :, 0] * h_bins >> 8) * (s_bins * v_bins)
+        + (hsv[:, :, 1] * s_bins >> 8) * v_bins
+        + (hsv[:, :, 2] * v_bins >> 8)
+    )
+    histogram = np.bincount(bins.ravel(), minlength=h_bins * s_bins * v_bins).astype(np.float32)
+    return histogram / histogram.sum()
+
+
+class ColorSignal:
+    """Similarité des histogrammes couleur (intersection, entre 0 et 1) avec ceux du catalogue."""
+
+    name = "color_histogram"
+
+    def __init__(self, histograms, weight):
+        """
+        Args:
+            histograms (np.ndarray): Histogrammes précalculés par position de ligne [n_rows, B] (np.memmap possible)
+            weight (float): Poids ajouté au cosinus
+        """
+        self.histograms = histograms
+        self.weight = weight
+
+    def scores(self, row_ids, features):
+        """
+        Args:
+            row_ids (np.ndarray): Candidats [Q, C] (positions de lignes, >= 0)
+            features (dict): Caractéristiques des requêtes ; 'color_histogram' [Q, B]
+
+        Returns:
+            np.ndarray | None: Scores [Q, C], ou None sans histogramme de requête
+        """
+        query = features.get(self.name)
+        if query is None:
+            return None
+        query = np.atleast_2d(np.asarray(query, dtype=np.float32))
+        candidates = np.asarray(self.histograms[row_ids.ravel()], dtype=np.float32).reshape(row_ids.shape + (-1,))
+        return np.minimum(candidates, query[:, None, :]).sum(axis=-1)
+
+
+class BoostSignal:
+    """Bonus métier précalculé par ligne (mise en avant, stock, marge...)."""
+
+    name = "boost"
+
+    def __init__(self, boosts, weight):
+        """
+        Args:
+            boosts (np.ndarray): Bonus par position de ligne [n_rows], dans [0, 1]
+            weight (float): Poids ajouté au cosinus
+        """
+        self.boosts = np.asarray(boosts, dtype=np.float32)
+        self.weight = weight
+
+    def scores(self, row_ids, features):
+        return self.boosts[row_ids]
+
+
+class TwoStageIndex:
+    """
+    Recherche en deux temps : un premier étage peu coûteux (IVF, PQ) fournit une
+    liste courte de `shortlist × k` candidats, réévalués ensuite en bloc par le
+    cosinus exact float32 plus des signaux pondérés (couleur, bonus métier).
+
+    Tout le second étage est vectorisé sur le bloc [Q, C] des candidats ; seuls
+    les vecteurs float32 des candidats sont lus (depuis un np.memmap le cas échéant).
+    """
+
+    def __init__(self, first_stage, vectors, vector_row_ids, n_rows, signals=(), shortlist=4):
+        """
+        Args:
+            first_stage: Index exposant search(queries, k) -> (row_ids, scores)
+            vectors (np.ndarray): Vecteurs normalisés float32 [N, D] du second étage
+            vector_row_ids (np.ndarray): Position de ligne de chaque vecteur [N]
+            n_rows (int): Nombre de lignes du dataset
+            signals (list): Signaux additionnels (ColorSignal, BoostSignal)
+            shortlist (int): Taille de la liste courte, en multiple de k
+        """
+        self.first_stage = first_stage
+        self.vectors = vectors
+        self.row_ids = np.asarray(vector_row_ids, dtype=np.int64)
+        self.signals = list(signals)
+        self.shortlist = shortlist
+        # Position de ligne -> position du vecteur (-1 : ligne non indexée)
+        self._positions = np.full(n_rows, -1, dtype=np.int64)
+        self._positions[self.row_ids] = np.arange(len(self.row_ids))
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def rerank(self, queries, candidates, k, features=None):
+        """
+        Réévalue un bloc de candidats.
+
+        Args:
+            queries (np.ndarray): Requêtes normalisées [Q, D]
+            candidates (np.ndarray): Positions de lignes candidates [Q, C] (-1 : case vide)
+            k (int): Nombre de résultats par requête
+            features (dict): Caractéristiques des requêtes pour les signaux
+
+        Returns:
+            tuple: (row_ids [Q, k], scores [Q, k]) ; les cases vides valent -1 / -inf
+        """
+        valid = candidates >= 0
+        positions = np.where(valid, self._positions[np.where(valid, candidates, 0)], -1)
+        valid &= positions >= 0
+
+        # Lecture groupée et ordonnée des vecteurs candidats (accès séquentiel sur un memmap)
+        unique, inverse = np.unique(positions[valid], return_inverse=True)
+        block = np.zeros(candidates.shape + (self.vectors.shape[1],), dtype=np.float32)
+        block[valid] = np.asarray(self.vectors[unique], dtype=np.float32)[inverse]
+        scores = np.einsum("qcd,qd->qc", block, queries)
+
+        safe_rows = np.where(valid, candidates, 0)
+        for signal in self.signals:
+            extra = signal.scores(safe_rows, features or {})
+            if extra is not None:
+                scores += signal.weight * extra
+        scores[~valid] = -np.inf
+
+        top = top_k_indices(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=-1)
+        top_ids = np.where(np.isfinite(top_scores), np.take_along_axis(candidates, top, axis=-1), -1)
+        return top_ids, top_scores
+
+    def search(self, queries, k, features=None):
+        """
+        Recherche pour plusieurs requêtes.
+
+        Args:
+            queries (np.ndarray): Vecteurs requêtes [Q, D]
+            k (int): Nombre de résultats par requête
+            features (dict): Caractéristiques des requêtes (ex. 'color_histogram' [Q, B])
+
+        Returns:
+            tuple: (row_ids [Q, k], scores [Q, k]) ; les cases vides valent -1 / -inf
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        candidates, _ = self.first_stage.search(queries, k * self.shortlist)
+        return self.rerank(queries, candidates, k, features)
+
+    def search_one(self, query, k, features=None):
+        """
+        Recherche pour une requête.
+
+        Returns:
+            tuple: (row_ids [<=k], scores [<=k]) triés par score décroissant
+        """
+        row_ids, scores = self.search(query, k, features)
+        keep = row_ids[0] >= 0
+        return row_ids[0][keep], scores[0][keep]
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def response_cache_key(image_url, items, branch, prompt_version, model_id, content_hash=None):
+    """
+    Clé d'une analyse mode : même tenue, mêmes articles, même prompt et même modèle.
+
+    Args:
+        image_url (str): 'Image URL' de la tenue retenue
+        items (list): Articles décrits dans le prompt
+        branch (str): Branche du prompt ('exact' ou 'similar')
+        prompt_version (str): Version des prompts
+        model_id (str): Modèle LLM
+        content_hash (str): Empreinte de l'upload, pour ne partager une réponse qu'entre uploads identiques
+
+    Returns:
+        str: Empreinte SHA-256 hexadécimale
+    """
+    payload = json.dumps(
+        [image_url, list(items), branch, prompt_version, model_id, content_hash],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryResponseStore:
+    """Stockage en mémoire du processus : LRU borné avec expiration."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, tokens, created = entry
+            if time.time() - created > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return content, tokens
+
+    def put(self, key, content, tokens):
+        with self._lock:
+            self._entries[key] = (content, tokens, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteResponseStore:
+    """Stockage SQLite partagé entre les workers d'une même machine."""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, content TEXT, tokens INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT content, tokens, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return row[0], row[1]
+
+    def put(self, key, content, tokens):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, content, tokens, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, content, tokens, now, now),
+            )
+            # Éviction des entrées les moins récemment lues au-delà de la taille maximale
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Cache des analyses Pixtral avec expiration et compteurs de tokens économisés.
+    """
+
+    def __init__(self, store, ttl_seconds=86400):
+        """
+        Args:
+            store: MemoryResponseStore ou SQLiteResponseStore
+            ttl_seconds (float): Durée de validité d'une réponse
+        """
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_tokens = 0
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (réponse, tokens économisés) ou None
+        """
+        entry = self.store.get(key, self.ttl_seconds)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._saved_tokens += entry[1] or 0
+        return entry
+
+    def put(self, key, content, tokens=None):
+        self.store.put(key, content, tokens)
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Succès, échecs, taux de succès et tokens économisés
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "saved_tokens": self._saved_tokens,
+            }
+
+
+def build_response_cache(backend, path=None, max_entries=1024, ttl_seconds=86400):
+    """
+    Construit le cache de réponses selon le backend configuré.
+
+    Args:
+        backend (str): 'memory', 'sqlite' ou 'off'
+        path (str): Fichier SQLite (backend 'sqlite')
+        max_entries (int): Nombre maximal de réponses gardées
+        ttl_seconds (float): Durée de validité d'une réponse
+
+    Returns:
+        ResponseCache | None: None si le cache est désactivé
+    """
+    if backend == "off":
+        return None
+    if backend == "memory":
+        store = MemoryResponseStore(max_entries)
+    elif backend == "sqlite":
+        store = SQLiteResponseStore(path, max_entries)
+    else:
+        raise ValueError(f"Backend de cache inconnu : {backend}")
+    return ResponseCache(store, ttl_seconds=ttl_seconds)
@@ -0,0 +1,310 @@
+import contextvars
+import functools
+import inspect
+import logging
+import queue
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import backend.models.config as config
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# Longueur maximale d'une chaîne enregistrée dans une trace (l'image base64 n'est jamais envoyée entière)
+MAX_VALUE_CHARS = 1000
+
+# Requête écartée par l'échantillonnage : ses étapes ne sont pas tracées
+_NOT_SAMPLED = object()
+
+# Span en cours dans le contexte (None hors trace)
+_current_span = contextvars.ContextVar("style_finder_trace_span", default=None)
+
+_langsmith_client = None
+
+
+def get_langsmith_client():
+    """Client LangSmith créé au premier usage plutôt qu'à l'import du module."""
+    global _langsmith_client
+    if _langsmith_client is None:
+        from langsmith import Client
+
+        _langsmith_client = Client(api_key=config.LANGSMITH_API_KEY, api_url=config.LANGSMITH_ENDPOINT)
+    return _langsmith_client
+
+
+def _clip(value):
+    """Version compacte d'une valeur pour la trace (chaînes tronquées, objets lourds résumés)."""
+    if isinstance(value, str):
+        return value if len(value) <= MAX_VALUE_CHARS else f"{value[:MAX_VALUE_CHARS]}... ({len(value)} caractères)"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): _clip(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clip(item) for item in value[:20]]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} octets>"
+    return _clip(repr(value))
+
+
+class Span:
+    """Étape tracée, enregistrée en mémoire pendant la requête et exportée à la fin de sa trace."""
+
+    def __init__(self, name, run_type, inputs, parent=None):
+        self.id = uuid.uuid4()
+        self.name = name
+        self.run_type = run_type
+        self.inputs = inputs
+        self.outputs = {}
+        self.metadata = {}
+        self.error = None
+        self.parent = parent
+        self.children = []
+        self.start_time = datetime.now(timezone.utc)
+        self.end_time = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def end(self, outputs=None, error=None):
+        if outputs is not None:
+            self.outputs.update(outputs)
+        self.error = error
+        self.end_time = datetime.now(timezone.utc)
+
+
+class TraceExporter:
+    """
+    Export des traces dans un thread dédié, via une file bornée.
+
+    Une trace terminée est déposée sans attente ; si la file est pleine (LangSmith lent ou
+    indisponible), elle est abandonnée et comptée, sans jamais retarder la requête.
+    """
+
+    def __init__(self, max_queue=256, sink=None):
+        """
+        Args:
+            max_queue (int): Traces en attente d'export au maximum
+            sink (callable): Export d'une trace racine (par défaut : envoi à LangSmith)
+        """
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.sink = sink or post_to_langsmith
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, span):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            metrics.TRACES.inc(outcome="dropped")
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="style-finder-tracing", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            span = self.queue.get()
+            try:
+                self.sink(span)
+                metrics.TRACES.inc(outcome="exported")
+            except Exception as e:
+                metrics.TRACES.inc(outcome="failed")
+                logger.warning("Échec de l'export de la trace %s : %s", span.name, e)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Attend l'export des traces en file (commandes, arrêt du processus)."""
+        if self._thread is not None:
+            self.queue.join()
+
+
+def post_to_langsmith(span):
+    """Envoie une trace (racine et étapes enfants) à LangSmith."""
+    from langsmith.run_trees import RunTree
+
+    def _convert(span, parent=None):
+        kwargs = dict(
+            id=span.id, name=span.name, run_type=span.run_type, inputs=span.inputs,
+            start_time=span.start_time, extra={"metadata": span.metadata},
+        )
+        if parent is None:
+            run = RunTree(project_name=config.LANGSMITH_PROJECT, client=get_langsmith_client(), **kwargs)
+        else:
+            run = parent.create_child(**kwargs)
+        for child in span.children:
+            _convert(child, run)
+        run.end(outputs=span.outputs, error=span.error, end_time=span.end_time)
+        return run
+
+    _convert(span).post(exclude_child_runs=False)
+
+
+class Tracer:
+    """Traçage échantillonné : la décision est prise une fois par trace, à sa racine."""
+
+    def __init__(self, enabled=True, sample_rate=0.05, exporter=None):
+        """
+        Args:
+            enabled (bool): Coupe-circuit (False : aucune trace, aucun coût)
+            sample_rate (float): Part des traces conservées (0 à 1)
+            exporter (TraceExporter): Export des traces terminées
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter or TraceExporter()
+
+    def sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+
+_tracer = None
+
+
+def get_tracer():
+    """Traceur du processus, construit depuis la configuration au premier usage."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(
+            enabled=config.TRACING,
+            sample_rate=config.TRACING_SAMPLE_RATE,
+            exporter=TraceExporter(max_queue=config.TRACING_QUEUE_SIZE),
+        )
+    return _tracer
+
+
+def configure(enabled=None, sample_rate=None, sink=None, max_queue=None):
+    """
+    Remplace le traceur du processus (benchmarks, commandes).
+
+    Returns:
+        Tracer: Nouveau traceur
+    """
+    global _tracer
+    current = get_tracer()
+    _tracer = Tracer(
+        enabled=current.enabled if enabled is None else enabled,
+        sample_rate=current.sample_rate if sample_rate is None else sample_rate,
+        exporter=TraceExporter(
+            max_queue=current.exporter.queue.maxsize if max_queue is None else max_queue,
+            sink=sink or current.exporter.sink,
+        ),
+    )
+    return _tracer
+
+
+def _start(name, run_type, function, args, kwargs):
+    """
+    Ouvre un span pour un appel, ou None si l'appel n'est pas tracé.
+
+    Returns:
+        tuple: (span ou None, jeton du contexte ou None)
+    """
+    parent = _current_span.get()
+    if parent is _NOT_SAMPLED:
+        return None, None
+    if parent is None:
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return None, None
+        if not tracer.sampled():
+            # Les étapes de cette requête ne tentent pas un nouveau tirage
+            return None, _current_span.set(_NOT_SAMPLED)
+        metrics.TRACES.inc(outcome="sampled")
+    try:
+        bound = inspect.signature(function).bind(*args, **kwargs)
+        inputs = {key: _clip(value) for key, value in bound.arguments.items() if key != "self"}
+    except TypeError:
+        inputs = {}
+    span = Span(name, run_type, inputs, parent=parent)
+    return span, _current_span.set(span)
+
+
+def _finish(span, token, outputs=None, error=None):
+    if token is not None:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Générateur fermé depuis un autre contexte : rien à restaurer ici
+            pass
+    if span is None:
+        return
+    span.end(outputs=outputs, error=error)
+    if span.parent is None:
+        get_tracer().exporter.submit(span)
+
+
+def traced(name, run_type="chain"):
+    """
+    Trace une fonction, une coroutine ou un générateur asynchrone.
+
+    Hors trace, l'appel est une racine soumise à l'échantillonnage ; dans une trace, il en
+    devient une étape. Un appel non échantillonné n'enregistre rien.
+    """
+    def decorator(function):
+        if inspect.isasyncgenfunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                span, token = _start(name, run_type, function, args, kwargs)
+                error = None
+                chunks = 0
+                try:
+                    async for item in function(*args, **kwargs):
+                        chunks += 1
+                        yield item
+                except BaseException as e:
+                    error = repr(e)
+                    raise
+                finally:
+                    _finish(span, token, {"chunks": chunks}, error)
+        elif inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                span, token = _start(name, run_type, function, args, kwargs)
+                try:
+                    result = await function(*args, **kwargs)
+                except BaseException as e:
+                    _finish(span, token, error=repr(e))
+                    raise
+                _finish(span, token, {"output": _clip(result)} if span is not None else None)
+                return result
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                span, token = _start(name, run_type, function, args, kwargs)
+                try:
+                    result = function(*args, **kwargs)
+                except BaseException as e:
+                    _finish(span, token, error=repr(e))
+                    raise
+                _finish(span, token, {"output": _clip(result)} if span is not None else None)
+                return result
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """Span en cours, ou None si l'appel n'est pas tracé."""
+    span = _current_span.get()
+    return None if span is _NOT_SAMPLED else span
+
+
+def add_metadata(values):
+    """Ajoute des métadonnées au span en cours (sans effet hors trace)."""
+    span = current_span()
+    if span is not None:
+        span.metadata.update(values)
+
+
+def add_outputs(values):
+    """Ajoute des sorties au span en cours (sans effet hors trace)."""
+    span = current_span()
+    if span is not None:
+        span.outputs.update(values)
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+import backend.models.config as config
+from backend.models.catalog import is_catalog
+
+logger = logging.getLogger(__name__)
+
+# États possibles du registre
+STATE_IDLE = "idle"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+_lock = threading.Lock()
+_app = None
+_state = STATE_IDLE
+_error = None
+_load_seconds = None
+
+
+def dataset_source():
+    """Chemin du catalogue columnaire s'il existe, sinon du dataset pickle."""
+    if is_catalog(config.CATALOG_PATH):
+        return config.CATALOG_PATH
+    return config.DATASET_PATH
+
+
+def _build():
+    """
+    Construit l'instance StyleFinderApp partagée (dataset, ONNX, client Mistral).
+    Doit être appelée avec le verrou acquis.
+    """
+    global _app, _state, _error, _load_seconds
+
+    # Import local : évite un import circulaire avec backend.app
+    from backend.app import StyleFinderApp
+
+    _state = STATE_LOADING
+    start = time.perf_counter()
+    try:
+        _app = StyleFinderApp(dataset_source())
+    except Exception as e:
+        _state = STATE_FAILED
+        _error = str(e)
+        logger.error("Échec du chargement de l'application : %s", e)
+        raise
+    _load_seconds = time.perf_counter() - start
+    _state = STATE_READY
+    _error = None
+    logger.info("Application prête en %.2f s", _load_seconds)
+
+
+def get_app():
+    """
+    Retourne l'instance StyleFinderApp partagée par le processus.
+
+    La première invocation construit l'instance ; les appels concurrents
+    attendent la fin du chargement au lieu de construire leur propre copie.
+
+    Returns:
+        StyleFinderApp: Instance partagée entre les requêtes
+    """
+    if _app is not None:
+        return _app
+    with _lock:
+        if _app is None:
+            _build()
+    return _app
+
+
+def warmup(background=True):
+    """
+    Précharge l'application au démarrage du worker.
+
+    Args:
+        background (bool): Charge dans un thread dédié pour ne pas bloquer le démarrage du serveur
+    """
+    def _run():
+        try:
+            get_app()
+        except Exception:
+            # L'erreur est déjà enregistrée dans l'état du registre
+            pass
+
+    if background:
+        threading.Thread(target=_run, name="style-finder-warmup", daemon=True).start()
+    else:
+        _run()
+
+
+def is_ready():
+    """Indique si l'application est chargée et prête à servir."""
+    return _state == STATE_READY
+
+
+def status():
+    """
+    Retourne l'état de préparation du registre.
+
+    Returns:
+        dict: 'state', 'error', 'load_seconds', le profil de session ONNX et, si actifs, les métriques du micro-batching
+            et des caches (embeddings, réponses LLM), et l'état du contrôle d'admission et du routage des appels LLM
+    """
+    result = {
+        "state": _state,
+        "error": _error,
+        "load_seconds": _load_seconds,
+    }
+    if _app is not None and _app.image_processor.session_profile is not None:
+        result["onnx_profile"] = _app.image_processor.session_profile
+    if _app is not None and _app.image_processor.scheduler is not None:
+        result["inference_batching"] = _app.image_processor.scheduler.metrics()
+    if _app is not None and _app.image_processor.embedding_cache is not None:
+        result["embedding_cache"] = _app.image_processor.embedding_cache.metrics()
+    if _app is not None and _app.llm_service.cache is not None:
+        result["llm_cache"] = _app.llm_service.cache.metrics()
+    if _app is not None and _app.llm_service.admission is not None:
+        result["llm_admission"] = _app.llm_service.admission.metrics()
+    if _app is not None and _app.llm_service.router is not None:
+        result["llm_routing"] = _app.llm_service.router.metrics()
+    return result
+
+
+def reset():
+    """Oublie l'instance courante (rechargement du dataset, tests)."""
+    global _app, _state, _error, _load_seconds
+    with _lock:
+        if _app is not None and _app.image_processor.scheduler is not None:
+            _app.image_processor.scheduler.close()
+        _app = None
+        _state = STATE_IDLE
+        _error = None
+        _load_seconds = None
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import unittest
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+
+from backend.models.admission import AdmissionController, Overloaded  # noqa: E402
+from backend.views import _overloaded_response  # noqa: E402
+
+
+class AdmissionControllerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_full_queue_is_rejected_immediately(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_s=5.0)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with self.assertRaises(Overloaded) as rejected:
+            await controller.acquire()
+        with self.assertRaises(Overloaded):
+            controller.check()
+
+        self.assertEqual(rejected.exception.reason, "queue_full")
+        self.assertEqual(rejected.exception.status, 503)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        controller.release()
+        await waiting
+        self.assertEqual(controller.metrics()["queue_full_total"], 2)
+
+    async def test_waiters_are_admitted_in_arrival_order(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=None, queue_timeout_s=None)
+        await controller.acquire()
+        admitted = []
+
+        async def wait(name):
+            await controller.acquire()
+            admitted.append(name)
+
+        tasks = [asyncio.create_task(wait(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        for _ in tasks:
+            controller.release()
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*tasks)
+        self.assertEqual(admitted, ["a", "b", "c"])
+        self.assertEqual(controller.metrics()["in_flight"], 1)
+
+    async def test_queue_timeout_leaves_the_queue(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_s=0.05)
+        await controller.acquire()
+
+        with self.assertRaises(Overloaded) as rejected:
+            await controller.acquire()
+
+        self.assertEqual(rejected.exception.reason, "timeout")
+        self.assertEqual(rejected.exception.status, 503)
+        self.assertEqual(controller.metrics()["queue_depth"], 0)
+        controller.release()
+        self.assertEqual(controller.metrics()["in_flight"], 0)
+
+    async def test_cancelled_waiter_does_not_keep_a_slot(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_s=None)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        controller.release()
+
+        self.assertEqual(controller.metrics()["in_flight"], 0)
+        self.assertEqual(controller.metrics()["queue_depth"], 0)
+
+    async def test_exhausted_rate_is_rejected_with_retry_after(self):
+        controller = AdmissionController(max_in_flight=4, rate_per_minute=30, burst=1, queue_timeout_s=0.1)
+        async with controller.slot():
+            pass
+
+        with self.assertRaises(Overloaded) as rejected:
+            await controller.acquire()
+
+        # Un jeton toutes les 2 s
+        self.assertEqual(rejected.exception.reason, "rate_limited")
+        self.assertEqual(rejected.exception.status, 429)
+        self.assertEqual(rejected.exception.retry_after, 2)
+        self.assertEqual(controller.metrics()["in_flight"], 0)
+
+    async def test_zero_timeout_only_admits_a_free_slot(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_s=5.0)
+        await controller.acquire(timeout=0)
+
+        with self.assertRaises(Overloaded) as rejected:
+            await controller.acquire(timeout=0)
+
+        self.assertEqual(rejected.exception.reason, "timeout")
+
+
+class OverloadedResponseTest(unittest.TestCase):
+
+    def test_status_and_retry_after_header(self):
+        for reason, status in [("rate_limited", 429), ("queue_full", 503), ("timeout", 503)]:
+            with self.subTest(reason=reason):
+                response = _overloaded_response(Overloaded(reason, 2.3))
+
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response["Retry-After"], "3")
+
+
+if __name__ == "__main__":
+    unittest.main()
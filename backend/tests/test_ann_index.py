@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import backend.models.config as config
+from backend.models.ann_index import IVFIndex, recall_at_k
+from backend.models.embedding_index import EmbeddingIndex
+from backend.models.image_processor import ImageProcessor
+
+
+def clustered_vectors(n=2000, dim=32, n_clusters=20, seed=0):
+    """Vecteurs groupés autour de quelques centres, comme des embeddings de catalogue."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.3 * rng.standard_normal((n, dim))
+    return vectors.astype(np.float32)
+
+
+def index_processor():
+    """ImageProcessor sans modèle de vision : seules les méthodes d'index sont utilisées."""
+    with mock.patch.object(config, "VISION_USE_ONNX", False), \
+            mock.patch.object(config, "EMBEDDING_CACHE_SIZE", 0), \
+            mock.patch.object(ImageProcessor, "_load_torch_model"):
+        return ImageProcessor()
+
+
+class IVFIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        vectors = clustered_vectors()
+        cls.exact = EmbeddingIndex(vectors, np.arange(len(vectors)))
+        cls.ivf = IVFIndex.from_exact(cls.exact, n_lists=16, nprobe=4)
+        # Requêtes proches d'articles du catalogue
+        rng = np.random.default_rng(1)
+        cls.queries = vectors[rng.integers(0, len(vectors), 50)] + 0.1 * rng.standard_normal((50, 32)).astype(np.float32)
+
+    def test_recall_against_exact_search(self):
+        self.assertGreaterEqual(recall_at_k(self.ivf, self.exact, self.queries, 10), 0.9)
+
+    def test_probing_every_list_is_exact(self):
+        self.assertEqual(recall_at_k(self.ivf, self.exact, self.queries, 10, nprobe=self.ivf.n_lists), 1.0)
+
+    def test_save_load_round_trip(self):
+        self.ivf.fingerprint = {"row_ids": "abc", "n_lists": 16}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ivf")
+            self.ivf.save(path)
+            # Une seconde sauvegarde remplace la première sans laisser de dossier temporaire
+            self.ivf.save(path)
+            loaded = IVFIndex.load(path)
+
+            self.assertEqual(os.listdir(tmp), ["ivf"])
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            self.assertEqual(loaded.fingerprint, self.ivf.fingerprint)
+            expected = self.ivf.search(self.queries, 5)
+            actual = loaded.search(self.queries, 5)
+            np.testing.assert_array_equal(actual[0], expected[0])
+            np.testing.assert_allclose(actual[1], expected[1], rtol=1e-6)
+
+
+class LoadOrBuildIVFTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, value in {
+            "IVF_INDEX_PATH": os.path.join(self.tmp.name, "ivf"),
+            "IVF_N_LISTS": 8,
+            "IVF_NPROBE": 2,
+            "DEDUPE_OUTFITS": False,
+        }.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.dataset = pd.DataFrame({"Embedding": list(clustered_vectors(n=300))})
+
+    def test_built_index_is_saved_and_reused(self):
+        built = index_processor()._load_or_build_ivf(self.dataset)
+
+        with mock.patch.object(IVFIndex, "build") as build:
+            loaded = index_processor()._load_or_build_ivf(self.dataset)
+
+        build.assert_not_called()
+        self.assertEqual(loaded.fingerprint, built.fingerprint)
+        self.assertEqual(loaded.nprobe, 2)
+
+    def test_fingerprint_mismatch_rebuilds(self):
+        index_processor()._load_or_build_ivf(self.dataset)
+        changed = self.dataset.iloc[:200]
+
+        with mock.patch.object(IVFIndex, "build", wraps=IVFIndex.build) as build:
+            rebuilt = index_processor()._load_or_build_ivf(changed)
+
+        build.assert_called_once()
+        self.assertEqual(len(rebuilt), 200)
+        self.assertEqual(len(IVFIndex.load(config.IVF_INDEX_PATH)), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+
+from backend.batch_analysis import BatchAnalyzer, completed_ids, load_inputs
+
+
+class StubAnalyzer(BatchAnalyzer):
+    """Analyseur sans application : chaque image est réussie, sauf celles listées dans `failing`."""
+
+    def __init__(self, failing=()):
+        super().__init__(app=None, processes=0, with_llm=False)
+        self.failing = set(failing)
+        self.analyzed = []
+
+    async def iter_results(self, items):
+        for item in items:
+            self.analyzed.append(item["id"])
+            status = "error" if item["id"] in self.failing else "ok"
+            yield self._record(item, status)
+
+
+def items(*ids):
+    return [{"id": item_id, "source": f"/images/{item_id}.jpg", "is_url": False} for item_id in ids]
+
+
+class BatchResumeTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = os.path.join(tmp.name, "results.jsonl")
+
+    def write_output(self, text):
+        with open(self.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_completed_ids_keeps_only_successes(self):
+        self.write_output(
+            json.dumps({"id": "a", "status": "ok"}) + "\n"
+            + json.dumps({"id": "b", "status": "error"}) + "\n"
+            + '{"id": "c", "sta'
+        )
+
+        self.assertEqual(completed_ids(self.output), {"a"})
+
+    def test_missing_output_has_no_completed_ids(self):
+        self.assertEqual(completed_ids(self.output), set())
+
+    async def test_run_skips_completed_and_retries_errors(self):
+        analyzer = StubAnalyzer(failing={"c"})
+        first = await analyzer.run(items("a", "b", "c"), self.output)
+
+        analyzer = StubAnalyzer()
+        second = await analyzer.run(items("a", "b", "c", "d"), self.output)
+
+        self.assertEqual(first, {"skipped": 0, "ok": 2, "error": 1})
+        self.assertEqual(second, {"skipped": 2, "ok": 2, "error": 0})
+        self.assertEqual(analyzer.analyzed, ["c", "d"])
+        self.assertEqual(completed_ids(self.output), {"a", "b", "c", "d"})
+
+    async def test_run_after_interrupted_write_starts_a_new_line(self):
+        self.write_output(json.dumps({"id": "a", "status": "ok"}) + "\n" + '{"id": "b", "sta')
+
+        counts = await StubAnalyzer().run(items("a", "b"), self.output)
+
+        self.assertEqual(counts, {"skipped": 1, "ok": 1, "error": 0})
+        with open(self.output, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[1], '{"id": "b", "sta')
+        self.assertEqual(json.loads(lines[2])["id"], "b")
+
+
+class LoadInputsTest(unittest.TestCase):
+
+    def test_jsonl_urls_and_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "inputs.jsonl")
+            with open(source, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"id": 1, "url": "https://img/1.jpg"}) + "\n\n")
+                f.write(json.dumps({"path": "/images/2.jpg"}) + "\n")
+
+            loaded = load_inputs(source)
+
+        self.assertEqual(loaded, [
+            {"id": "1", "source": "https://img/1.jpg", "is_url": True},
+            {"id": "/images/2.jpg", "source": "/images/2.jpg", "is_url": False},
+        ])
+
+    def test_directory_lists_images_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "sub"))
+            for name in ["b.jpg", "a.PNG", "notes.txt", os.path.join("sub", "c.webp")]:
+                open(os.path.join(tmp, name), "wb").close()
+
+            ids = [item["id"] for item in load_inputs(tmp)]
+
+        self.assertEqual(ids, ["a.PNG", "b.jpg", os.path.join("sub", "c.webp")])
+
+
+if __name__ == "__main__":
+    unittest.main()
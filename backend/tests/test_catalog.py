@@ -0,0 +1,76 @@
+import base64
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.models.catalog import EMBEDDINGS_FILE, Catalog, convert_dataset, is_catalog, vectors_file
+from backend.models.embedding_index import EmbeddingIndex
+
+
+def parquet_available():
+    try:
+        pd.io.parquet.get_engine("auto")
+    except ImportError:
+        return False
+    return True
+
+
+def catalog_dataset():
+    """Deux tenues de deux articles et une tenue d'un article, avec leurs images."""
+    rng = np.random.default_rng(0)
+    outfit_vectors = rng.standard_normal((3, 8)).astype(np.float32)
+    outfits = [0, 0, 1, 1, 2]
+    return pd.DataFrame({
+        "Item Name": [f"item {i}" for i in range(5)],
+        "Price": ["10€"] * 5,
+        "Link": [f"https://shop/{i}" for i in range(5)],
+        "Image URL": [f"https://img/{o}.jpg" for o in outfits],
+        "Embedding": [outfit_vectors[o] for o in outfits],
+        "Encoded Image": [base64.b64encode(f"jpeg {o}".encode()).decode() for o in outfits],
+    })
+
+
+@unittest.skipUnless(parquet_available(), "moteur Parquet (pyarrow ou fastparquet) indisponible")
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "catalog")
+        self.dataset = catalog_dataset()
+
+    def test_round_trip_matches_exact_search_on_the_pickle(self):
+        convert_dataset(self.dataset, self.path, dedupe_outfits=False)
+        catalog = Catalog.load(self.path)
+
+        self.assertTrue(is_catalog(self.path))
+        self.assertEqual(vectors_file(self.path), os.path.join(self.path, EMBEDDINGS_FILE))
+        self.assertIsInstance(catalog.embeddings, np.memmap)
+        pd.testing.assert_frame_equal(catalog.metadata, self.dataset[["Item Name", "Price", "Link", "Image URL"]])
+
+        queries = np.vstack(self.dataset["Embedding"].to_numpy())
+        expected = EmbeddingIndex.from_dataframe(self.dataset).search(queries, 3)
+        actual = catalog.exact_index().search(queries, 3)
+        np.testing.assert_array_equal(actual[0][:, 0], expected[0][:, 0])
+        np.testing.assert_allclose(actual[1], expected[1], rtol=1e-6)
+
+    def test_dedupe_keeps_one_embedding_per_outfit(self):
+        manifest = convert_dataset(self.dataset, self.path)
+
+        self.assertEqual(manifest["n_rows"], 5)
+        self.assertEqual(manifest["n_embeddings"], 3)
+        np.testing.assert_array_equal(Catalog.load(self.path).embedding_rows, [0, 2, 4])
+
+    def test_images_are_read_on_demand(self):
+        convert_dataset(self.dataset, self.path)
+        catalog = Catalog.load(self.path)
+
+        self.assertEqual(catalog.image_bytes(2), b"jpeg 1")
+        self.assertEqual(catalog.image_base64(4), self.dataset["Encoded Image"].iloc[4])
+
+
+if __name__ == "__main__":
+    unittest.main()
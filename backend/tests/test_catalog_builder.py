@@ -0,0 +1,147 @@
+import io
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from backend.models.catalog_builder import CatalogBuilder, load_manifest
+from backend.models.preprocessing import ImagePreprocessor
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class FakeServer:
+    """Serveur d'images simulé : ETag par version, réponses 304 et URLs en panne."""
+
+    def __init__(self, images):
+        self.images = {url: (png(color), f'"{url}-1"') for url, color in images.items()}
+        self.down = set()
+        self.bodies_sent = 0
+
+    def update(self, url, color):
+        version = int(self.images[url][1].strip('"').rsplit("-", 1)[1]) + 1
+        self.images[url] = (png(color), f'"{url}-{version}"')
+
+    def fetch(self, url, headers=None):
+        if url in self.down:
+            raise ConnectionError(f"{url} indisponible")
+        content, etag = self.images[url]
+        if (headers or {}).get("If-None-Match") == etag:
+            return SimpleNamespace(status_code=304, content=b"", headers={})
+        self.bodies_sent += 1
+        return SimpleNamespace(status_code=200, content=content, headers={"ETag": etag})
+
+
+class MeanColorProcessor:
+    """Modèle simulé : l'embedding d'une image est sa couleur moyenne ; compte les images encodées."""
+
+    def __init__(self):
+        self.preprocessor = ImagePreprocessor((8, 8))
+        self.embedded = 0
+
+    def embed_batch(self, batch):
+        self.embedded += len(batch)
+        return batch.mean(axis=(2, 3))
+
+
+class CatalogBuilderTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.server = FakeServer({"https://img/a": (255, 0, 0), "https://img/b": (0, 0, 255)})
+        patcher = mock.patch("backend.models.catalog_builder.fetch", self.server.fetch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.items = pd.DataFrame({
+            "Item Name": ["veste", "jean", "pull"],
+            "Price": ["10€", "20€", "30€"],
+            "Link": ["l1", "l2", "l3"],
+            "Image URL": ["https://img/a", "https://img/a", "https://img/b"],
+        })
+
+    def build(self, previous=None, model_id="convnext-v1-fp32"):
+        processor = MeanColorProcessor()
+        builder = CatalogBuilder(
+            processor,
+            cache_dir=os.path.join(self.tmp, "cache"),
+            manifest_path=os.path.join(self.tmp, "manifest.json"),
+            workers=2,
+            batch_size=4,
+            model_id=model_id,
+        )
+        dataset, stats = builder.build(self.items, previous_dataset=previous, log=lambda message: None)
+        return dataset, stats, processor
+
+    def test_first_build_embeds_each_image_once(self):
+        dataset, stats, processor = self.build()
+
+        self.assertEqual(stats, {"rows": 3, "images": 2, "unchanged": 0, "embedded": 2, "stale": 0, "failed": 0})
+        self.assertEqual(processor.embedded, 2)
+        np.testing.assert_array_equal(dataset["Embedding"].iloc[0], dataset["Embedding"].iloc[1])
+        self.assertTrue(dataset["Encoded Image"].notna().all())
+        self.assertEqual(set(load_manifest(os.path.join(self.tmp, "manifest.json"))), {"https://img/a", "https://img/b"})
+
+    def test_unchanged_images_are_revalidated_not_reembedded(self):
+        first, _, _ = self.build()
+        self.server.bodies_sent = 0
+
+        dataset, stats, processor = self.build(previous=first)
+
+        self.assertEqual(stats["unchanged"], 2)
+        self.assertEqual(stats["embedded"], 0)
+        self.assertEqual(processor.embedded, 0)
+        self.assertEqual(self.server.bodies_sent, 0)
+        pd.testing.assert_series_equal(dataset["Encoded Image"], first["Encoded Image"])
+
+    def test_changed_etag_reembeds_only_that_image(self):
+        first, _, _ = self.build()
+        self.server.update("https://img/b", (0, 255, 0))
+
+        dataset, stats, processor = self.build(previous=first)
+
+        self.assertEqual((stats["unchanged"], stats["embedded"]), (1, 1))
+        self.assertEqual(processor.embedded, 1)
+        np.testing.assert_array_equal(dataset["Embedding"].iloc[0], first["Embedding"].iloc[0])
+        self.assertFalse(np.array_equal(dataset["Embedding"].iloc[2], first["Embedding"].iloc[2]))
+
+    def test_download_failure_keeps_previous_embedding(self):
+        first, _, _ = self.build()
+        self.server.down.add("https://img/b")
+
+        dataset, stats, _ = self.build(previous=first)
+
+        self.assertEqual((stats["stale"], stats["failed"]), (1, 0))
+        np.testing.assert_array_equal(dataset["Embedding"].iloc[2], first["Embedding"].iloc[2])
+        self.assertEqual(dataset["Encoded Image"].iloc[2], first["Encoded Image"].iloc[2])
+        self.assertIn("https://img/b", load_manifest(os.path.join(self.tmp, "manifest.json")))
+
+    def test_download_failure_without_previous_build_is_reported(self):
+        self.server.down.add("https://img/b")
+
+        dataset, stats, _ = self.build()
+
+        self.assertEqual((stats["embedded"], stats["stale"], stats["failed"]), (1, 0, 1))
+        self.assertIsNone(dataset["Embedding"].iloc[2])
+
+    def test_model_change_reembeds_everything(self):
+        first, _, _ = self.build()
+
+        _, stats, processor = self.build(previous=first, model_id="convnext-v1-int8-static")
+
+        self.assertEqual((stats["unchanged"], stats["embedded"]), (0, 2))
+        self.assertEqual(processor.embedded, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from backend.models.embedding_cache import EmbeddingCache, content_key, perceptual_hash
+
+
+def jpeg(seed, quality=95, size=(128, 96)):
+    """Image aléatoire lissée (structure stable d'un encodage à l'autre), encodée en JPEG."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize(size, Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class EmbeddingCacheTest(unittest.TestCase):
+
+    def test_exact_hit_after_put(self):
+        cache = EmbeddingCache(use_phash=False)
+        raw = jpeg(0)
+
+        vector, _, key, phash = cache.get(raw)
+        self.assertIsNone(vector)
+        cache.put(key, np.arange(4), phash)
+
+        vector, _, _, _ = cache.get(raw)
+        np.testing.assert_array_equal(vector, np.arange(4, dtype=np.float32))
+        self.assertEqual(cache.metrics()["hits"], 1)
+        self.assertEqual(cache.metrics()["misses"], 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = EmbeddingCache(max_entries=2, use_phash=False)
+        images = [jpeg(seed) for seed in range(3)]
+        for i, raw in enumerate(images[:2]):
+            cache.put(cache.key(raw), np.full(4, i))
+        # Lecture de la première : la seconde devient la moins récente
+        cache.get(images[0])
+
+        cache.put(cache.key(images[2]), np.full(4, 2))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get(images[0])[0])
+        self.assertIsNone(cache.get(images[1])[0])
+        self.assertIsNotNone(cache.get(images[2])[0])
+
+    def test_reencoded_upload_is_a_near_duplicate_hit(self):
+        cache = EmbeddingCache(max_distance=4)
+        original, reencoded = jpeg(0, quality=95), jpeg(0, quality=60)
+        self.assertNotEqual(content_key(original), content_key(reencoded))
+        self.assertLessEqual((perceptual_hash(original) ^ perceptual_hash(reencoded)).bit_count(), 4)
+        _, _, key, phash = cache.get(original)
+        cache.put(key, np.ones(4), phash)
+
+        vector, _, _, _ = cache.get(reencoded)
+
+        np.testing.assert_array_equal(vector, np.ones(4, dtype=np.float32))
+        self.assertEqual(cache.metrics()["near_hits"], 1)
+
+    def test_different_image_is_a_miss(self):
+        cache = EmbeddingCache(max_distance=4)
+        _, _, key, phash = cache.get(jpeg(0))
+        cache.put(key, np.ones(4), phash)
+
+        self.assertIsNone(cache.get(jpeg(1))[0])
+
+    def test_disk_tier_survives_a_restart_with_the_histogram(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite")
+            raw = jpeg(0)
+            cache = EmbeddingCache(path=path, namespace="model-a")
+            _, _, key, phash = cache.get(raw)
+            cache.put(key, np.arange(4), phash, histogram=np.full(3, 1 / 3))
+
+            vector, histogram, _, _ = EmbeddingCache(path=path, namespace="model-a").get(raw)
+            other_model = EmbeddingCache(path=path, namespace="model-b").get(raw)[0]
+
+        np.testing.assert_array_equal(vector, np.arange(4, dtype=np.float32))
+        np.testing.assert_allclose(histogram, np.full(3, 1 / 3))
+        self.assertIsNone(other_model)
+
+
+if __name__ == "__main__":
+    unittest.main()
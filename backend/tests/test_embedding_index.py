@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.models.embedding_index import EmbeddingIndex, top_k_indices
+
+
+class TopKIndicesTest(unittest.TestCase):
+
+    def test_sorted_by_decreasing_score(self):
+        scores = np.array([0.1, 0.9, 0.4, 0.7, 0.2], dtype=np.float32)
+
+        np.testing.assert_array_equal(top_k_indices(scores, 3), [1, 3, 2])
+
+    def test_matches_full_sort_on_each_row(self):
+        scores = np.random.default_rng(0).standard_normal((4, 100)).astype(np.float32)
+
+        top = top_k_indices(scores, 10)
+
+        np.testing.assert_array_equal(top, np.argsort(-scores, axis=-1)[:, :10])
+
+    def test_ties_are_kept_and_sorted_by_score(self):
+        scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1])
+
+        top = top_k_indices(scores, 3)
+
+        self.assertEqual(top[0], 1)
+        self.assertEqual(len(set(top[1:]) & {0, 2, 3}), 2)
+        np.testing.assert_array_equal(scores[top], [0.9, 0.5, 0.5])
+
+    def test_k_larger_than_n(self):
+        scores = np.array([0.2, 0.8], dtype=np.float32)
+
+        np.testing.assert_array_equal(top_k_indices(scores, 5), [1, 0])
+
+    def test_k_zero(self):
+        self.assertEqual(top_k_indices(np.ones((2, 4)), 0).shape, (2, 0))
+
+
+class EmbeddingIndexTest(unittest.TestCase):
+
+    def test_search_matches_brute_force_cosine(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((200, 16)).astype(np.float32)
+        queries = rng.standard_normal((3, 16)).astype(np.float32)
+        index = EmbeddingIndex(vectors, np.arange(200) + 1000)
+
+        row_ids, scores = index.search(queries, 5)
+
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        cosine = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+        expected = np.argsort(-cosine, axis=1)[:, :5]
+        np.testing.assert_array_equal(row_ids, expected + 1000)
+        np.testing.assert_allclose(scores, np.take_along_axis(cosine, expected, axis=1), rtol=1e-5)
+
+    def test_from_dataframe_skips_missing_embeddings(self):
+        dataset = pd.DataFrame({"Embedding": [np.ones(4), None, np.arange(4.0)]})
+
+        index = EmbeddingIndex.from_dataframe(dataset)
+
+        np.testing.assert_array_equal(index.row_ids, [0, 2])
+        row_ids, _ = index.search_one(np.arange(4.0), 1)
+        self.assertEqual(row_ids[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
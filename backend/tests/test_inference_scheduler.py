@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+import numpy as np
+
+from backend.models.inference_scheduler import InferenceScheduler
+
+
+class RecordingModel:
+    """Modèle simulé : chaque sortie est l'entrée aplatie ; le premier lot peut être retenu."""
+
+    def __init__(self, hold_first=False, error=None):
+        self.batch_sizes = []
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold_first:
+            self.release.set()
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        self.started.set()
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return batch.reshape(len(batch), -1)
+
+
+def tensor(value):
+    return np.full((1, 2, 2), value, dtype=np.float32)
+
+
+class InferenceSchedulerTest(unittest.TestCase):
+
+    def scheduler(self, model, **kwargs):
+        scheduler = InferenceScheduler(model, **kwargs)
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    def test_queued_requests_share_batches_up_to_max_size(self):
+        model = RecordingModel(hold_first=True)
+        scheduler = self.scheduler(model, max_batch_size=4, max_wait_ms=1.0)
+
+        first = scheduler.submit(tensor(0))
+        self.assertTrue(model.started.wait(timeout=5))
+        # Le modèle est occupé : les requêtes suivantes s'accumulent dans la file
+        others = [scheduler.submit(tensor(i)) for i in range(1, 6)]
+        model.release.set()
+
+        results = [future.result(timeout=5) for future in [first] + others]
+
+        self.assertEqual(model.batch_sizes, [1, 4, 1])
+        for i, result in enumerate(results):
+            np.testing.assert_array_equal(result, np.full(4, i, dtype=np.float32))
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics["batches"], 3)
+        self.assertEqual(metrics["requests"], 6)
+        self.assertEqual(metrics["batch_size_counts"], {1: 2, 4: 1})
+
+    def test_batch_error_reaches_every_caller(self):
+        model = RecordingModel(hold_first=True, error=RuntimeError("onnx"))
+        scheduler = self.scheduler(model, max_batch_size=4, max_wait_ms=1.0)
+
+        futures = [scheduler.submit(tensor(0))]
+        self.assertTrue(model.started.wait(timeout=5))
+        futures += [scheduler.submit(tensor(i)) for i in range(1, 3)]
+        model.release.set()
+
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "onnx"):
+                future.result(timeout=5)
+
+    def test_close_drains_the_queue_then_rejects(self):
+        model = RecordingModel(hold_first=True)
+        scheduler = InferenceScheduler(model, max_batch_size=2, max_wait_ms=1.0)
+
+        futures = [scheduler.submit(tensor(0))]
+        self.assertTrue(model.started.wait(timeout=5))
+        futures += [scheduler.submit(tensor(i)) for i in range(1, 4)]
+        model.release.set()
+        scheduler.close()
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(sum(model.batch_sizes), 4)
+        self.assertFalse(scheduler._thread.is_alive())
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(tensor(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
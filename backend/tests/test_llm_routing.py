@@ -0,0 +1,155 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+
+from backend.models.admission import Overloaded
+from backend.models.llm_routing import LatencyTracker, ModelRouter
+
+
+class FakeCalls:
+    """Appels simulés par modèle : (délai en s, résultat ou exception), avec trace des annulations."""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, model):
+        self.started.append(model)
+        delay, outcome = self.behaviours[model]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class ModelRouterTest(unittest.IsolatedAsyncioTestCase):
+
+    def router(self, **kwargs):
+        kwargs.setdefault("primary", "large")
+        kwargs.setdefault("fallback", "small")
+        return ModelRouter(**kwargs)
+
+    async def test_primary_wins(self):
+        router = self.router(budget_s=1.0)
+        calls = FakeCalls({"large": (0.01, "primary"), "small": (0.01, "fallback")})
+
+        result = await router.run(calls)
+
+        self.assertEqual(result, ("primary", "large"))
+        self.assertEqual(calls.started, ["large"])
+        self.assertEqual(router.metrics()["primary:none_total"], 1)
+
+    async def test_fallback_after_budget_cancels_primary(self):
+        router = self.router(budget_s=0.05)
+        calls = FakeCalls({"large": (5.0, "primary"), "small": (0.01, "fallback")})
+
+        result = await router.run(calls)
+
+        self.assertEqual(result, ("fallback", "small"))
+        self.assertEqual(calls.started, ["large", "small"])
+        await asyncio.sleep(0)
+        self.assertEqual(calls.cancelled, ["large"])
+        self.assertEqual(router.metrics()["fallback:budget_total"], 1)
+
+    async def test_request_budget_overrides_router_budget(self):
+        router = self.router(budget_s=5.0)
+        calls = FakeCalls({"large": (5.0, "primary"), "small": (0.01, "fallback")})
+
+        result = await router.run(calls, budget_s=0.05)
+
+        self.assertEqual(result, ("fallback", "small"))
+
+    async def test_invalid_budget_is_ignored(self):
+        router = self.router(budget_s=0.0)
+        calls = FakeCalls({"large": (0.05, "primary"), "small": (0.01, "fallback")})
+
+        for budget_s in (float("nan"), float("inf"), -1.0):
+            self.assertEqual(await router.run(calls, budget_s=budget_s), ("primary", "large"))
+        self.assertEqual(calls.started, ["large"] * 3)
+
+    async def test_fallback_after_error(self):
+        router = self.router()
+        calls = FakeCalls({"large": (0.0, RuntimeError("boom")), "small": (0.01, "fallback")})
+
+        result = await router.run(calls)
+
+        self.assertEqual(result, ("fallback", "small"))
+        self.assertEqual(router.metrics()["fallback:error_total"], 1)
+
+    async def test_hedge_after_observed_percentile(self):
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("large", 0.05)
+        router = self.router(fallback=None, hedge=True, hedge_model="large-eu", hedge_min_samples=5, tracker=tracker)
+        calls = FakeCalls({"large": (5.0, "primary"), "large-eu": (0.01, "hedge")})
+
+        result = await router.run(calls)
+
+        self.assertEqual(result, ("hedge", "large-eu"))
+        await asyncio.sleep(0)
+        self.assertEqual(calls.cancelled, ["large"])
+        self.assertEqual(router.metrics()["hedge:hedge_total"], 1)
+
+    async def test_no_hedge_before_min_samples(self):
+        router = self.router(fallback=None, hedge=True, hedge_min_samples=5)
+
+        self.assertIsNone(router.hedge_delay())
+
+    async def test_all_calls_fail(self):
+        router = self.router()
+        calls = FakeCalls({"large": (0.0, RuntimeError("primary")), "small": (0.0, RuntimeError("fallback"))})
+
+        with self.assertRaisesRegex(RuntimeError, "fallback"):
+            await router.run(calls)
+        self.assertEqual(calls.started, ["large", "small"])
+        self.assertEqual(router.metrics()["none:error_total"], 1)
+
+    async def test_cancelling_the_run_cancels_every_call(self):
+        router = self.router(budget_s=0.01)
+        calls = FakeCalls({"large": (5.0, "primary"), "small": (5.0, "fallback")})
+
+        task = asyncio.ensure_future(router.run(calls))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(calls.cancelled), ["large", "small"])
+
+    async def test_extra_calls_take_their_own_slot(self):
+        router = self.router(budget_s=0.01)
+        calls = FakeCalls({"large": (5.0, "primary"), "small": (0.01, "fallback")})
+        slots = []
+
+        @asynccontextmanager
+        async def extra_slot():
+            slots.append("acquired")
+            yield
+
+        result = await router.run(calls, extra_slot=extra_slot)
+
+        self.assertEqual(result, ("fallback", "small"))
+        self.assertEqual(slots, ["acquired"])
+
+    async def test_refused_extra_slot_counts_as_failure(self):
+        router = self.router(budget_s=0.01)
+        calls = FakeCalls({"large": (0.1, "primary"), "small": (0.01, "fallback")})
+
+        @asynccontextmanager
+        async def extra_slot():
+            raise Overloaded("queue_full", 1)
+            yield
+
+        result = await router.run(calls, extra_slot=extra_slot)
+
+        self.assertEqual(result, ("primary", "large"))
+        self.assertEqual(calls.started, ["large"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.models.outfit_index import OutfitPostings, outfit_representative_rows
+from backend.utils.helpers import get_all_items_for_image
+
+
+def outfit_dataset():
+    """Articles de trois tenues entremêlées, dont une ligne sans URL et une sans embedding."""
+    return pd.DataFrame({
+        "Item Name": ["a1", "b1", "a2", "none", "c1", "b2", "a3"],
+        "Image URL": ["a", "b", "a", None, "c", "b", "a"],
+        "Embedding": [np.ones(2), np.ones(2), np.ones(2), np.ones(2), None, np.ones(2), np.ones(2)],
+    })
+
+
+class OutfitPostingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = outfit_dataset()
+        self.postings = OutfitPostings.from_dataframe(self.dataset)
+
+    def test_rows_for_url_lists_every_item_of_the_outfit(self):
+        np.testing.assert_array_equal(self.postings.rows_for_url("a"), [0, 2, 6])
+        np.testing.assert_array_equal(self.postings.rows_for_url("b"), [1, 5])
+        np.testing.assert_array_equal(self.postings.rows_for_url("c"), [4])
+
+    def test_unknown_url_is_empty(self):
+        self.assertEqual(len(self.postings.rows_for_url("unknown")), 0)
+
+    def test_rows_without_url_belong_to_no_outfit(self):
+        self.assertEqual(len(self.postings), 3)
+        self.assertNotIn(3, self.postings.item_rows)
+
+    def test_matches_dataframe_filter(self):
+        for url in ["a", "b", "c", "unknown"]:
+            with self.subTest(url=url):
+                pd.testing.assert_frame_equal(
+                    get_all_items_for_image(url, self.dataset, self.postings),
+                    get_all_items_for_image(url, self.dataset),
+                )
+
+
+class OutfitRepresentativeRowsTest(unittest.TestCase):
+
+    def test_one_row_per_outfit_with_an_embedding(self):
+        # 'c' n'a pas d'embedding ; la ligne sans URL est conservée
+        np.testing.assert_array_equal(outfit_representative_rows(outfit_dataset()), [0, 1, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import backend.models.config as config
+from backend.models.ann_index import recall_at_k
+from backend.models.embedding_index import EmbeddingIndex
+from backend.models.pq_index import PQIndex
+from backend.tests.test_ann_index import clustered_vectors, index_processor
+
+
+class PQIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        vectors = clustered_vectors()
+        cls.exact = EmbeddingIndex(vectors, np.arange(len(vectors)))
+        cls.pq = PQIndex.from_exact(cls.exact, subvector_dim=4, rerank=4)
+        rng = np.random.default_rng(1)
+        cls.queries = vectors[rng.integers(0, len(vectors), 50)] + 0.1 * rng.standard_normal((50, 32)).astype(np.float32)
+
+    def test_codes_are_one_byte_per_subspace(self):
+        self.assertEqual(self.pq.codes.shape, (8, len(self.exact)))
+        self.assertEqual(self.pq.codes.dtype, np.uint8)
+
+    def test_recall_against_exact_search(self):
+        recalls = [recall_at_k(self.pq, self.exact, self.queries, 10, rerank=rerank) for rerank in (0, 2, 8)]
+
+        # Codes seuls bien au-dessus du hasard (10 / 2000), puis la réévaluation exacte rattrape
+        self.assertGreaterEqual(recalls[0], 0.25)
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertGreaterEqual(recalls[-1], 0.95)
+
+    def test_rerank_scores_are_exact_cosines(self):
+        row_ids, scores = self.pq.search(self.queries, 5)
+
+        query = self.queries[0] / np.linalg.norm(self.queries[0])
+        np.testing.assert_allclose(scores[0], self.exact.vectors[row_ids[0]] @ query, rtol=1e-5)
+
+    def test_save_load_round_trip(self):
+        self.pq.fingerprint = {"row_ids": "abc", "subvector_dim": 4}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pq")
+            self.pq.save(path)
+            self.pq.save(path)
+            loaded = PQIndex.load(path)
+
+            self.assertEqual(os.listdir(tmp), ["pq"])
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            self.assertEqual(loaded.fingerprint, self.pq.fingerprint)
+            np.testing.assert_array_equal(loaded.codes, self.pq.codes)
+            np.testing.assert_array_equal(loaded.search(self.queries, 5)[0], self.pq.search(self.queries, 5)[0])
+
+
+class LoadOrBuildPQTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, value in {
+            "PQ_INDEX_PATH": os.path.join(self.tmp.name, "pq"),
+            "PQ_SUBVECTOR_DIM": 8,
+            "PQ_RERANK": 2,
+            "DEDUPE_OUTFITS": False,
+            "RERANK": False,
+        }.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.dataset = pd.DataFrame({"Embedding": list(clustered_vectors(n=300))})
+
+    def test_fingerprint_mismatch_rebuilds(self):
+        built = index_processor()._load_or_build_pq(self.dataset)
+        with mock.patch.object(PQIndex, "build") as build:
+            reused = index_processor()._load_or_build_pq(self.dataset)
+        build.assert_not_called()
+        self.assertEqual(reused.fingerprint, built.fingerprint)
+
+        with mock.patch.object(config, "PQ_SUBVECTOR_DIM", 4):
+            rebuilt = index_processor()._load_or_build_pq(self.dataset)
+
+        self.assertEqual(rebuilt.subvector_dim, 4)
+        self.assertEqual(PQIndex.load(config.PQ_INDEX_PATH).subvector_dim, 4)
+
+    def test_release_embeddings_once_the_index_holds_the_vectors(self):
+        processor = index_processor()
+        query = np.asarray(self.dataset["Embedding"].iloc[7])
+        expected = processor.search(query, self.dataset, top_k=3, index='pq')
+
+        self.assertFalse(processor.release_embeddings(self.dataset, index='exact'))
+        self.assertTrue(processor.release_embeddings(self.dataset, index='pq'))
+
+        self.assertNotIn("Embedding", self.dataset)
+        actual = processor.search(query, self.dataset, top_k=3, index='pq')
+        np.testing.assert_array_equal(actual[0], expected[0])
+        self.assertEqual(actual[0][0, 0], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import importlib.util
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+
+import backend.models.config as config
+from backend.models.preprocessing import ImagePreprocessor
+
+
+def photo(width=900, height=700, fmt="JPEG"):
+    """Image synthétique à dégradés doux (proche d'une photo), encodée dans `fmt`."""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    pixels = np.stack([
+        255 * x / width,
+        255 * y / height,
+        127.5 * (1 + np.sin(x / 37.0) * np.cos(y / 53.0)),
+    ], axis=-1).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, fmt, quality=95)
+    return buffer.getvalue()
+
+
+def reference(image):
+    """Resize -> ToTensor -> Normalize de torchvision, réécrit en float64."""
+    height, width = config.IMAGE_SIZE
+    pixels = np.asarray(image.convert("RGB").resize((width, height), Image.BILINEAR), dtype=np.float64) / 255.0
+    mean = np.asarray(config.NORMALIZATION_MEAN)
+    std = np.asarray(config.NORMALIZATION_STD)
+    return ((pixels - mean) / std).transpose(2, 0, 1)
+
+
+class ImagePreprocessorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.preprocessor = ImagePreprocessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+
+    def test_decoded_image_matches_reference(self):
+        image = Image.open(io.BytesIO(photo(fmt="PNG")))
+
+        tensor = self.preprocessor.preprocess(image)
+
+        self.assertEqual(tensor.shape, (3,) + tuple(config.IMAGE_SIZE))
+        self.assertEqual(tensor.dtype, np.float32)
+        np.testing.assert_allclose(tensor, reference(image), atol=1e-4)
+
+    def test_decode_time_downscaling_stays_within_tolerance(self):
+        raw = photo()
+        full = Image.open(io.BytesIO(raw)).convert("RGB")
+
+        drafted = self.preprocessor.preprocess(Image.open(io.BytesIO(raw)))
+
+        # Même tolérance que manage.py check_preprocessing
+        self.assertLess(float(np.abs(drafted - reference(full)).mean()), 0.05)
+
+    def test_batch_reuses_the_buffer(self):
+        images = [Image.open(io.BytesIO(photo(width=300 + 50 * i, fmt="PNG"))) for i in range(3)]
+        buffer = self.preprocessor.allocate(4)
+
+        batch = self.preprocessor.preprocess_batch(images, out=buffer)
+
+        self.assertEqual(batch.shape, (3,) + self.preprocessor.shape)
+        self.assertTrue(np.shares_memory(batch, buffer))
+        for image, tensor in zip(images, batch):
+            np.testing.assert_array_equal(tensor, self.preprocessor.preprocess(image))
+
+
+@unittest.skipUnless(importlib.util.find_spec("torchvision"), "torchvision non installé")
+class TorchvisionEquivalenceTest(unittest.TestCase):
+
+    def test_matches_torchvision_transforms(self):
+        import torchvision.transforms as transforms
+
+        transform = transforms.Compose([
+            transforms.Resize(config.IMAGE_SIZE),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=config.NORMALIZATION_MEAN, std=config.NORMALIZATION_STD),
+        ])
+        preprocessor = ImagePreprocessor(config.IMAGE_SIZE, config.NORMALIZATION_MEAN, config.NORMALIZATION_STD)
+        image = Image.open(io.BytesIO(photo())).convert("RGB")
+
+        np.testing.assert_allclose(preprocessor.preprocess(image), transform(image).numpy(), atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
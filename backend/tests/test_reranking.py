@@ -0,0 +1,124 @@
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+import backend.models.config as config
+from backend.models.embedding_cache import EmbeddingCache
+from backend.models.embedding_index import EmbeddingIndex, normalize_rows
+from backend.models.pq_index import PQIndex
+from backend.models.reranking import BoostSignal, ColorSignal, TwoStageIndex, color_histogram
+from backend.tests.test_ann_index import clustered_vectors, index_processor
+
+
+class FixedCandidates:
+    """Premier étage simulé : toujours les mêmes candidats, avec des scores sans valeur."""
+
+    def __init__(self, candidates):
+        self.candidates = np.asarray(candidates, dtype=np.int64)
+        self.requested = []
+
+    def search(self, queries, k):
+        self.requested.append(k)
+        candidates = np.tile(self.candidates[:k], (len(queries), 1))
+        return candidates, np.zeros(candidates.shape, dtype=np.float32)
+
+
+# Quatre lignes : 0 et 1 presque alignées avec la requête [1, 0], 2 opposée, 3 non indexée
+VECTORS = normalize_rows([[1.0, 0.0], [0.99, 0.14], [-1.0, 0.0]])
+QUERY = np.array([[1.0, 0.0]], dtype=np.float32)
+
+
+class TwoStageIndexTest(unittest.TestCase):
+
+    def two_stage(self, candidates, signals=(), shortlist=2):
+        first_stage = FixedCandidates(candidates)
+        return TwoStageIndex(first_stage, VECTORS, np.arange(3), n_rows=4, signals=signals, shortlist=shortlist), first_stage
+
+    def test_shortlist_is_rescored_with_exact_cosine(self):
+        index, first_stage = self.two_stage([2, 1, 0, -1])
+
+        row_ids, scores = index.search(QUERY, 2)
+
+        self.assertEqual(first_stage.requested, [4])
+        np.testing.assert_array_equal(row_ids, [[0, 1]])
+        np.testing.assert_allclose(scores, [[1.0, VECTORS[1, 0]]], rtol=1e-6)
+
+    def test_empty_and_unindexed_candidates_are_dropped(self):
+        index, _ = self.two_stage([3, -1, 1, -1])
+
+        row_ids, scores = index.search(QUERY, 2)
+
+        np.testing.assert_array_equal(row_ids, [[1, -1]])
+        self.assertEqual(scores[0, 1], -np.inf)
+        self.assertEqual(index.search_one(QUERY[0], 2)[0].tolist(), [1])
+
+    def test_color_signal_can_reorder_close_candidates(self):
+        histograms = np.array([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5], [0.0, 0.0]], dtype=np.float32)
+        index, _ = self.two_stage([0, 1, 2], signals=[ColorSignal(histograms, weight=0.5)])
+
+        without_color = index.search(QUERY, 2)[0]
+        with_color = index.search(QUERY, 2, features={"color_histogram": [[0.0, 1.0]]})[0]
+
+        np.testing.assert_array_equal(without_color, [[0, 1]])
+        np.testing.assert_array_equal(with_color, [[1, 0]])
+
+    def test_boost_signal_is_added_to_the_score(self):
+        index, _ = self.two_stage([0, 1, 2], signals=[BoostSignal([0.0, 1.0, 0.0, 0.0], weight=0.1)])
+
+        row_ids, scores = index.search(QUERY, 1)
+
+        np.testing.assert_array_equal(row_ids, [[1]])
+        np.testing.assert_allclose(scores, [[VECTORS[1, 0] + 0.1]], rtol=1e-6)
+
+    def test_pq_first_stage_matches_exact_search(self):
+        vectors = clustered_vectors(n=500)
+        exact = EmbeddingIndex(vectors, np.arange(500))
+        index = TwoStageIndex(PQIndex.from_exact(exact, rerank=0), exact.vectors, exact.row_ids, 500, shortlist=8)
+
+        row_ids, scores = index.search(vectors[:5], 3)
+
+        expected_ids, expected_scores = exact.search(vectors[:5], 3)
+        np.testing.assert_array_equal(row_ids, expected_ids)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+class EncodeImageColorTest(unittest.TestCase):
+    """Histogramme couleur de la requête, calculé une fois puis gardé avec l'embedding en cache."""
+
+    def setUp(self):
+        for name, value in {"RERANK": True, "RERANK_COLOR_WEIGHT": 0.1}.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.processor = index_processor()
+        self.processor.embedding_cache = EmbeddingCache(use_phash=False)
+        self.processor._embed_image = mock.Mock(return_value=np.ones(4, dtype=np.float32))
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 48), (200, 30, 30)).save(buffer, "PNG")
+        self.raw = buffer.getvalue()
+
+    def test_cache_hit_reuses_the_histogram(self):
+        with mock.patch("backend.models.image_processor.color_histogram", wraps=color_histogram) as histogram:
+            first = self.processor.encode_image(self.raw, is_url=False)
+            second = self.processor.encode_image(self.raw, is_url=False)
+
+        self.assertEqual(histogram.call_count, 1)
+        self.assertEqual(self.processor._embed_image.call_count, 1)
+        np.testing.assert_array_equal(second["color_histogram"], first["color_histogram"])
+        self.assertAlmostEqual(float(first["color_histogram"].sum()), 1.0, places=5)
+
+    def test_entry_cached_without_histogram_gets_one_on_hit(self):
+        with mock.patch.object(config, "RERANK", False):
+            self.assertIsNone(self.processor.encode_image(self.raw, is_url=False)["color_histogram"])
+
+        encoded = self.processor.encode_image(self.raw, is_url=False)
+
+        self.assertIsNotNone(encoded["color_histogram"])
+        self.assertEqual(self.processor._embed_image.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
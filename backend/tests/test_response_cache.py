@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from backend.models.response_cache import build_response_cache, response_cache_key
+
+
+class FakeClock:
+    """Remplace le module time de response_cache : l'heure n'avance que sur demande."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class ResponseCacheTestMixin:
+    """Tests communs aux deux backends ; `make_cache` est fourni par la sous-classe."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("backend.models.response_cache.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_counts_saved_tokens(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("k", "analyse", tokens=120)
+
+        self.assertEqual(cache.get("k"), ("analyse", 120))
+        self.assertIsNone(cache.get("other"))
+        self.assertEqual(cache.metrics(), {"hits": 1, "misses": 1, "hit_rate": 0.5, "saved_tokens": 120})
+
+    def test_entry_expires_after_ttl(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("k", "analyse", tokens=120)
+
+        self.clock.now += 59
+        self.assertIsNotNone(cache.get("k"))
+        self.clock.now += 2
+        self.assertIsNone(cache.get("k"))
+        # L'entrée expirée est supprimée, pas seulement ignorée
+        self.assertEqual(len(cache.store), 0)
+
+    def test_bounded_size_evicts_least_recently_read(self):
+        cache = self.make_cache(ttl_seconds=60, max_entries=2)
+        cache.put("a", "A")
+        self.clock.now += 1
+        cache.put("b", "B")
+        self.clock.now += 1
+        cache.get("a")
+        self.clock.now += 1
+
+        cache.put("c", "C")
+
+        self.assertEqual(len(cache.store), 2)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+
+class MemoryResponseCacheTest(ResponseCacheTestMixin, unittest.TestCase):
+
+    def make_cache(self, **kwargs):
+        return build_response_cache("memory", **kwargs)
+
+
+class SQLiteResponseCacheTest(ResponseCacheTestMixin, unittest.TestCase):
+
+    def make_cache(self, **kwargs):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return build_response_cache("sqlite", path=os.path.join(tmp.name, "responses.sqlite"), **kwargs)
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+
+    def test_key_depends_on_every_input(self):
+        args = ["https://img/1.jpg", ["veste", "jean"], "exact", "v1", "pixtral-12b"]
+        base = response_cache_key(*args)
+
+        self.assertEqual(base, response_cache_key(*args))
+        for i, changed in enumerate(["https://img/2.jpg", ["veste"], "similar", "v2", "pixtral-large"]):
+            with self.subTest(argument=i):
+                self.assertNotEqual(base, response_cache_key(*args[:i], changed, *args[i + 1:]))
+        self.assertNotEqual(base, response_cache_key(*args, content_hash="abc"))
+
+    def test_off_disables_the_cache(self):
+        self.assertIsNone(build_response_cache("off"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,15 @@
-from .views import index, analyze
+from .views import index, analyze, analyze_stream, analyze_batch, ready, metrics_view
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('', index),
-    path('analyze', analyze)
+    path('analyze', analyze),
+    path('analyze/stream', analyze_stream),
+    path('analyze/batch', analyze_batch),
+    path('ready', ready),
+    path('metrics', metrics_view)
 ]
 
 # if settings.DEBUG:
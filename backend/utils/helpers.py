@@ -6,18 +6,22 @@ import backend.models.config as config
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_all_items_for_image(image_url, dataset):
+def get_all_items_for_image(image_url, dataset, postings=None):
     """
     Récupère tous les articles liés à une image spécifique depuis le dataset.
 
     Args:
         image_url (str): L'URL de l'image trouvée
         dataset (DataFrame): Dataset contenant les informations de tenues
+        postings (OutfitPostings): Postings tenue -> articles ; évite de parcourir tout le dataset
 
     Returns:
         DataFrame: Tous les articles liés à l'image
     """
-    related_items = dataset[dataset['Image URL'] == image_url]
+    if postings is not None:
+        related_items = dataset.iloc[postings.rows_for_url(image_url)]
+    else:
+        related_items = dataset[dataset['Image URL'] == image_url]
     logger.info(f"Trouvé {len(related_items)} articles liés à l'URL de l'image : {image_url}")
     return related_items
 
@@ -126,4 +130,75 @@ def process_response(response: str) -> str:
     # S'assurer que tous les points utilisent le Markdown cohérent
     processed = re.sub(r'^\* ', '- ', processed, flags=re.MULTILINE)
 
-    return processed
\ No newline at end of file
+    return processed
+
+class MarkdownStreamFormatter:
+    """
+    Applique au fil de l'eau les corrections Markdown de `process_response`
+    (titre initial, sections, puces, échappement des $) à une réponse reçue par morceaux.
+
+    Les caractères qui pourraient encore commencer un motif à remplacer sont
+    retenus jusqu'au morceau suivant. La détection des refus du modèle, qui
+    demande la réponse complète, reste du ressort de `process_response`.
+    """
+
+    SECTIONS = {
+        "DÉTAILS DES ARTICLES :": "## Détails des articles",
+        "ARTICLES SIMILAIRES :": "## Articles similaires",
+    }
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+        self._at_line_start = True
+
+    def feed(self, text):
+        """
+        Ajoute un morceau de réponse.
+
+        Returns:
+            str: Texte formaté pouvant être envoyé dès maintenant
+        """
+        self._pending += text
+        return self._drain(final=False)
+
+    def close(self):
+        """Formate et retourne le texte encore retenu en fin de réponse."""
+        return self._drain(final=True)
+
+    def _held_length(self):
+        """Longueur de la fin du tampon qui pourrait encore former un motif."""
+        pending = self._pending
+        if pending.endswith("\n*") or (self._at_line_start and pending == "*"):
+            return 1
+        longest = max(len(section) for section in self.SECTIONS) - 1
+        for size in range(min(len(pending), longest), 0, -1):
+            tail = pending[-size:]
+            if any(section.startswith(tail) for section in self.SECTIONS):
+                return size
+        return 0
+
+    def _drain(self, final):
+        prefix = ""
+        if not self._started:
+            stripped = self._pending.lstrip()
+            if not stripped:
+                return ""
+            if not stripped.startswith("#"):
+                prefix = "# Analyse Mode\n\n"
+            self._started = True
+
+        for section, header in self.SECTIONS.items():
+            self._pending = self._pending.replace(section, header)
+
+        held = 0 if final else self._held_length()
+        ready = self._pending[:len(self._pending) - held]
+        self._pending = self._pending[len(self._pending) - held:]
+        if not ready:
+            return prefix
+
+        if self._at_line_start and ready.startswith("* "):
+            ready = "- " + ready[2:]
+        ready = ready.replace("\n* ", "\n- ")
+        self._at_line_start = ready.endswith("\n")
+        return prefix + ready.replace("$", "\\$")
@@ -0,0 +1,91 @@
+import ipaddress
+import socket
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import backend.models.config as config
+
+_session = None
+_lock = threading.Lock()
+
+
+def build_session(pool_size=None, retries=None, backoff=None):
+    """
+    Crée une session HTTP avec un pool de connexions et des réessais à délai croissant.
+
+    Args:
+        pool_size (int): Connexions gardées ouvertes par hôte
+        retries (int): Réessais sur erreur réseau ou statut 429/5xx
+        backoff (float): Facteur du délai exponentiel entre réessais (s)
+
+    Returns:
+        requests.Session: Session prête à partager entre threads pour des GET
+    """
+    pool_size = config.HTTP_POOL_SIZE if pool_size is None else pool_size
+    retry = Retry(
+        total=config.HTTP_RETRIES if retries is None else retries,
+        backoff_factor=config.HTTP_BACKOFF_S if backoff is None else backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Session HTTP partagée par le processus."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def fetch(url, timeout=None, **kwargs):
+    """
+    GET avec la session partagée, un délai maximal et une erreur sur statut HTTP en échec.
+
+    Les arguments supplémentaires sont transmis à `Session.get` (ex. allow_redirects=False).
+
+    Returns:
+        requests.Response: Réponse réussie
+    """
+    response = get_session().get(url, timeout=config.HTTP_TIMEOUT_S if timeout is None else timeout, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def check_public_url(url, allowed_hosts=()):
+    """
+    Vérifie qu'une URL fournie par un client peut être récupérée par le serveur.
+
+    Seuls http et https sont acceptés, vers un hôte de `allowed_hosts` (ou ses sous-domaines)
+    si la liste est fournie, et dont toutes les adresses résolues sont publiques (ni privées,
+    ni de bouclage, ni lien-local, ni réservées).
+
+    Raises:
+        ValueError: URL refusée
+    """
+    parsed = urlparse(url) if isinstance(url, str) else None
+    if parsed is None or parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"URL refusée (http ou https attendu) : {url!r}")
+    host = parsed.hostname.lower().rstrip(".")
+    if allowed_hosts and not any(host == allowed or host.endswith("." + allowed) for allowed in allowed_hosts):
+        raise ValueError(f"Hôte non autorisé : {host}")
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Hôte introuvable : {host} ({e})")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split("%", 1)[0]).is_global:
+            raise ValueError(f"Adresse non publique refusée pour {host} : {address}")
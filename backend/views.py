@@ -1,11 +1,52 @@
-import io
-import os
-from PIL import Image
-from django.http import JsonResponse
+import asyncio
+import hmac
+import json
+import math
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from .app import StyleFinderApp
+from . import metrics, registry
+from .batch_analysis import BatchAnalyzer, shared_llm_limits
+from .models.admission import Overloaded
+from .utils.http import check_public_url
+import backend.models.config as config
+
+def _request_status(message):
+    """Statut d'une analyse pour les métriques : 'ok', 'error' (traitement) ou 'llm_error' (Pixtral)."""
+    if isinstance(message, str) and message.startswith("Erreur"):
+        return "error"
+    if isinstance(message, dict) and str(message.get("bot_response", "")).startswith("Erreur"):
+        return "llm_error"
+    return "ok"
+
+def _overloaded_response(error):
+    """Refus rapide d'une requête par le contrôle d'admission (429 ou 503 avec Retry-After)."""
+    response = JsonResponse({"Erreur": str(error)}, status=error.status)
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+def _latency_budget(request):
+    """
+    Budget de latence LLM demandé par le client (en-tête X-Latency-Budget-Ms), ou None.
+
+    Seule une valeur finie et positive est retenue, ramenée entre LLM_CLIENT_BUDGET_MIN_S et
+    LLM_CLIENT_BUDGET_MAX_S : un client ne peut pas forcer le repli sur chaque requête. Toute
+    autre valeur est ignorée (budget du serveur).
+    """
+    value = request.headers.get("X-Latency-Budget-Ms")
+    try:
+        budget_s = float(value) / 1000 if value else None
+    except ValueError:
+        return None
+    if budget_s is None or not math.isfinite(budget_s) or budget_s <= 0:
+        return None
+    return min(max(budget_s, config.LLM_CLIENT_BUDGET_MIN_S), config.LLM_CLIENT_BUDGET_MAX_S)
+
+def _admission_check(app):
+    """Refus rapide (Overloaded) si la file des appels LLM est pleine, avant tout travail CPU."""
+    if app.llm_service.admission is not None:
+        app.llm_service.admission.check()
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -14,28 +55,141 @@ def index(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def analyze(request):
+async def analyze(request):
+    # Durées par étape de cette requête (histogrammes et en-tête Server-Timing)
+    timings = metrics.begin_request()
     try:
         image_file = request.FILES['image']
 
-        # Convertir en objet PIL Image et forcer le mode RGB
+        # Octets bruts : décodés une seule fois par le pipeline, JPEG réutilisé tel quel
         image_data = image_file.read()
-        pil_image = Image.open(io.BytesIO(image_data))
-
-        # Convertir en RGB si ce n'est pas déjà le cas (gère PNG, JPEG, etc.)
-        if pil_image.mode != 'RGB':
-            pil_image = pil_image.convert('RGB')
 
-        # Chemin absolu vers le dataset
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        dataset_path = os.path.join(current_dir, 'dataset', 'swift-style-embeddings.pkl')
+        # Instance partagée, construite une seule fois par worker (attente hors de la boucle si elle charge)
+        app = registry.get_app() if registry.is_ready() else await asyncio.to_thread(registry.get_app)
 
-        app = StyleFinderApp(dataset_path)
+        _admission_check(app)
 
-        result = app.process_image(pil_image)
+        # Étapes CPU dans un pool borné, appel LLM asynchrone : la boucle reste libre
+        result = await app.process_image_async(image_data, latency_budget_s=_latency_budget(request))
         print(result)
-        return JsonResponse({"message": result})
+        metrics.finish_request(timings, "analyze", _request_status(result))
+        response = JsonResponse({"message": result})
+
+    except Overloaded as e:
+        metrics.finish_request(timings, "analyze", e.reason)
+        response = _overloaded_response(e)
 
     except Exception as e:
         print(f"Erreur lors du traitement de l'image: {e}")
-        return JsonResponse({"Erreur": str(e)}, status=500)
\ No newline at end of file
+        metrics.ERRORS.inc(stage="request")
+        metrics.finish_request(timings, "analyze", "exception")
+        response = JsonResponse({"Erreur": str(e)}, status=500)
+
+    response["Server-Timing"] = metrics.server_timing(timings)
+    return response
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def analyze_stream(request):
+    """Variante NDJSON de /analyze : correspondance d'abord, puis l'analyse token par token."""
+    try:
+        image_data = request.FILES['image'].read()
+        app = registry.get_app() if registry.is_ready() else await asyncio.to_thread(registry.get_app)
+        _admission_check(app)
+    except Overloaded as e:
+        metrics.REQUESTS.inc(endpoint="analyze_stream", status=e.reason)
+        return _overloaded_response(e)
+    except Exception as e:
+        print(f"Erreur lors du traitement de l'image: {e}")
+        return JsonResponse({"Erreur": str(e)}, status=500)
+
+    async def events():
+        # Mesure dans le contexte qui itère le flux (les en-têtes sont déjà partis : pas de Server-Timing)
+        timings = metrics.begin_request()
+        status = "error"
+        try:
+            async for event in app.stream_image_async(image_data, latency_budget_s=_latency_budget(request)):
+                if event["type"] == "done":
+                    status = _request_status(event["message"])
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Overloaded as e:
+            # Refus après l'envoi des en-têtes : signalé dans le flux
+            status = e.reason
+            event = {"type": "error", "message": str(e), "status": e.status, "retry_after": e.retry_after}
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"Erreur lors du traitement de l'image: {e}")
+            metrics.ERRORS.inc(stage="request")
+            status = "exception"
+            yield json.dumps({"type": "error", "message": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            metrics.finish_request(timings, "analyze_stream", status)
+
+    response = StreamingHttpResponse(events(), content_type="application/x-ndjson")
+    # Pas de mise en tampon par un proxy intermédiaire
+    response["X-Accel-Buffering"] = "no"
+    response["Cache-Control"] = "no-cache"
+    return response
+
+def _check_batch_urls(urls):
+    """Refuse (ValueError) toute URL qui ne vise pas une image publique autorisée."""
+    for url in urls:
+        check_public_url(url, config.BATCH_URL_ALLOWED_HOSTS)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def analyze_batch(request):
+    """
+    Analyse par lots d'URLs d'images, résultats en NDJSON au fil de l'eau.
+
+    Corps JSON : {"urls": [...], "llm": true}. Les images sont téléchargées par le serveur :
+    seules les URLs http(s) vers des adresses publiques (et, si configurés, vers les hôtes de
+    BATCH_URL_ALLOWED_HOSTS) sont acceptées, avec le jeton BATCH_API_TOKEN s'il est défini.
+    """
+    if config.BATCH_API_TOKEN:
+        expected = f"Bearer {config.BATCH_API_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return JsonResponse({"Erreur": "Authentification requise"}, status=401)
+    try:
+        body = json.loads(request.body)
+        if not isinstance(body, dict):
+            return JsonResponse({"Erreur": "Le corps doit être un objet JSON"}, status=400)
+        urls = body["urls"]
+        if not isinstance(urls, list) or not urls:
+            return JsonResponse({"Erreur": "'urls' doit être une liste non vide"}, status=400)
+        if len(urls) > config.BATCH_MAX_ITEMS:
+            return JsonResponse({"Erreur": f"Au plus {config.BATCH_MAX_ITEMS} images par requête"}, status=400)
+        # Résolution DNS bloquante : hors de la boucle
+        await asyncio.to_thread(_check_batch_urls, urls)
+        app = registry.get_app() if registry.is_ready() else await asyncio.to_thread(registry.get_app)
+    except (ValueError, KeyError) as e:
+        return JsonResponse({"Erreur": f"Corps de requête invalide : {e}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"Erreur": str(e)}, status=500)
+
+    items = [{"id": str(i), "source": url, "is_url": True, "public_only": True} for i, url in enumerate(urls)]
+    # Prétraitement dans les threads de l'application : pas de pool de processus par requête
+    # Bornes LLM du worker, partagées par les requêtes de lots simultanées
+    analyzer = BatchAnalyzer(app, batch_size=config.BATCH_SIZE, processes=0, with_llm=bool(body.get("llm", True)),
+                             llm_limits=shared_llm_limits())
+
+    async def events():
+        async for record in analyzer.iter_results(items):
+            yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+    response = StreamingHttpResponse(events(), content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def ready(request):
+    status = registry.status()
+    return JsonResponse(status, status=200 if registry.is_ready() else 503)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Métriques du worker au format texte Prometheus (durées par étape, requêtes, tokens, caches)."""
+    body = metrics.render(registry.status())
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
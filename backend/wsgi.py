@@ -5,6 +5,13 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 app = get_wsgi_application()
 
+# Précharger l'application (dataset, ONNX, client LLM) une fois par worker
+from backend import registry
+import backend.models.config as config
+
+if config.PRELOAD_APP:
+    registry.warmup(background=config.PRELOAD_IN_BACKGROUND)
+
 if __name__ == "__main__":
     from django.core.management import execute_from_command_line
     execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8000'])
\ No newline at end of file
@@ -1,11 +1,19 @@
 import pandas as pd
+from backend.models.catalog import Catalog, is_catalog
 
-df = pd.read_pickle('./backend/dataset/swift-style-embeddings.pkl')
 pd.set_option('display.max_colwidth', None)
 
+if is_catalog('./backend/dataset/catalog'):
+    # Catalogue columnaire : seules les métadonnées sont lues, les embeddings restent mappés
+    catalog = Catalog.load('./backend/dataset/catalog')
+    df = catalog.metadata
+    print(f"Embeddings : {catalog.embeddings.shape} ({catalog.embeddings.dtype}, mmap)")
+else:
+    df = pd.read_pickle('./backend/dataset/swift-style-embeddings.pkl')
+
 # print(df.loc[40:60][['Item Name','Price','Embedding','Encoded Image', 'Image URL']])
 print(df.loc[40:60][['Image URL']])
 
 print("Noms des colonnes:")
 print(df.columns.tolist())
-print(f"Dimensions : {df.shape}")
+print(f"Dimensions : {df.shape}")
\ No newline at end of file